@@ -10,6 +10,10 @@ class Settings(BaseSettings):
     ADMIN_EMAIL: str
     ADMIN_PASSWORD: str
     UPLOAD_DIR: str
+    FILE_SERVING: str = "stream" # stream, nginx (X-Accel-Redirect), sendfile (X-Sendfile)
+    FILE_GC_MODE: str = "quarantine" # quarantine, delete (orphaned uploads)
+    FILE_GC_QUARANTINE_DAYS: int = 14
+    FILE_ACCEL_PREFIX: str = "/_protected_uploads/" # nginx internal location aliased to UPLOAD_DIR
     MAIL_USERNAME: Optional[str] = None
     MAIL_PASSWORD: Optional[str] = None
     MAIL_FROM: Optional[str] = None
@@ -19,6 +23,18 @@ class Settings(BaseSettings):
     MAIL_SSL_TLS: bool = True
     USE_CREDENTIALS: bool = True
     BREVO_API_KEY: Optional[str] = None
+    EMAIL_TRANSPORT: str = "brevo" # brevo, file
+    EMAIL_SINK_DIR: str = "email_sink" # Used by the file transport
+    EMAIL_WORKER_CONCURRENCY: int = 4
+    CLINIC_TIMEZONE: str = "America/Santiago"
+    SCHEDULER_ENABLED: bool = True
+    BACKUP_RETENTION_DAYS: int = 7
+    BACKUP_COMPRESSION: str = "gzip" # gzip, zstd (needs the zstandard package)
+    BACKUP_CONCURRENCY: int = 3 # Collections dumped at once
+    JOB_WORKERS: int = 2
+    JOB_RETENTION_DAYS: int = 7 # Finished jobs and their result files are deleted after this
+    PREVIEWS_EAGER: bool = True # Render thumbnails in a job right after upload (PDFs need pypdfium2)
+    LIVE_EVENTS_BACKEND: str = "memory" # memory (one worker), changestream (several workers, needs a replica set)
 
 
     class Config:
@@ -36,5 +36,15 @@ async def init_db():
             "app.models.activity_log.ActivityLog",
             "app.models.session.UserSession",
             "app.models.cash_session.CashSession",
+            "app.models.tutor_summary.TutorSummary",
+            "app.models.debt_entry.DebtEntry",
+            "app.models.email_outbox.EmailOutbox",
+            "app.models.scheduled_job.JobLease",
+            "app.models.scheduled_job.JobRun",
+            "app.models.booking_lease.BookingLease",
+            "app.models.background_job.BackgroundJob",
+            "app.models.file_blob.FileBlob",
+            "app.models.sync.Tombstone",
+            "app.models.sync.SyncCounter",
         ]
     )
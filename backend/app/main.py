@@ -18,7 +18,31 @@ async def lifespan(app: FastAPI):
         print("--- DB INIT SUCCESS ---")
     except Exception as e:
         print(f"--- DB INIT ERROR: {e} ---")
+    try:
+        from app.services.fuzzy_search import ensure_search_indexes
+        await ensure_search_indexes()
+    except Exception as e:
+        print(f"--- SEARCH INDEX ERROR: {e} ---")
+    try:
+        from app.services.availability_service import ensure_availability_index
+        await ensure_availability_index()
+    except Exception as e:
+        print(f"--- AVAILABILITY INDEX ERROR: {e} ---")
+    from app.services.email_outbox import start_email_worker, stop_email_worker
+    start_email_worker()
+    from app.services.job_queue import start_job_workers, stop_job_workers
+    start_job_workers()
+    from app.services.live_events import start_live_events, stop_live_events
+    await start_live_events()
+    from app.services.scheduler import start_scheduler, stop_scheduler
+    from app.core.config import settings as app_settings
+    if app_settings.SCHEDULER_ENABLED:
+        start_scheduler()
     yield
+    await stop_scheduler()
+    await stop_live_events()
+    await stop_job_workers()
+    await stop_email_worker()
 
 app = FastAPI(
     title="Paty Veterinaria API",
@@ -68,7 +92,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
-    expose_headers=["X-Total-Count", "Access-Control-Expose-Headers"]
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Access-Control-Expose-Headers"]
 )
 
 @app.get("/")
@@ -115,6 +139,15 @@ from app.routes import import_data, backup
 app.include_router(import_data.router, prefix="/api/v1/import", tags=["Import"])
 app.include_router(backup.router, prefix="/api/v1/backup", tags=["Backup"])
 
+from app.routes import search
+app.include_router(search.router, prefix="/api/v1/search", tags=["Search"])
+
+from app.routes import scheduler, jobs, sync, live
+app.include_router(scheduler.router, prefix="/api/v1/scheduler", tags=["Scheduler"])
+app.include_router(jobs.router, prefix="/api/v1/jobs", tags=["Jobs"])
+app.include_router(sync.router, prefix="/api/v1/sync", tags=["Sync"])
+app.include_router(live.router, prefix="/api/v1/live", tags=["Live"])
+
 
 
 # Force Reload Trigger
@@ -0,0 +1,42 @@
+from beanie import Document, PydanticObjectId
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+class BackgroundJob(Document):
+    """
+    A long operation (import, backup, export) run by the job workers instead of
+    inside the HTTP request. Clients poll GET /jobs/{id}.
+    """
+    kind: str # import_tutors, import_products, upsert_products, import_suppliers, backup, restore, export_sales
+    status: str = "QUEUED" # QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED
+    params: Dict[str, Any] = {}
+
+    progress: float = 0.0 # 0-100
+    counters: Dict[str, int] = {} # Partial counts (processed, inserted, skipped...)
+    message: Optional[str] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    artifact_path: Optional[str] = None # File produced by the job (relative to JOBS_DIR)
+    artifact_name: Optional[str] = None
+
+    # Where an interrupted run picks up again
+    checkpoint: Dict[str, Any] = {}
+    cancel_requested: bool = False
+    attempts: int = 0
+    owner: Optional[str] = None
+    lease_until: Optional[datetime] = None
+
+    created_by: Optional[PydanticObjectId] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "jobs"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("created_at", ASCENDING)]),
+            IndexModel([("created_by", ASCENDING), ("created_at", DESCENDING)]),
+        ]
@@ -0,0 +1,16 @@
+from beanie import Document, Indexed
+from datetime import datetime
+from typing import Optional
+
+class BookingLease(Document):
+    """
+    One per bookable resource (staff member or branch room). A booking holds
+    the lease while it checks for conflicts and writes, so two API workers
+    can't both take the last slot; locked_until bounds it if a worker dies.
+    """
+    key: Indexed(str, unique=True) # "staff:<id>" or "branch:<id>:<type>"
+    owner: Optional[str] = None
+    locked_until: Optional[datetime] = None
+
+    class Settings:
+        name = "booking_leases"
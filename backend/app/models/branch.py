@@ -1,7 +1,7 @@
-from beanie import Document
 from typing import Optional
+from app.models.sync import VersionedDocument
 
-class Branch(Document):
+class Branch(VersionedDocument):
     name: str # Rancagua, Olivar, San Francisco, etc.
     address: Optional[str] = None
     phone: Optional[str] = None
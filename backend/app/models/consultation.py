@@ -1,8 +1,10 @@
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId
 from datetime import datetime
 from typing import Optional, List
+from pymongo import IndexModel, ASCENDING
+from app.models.sync import VersionedDocument
 
-class Consultation(Document):
+class Consultation(VersionedDocument):
     patient_id: PydanticObjectId
     date: datetime = datetime.utcnow()
     reason: Optional[str] = None
@@ -20,9 +22,15 @@ class Consultation(Document):
     appointment_type: str = "VET" # VET, GROOMING
     assigned_staff_id: Optional[PydanticObjectId] = None
     reference_sale_id: Optional[PydanticObjectId] = None
+    reminder_sent_at: Optional[datetime] = None # Set by the reminder job; cleared on reschedule
 
     created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
 
     class Settings:
         name = "consultations"
+        indexes = [
+            IndexModel([("date", ASCENDING)]),
+            IndexModel([("branch_id", ASCENDING), ("date", ASCENDING)]),
+            IndexModel([("status", ASCENDING), ("date", ASCENDING)]),
+            IndexModel([("updated_at", ASCENDING)]),
+        ]
@@ -0,0 +1,27 @@
+from beanie import Document, PydanticObjectId
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+class DebtEntry(Document):
+    """
+    Ledger line of a tutor's internal credit ("Deuda").
+    `amount` is signed: charges are positive, payments and voids (of a DEBT
+    sale, same sale_id as its charge) negative and adjustments either.
+    """
+    tutor_id: PydanticObjectId
+    kind: str # CHARGE, PAYMENT, ADJUSTMENT, VOID
+    amount: float
+    balance_after: Optional[float] = None # Tutor.debt right after this entry
+    sale_id: Optional[PydanticObjectId] = None
+    branch_id: Optional[PydanticObjectId] = None
+    note: Optional[str] = None
+    created_by: Optional[PydanticObjectId] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "debt_entries"
+        indexes = [
+            IndexModel([("tutor_id", ASCENDING), ("created_at", DESCENDING)])
+        ]
@@ -1,8 +1,11 @@
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId
 from datetime import datetime
 from typing import Optional, Dict
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from app.models.sync import VersionedDocument
 
-class DeliveryOrder(Document):
+class DeliveryOrder(VersionedDocument):
     sale_id: PydanticObjectId
     branch_id: PydanticObjectId
     assigned_user_id: Optional[PydanticObjectId] = None
@@ -13,8 +16,11 @@ class DeliveryOrder(Document):
     scheduled_at: Optional[datetime] = None  # To schedule delivery
     sale_details: Optional[Dict] = None # Populated on fetch
     
-    created_at: datetime = datetime.utcnow()
-    updated_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
 
     class Settings:
         name = "delivery_orders"
+        indexes = [
+            # Delivery board: status scope, branch, newest first
+            IndexModel([("status", ASCENDING), ("branch_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)]),
+        ]
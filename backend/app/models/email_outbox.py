@@ -0,0 +1,35 @@
+from beanie import Document
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+class EmailOutbox(Document):
+    """
+    An email waiting to be (or already) delivered by the outbox worker.
+    Request handlers only insert these; `app.services.email_outbox` sends them.
+    """
+    to_email: str
+    subject: str
+    body: str
+    html_body: Optional[str] = None
+    dedupe_key: Optional[str] = None # Unique when set; a second enqueue with the same key is dropped
+    status: str = "PENDING" # PENDING, SENDING, SENT, FAILED
+    attempts: int = 0
+    max_attempts: int = 5
+    next_attempt_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_error: Optional[str] = None
+    sent_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "email_outbox"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+            IndexModel(
+                [("dedupe_key", ASCENDING)],
+                unique=True,
+                partialFilterExpression={"dedupe_key": {"$type": "string"}}
+            ),
+        ]
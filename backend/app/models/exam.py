@@ -1,8 +1,9 @@
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId
 from datetime import datetime
 from typing import Optional, List
+from app.models.sync import VersionedDocument
 
-class Exam(Document):
+class Exam(VersionedDocument):
     patient_id: PydanticObjectId
     consultation_id: Optional[PydanticObjectId] = None
     type: str # hemograma, rx, etc
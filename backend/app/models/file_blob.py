@@ -0,0 +1,24 @@
+from beanie import Document, Indexed
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+class FileBlob(Document):
+    """
+    Stored file content, shared by every FileRecord with the same SHA-256.
+    Lives at UPLOAD_DIR/<path>; the blob GC deletes it once nothing has
+    referenced it for a while.
+    """
+    sha256: Indexed(str, unique=True)
+    path: str # Relative to UPLOAD_DIR
+    size: int
+    ref_count: int = 0 # FileRecords pointing at this blob
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    released_at: Optional[datetime] = None # When ref_count last dropped to 0
+
+    class Settings:
+        name = "file_blobs"
+        indexes = [
+            IndexModel([("ref_count", ASCENDING), ("released_at", ASCENDING)]),
+        ]
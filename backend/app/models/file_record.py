@@ -1,6 +1,7 @@
 from beanie import Document
 from datetime import datetime
 from typing import Optional
+from pydantic import Field
 
 class FileRecord(Document):
     owner_type: str # 'exam', 'consultation', 'prescription', 'user'
@@ -10,8 +11,10 @@ class FileRecord(Document):
     mime_type: str
     mime_type: str
     size: int
+    sha256: Optional[str] = None # Of the stored bytes, computed while uploading
     comment: Optional[str] = None
-    created_at: datetime = datetime.utcnow()
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    quarantined_at: Optional[datetime] = None # Orphaned; set by the file GC, deleted later if still orphaned
 
     class Settings:
         name = "files"
@@ -1,14 +1,15 @@
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId
 from datetime import datetime
 from typing import Optional
 from enum import Enum
+from app.models.sync import VersionedDocument
 
 class Species(str, Enum):
     DOG = "Perro"
     CAT = "Gato"
     OTHER = "Otro"
 
-class Patient(Document):
+class Patient(VersionedDocument):
     name: str
     species: str
     breed: str
@@ -1,8 +1,9 @@
-from beanie import Document
 from datetime import datetime
 from typing import Optional
+from pymongo import IndexModel, ASCENDING
+from app.models.sync import VersionedDocument
 
-class Product(Document):
+class Product(VersionedDocument):
     external_id: Optional[int] = None # ID from old system
     name: str
     sku: Optional[str] = None # UPC/EAN/ISBN
@@ -22,3 +23,10 @@ class Product(Document):
 
     class Settings:
         name = "products"
+        indexes = [
+            # Keys an upsert import matches on
+            IndexModel([("external_id", ASCENDING)]),
+            IndexModel([("sku", ASCENDING)]),
+            # Stock matrix pages by name
+            IndexModel([("is_active", ASCENDING), ("name", ASCENDING), ("_id", ASCENDING)]),
+        ]
@@ -1,7 +1,9 @@
-from beanie import Document, PydanticObjectId
+from beanie import PydanticObjectId, before_event, Insert
 from datetime import datetime, timezone
 from typing import List, Optional
 from pydantic import BaseModel, Field
+from pymongo import IndexModel, ASCENDING
+from app.models.sync import VersionedDocument
 
 class SaleItem(BaseModel):
     product_id: Optional[PydanticObjectId] = None
@@ -14,7 +16,7 @@ class SaleItem(BaseModel):
     professional_id: Optional[PydanticObjectId] = None # For Task 2 (Commissions)
     professional_name: Optional[str] = None
 
-class Sale(Document):
+class Sale(VersionedDocument):
     branch_id: PydanticObjectId
     customer_id: Optional[PydanticObjectId] = None # Tutor
     customer_name: Optional[str] = None # Populated manually
@@ -37,6 +39,22 @@ class Sale(Document):
 
     created_by: PydanticObjectId
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    receipt_number: Optional[str] = None # "Boleta N°" shown on receipts (last 8 hex of the id)
 
     class Settings:
         name = "sales"
+        indexes = [
+            IndexModel([("receipt_number", ASCENDING)]),
+            IndexModel([("updated_at", ASCENDING)]),
+        ]
+
+    @before_event(Insert)
+    def assign_receipt_number(self):
+        # Assign the id client side so the receipt number can be stored and indexed
+        if self.id is None:
+            self.id = PydanticObjectId()
+        if not self.receipt_number:
+            self.receipt_number = receipt_number_for(self.id)
+
+def receipt_number_for(sale_id) -> str:
+    return str(sale_id)[-8:].upper()
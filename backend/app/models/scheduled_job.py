@@ -0,0 +1,39 @@
+from beanie import Document, Indexed
+from datetime import datetime, timezone
+from typing import Any, Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING, DESCENDING
+
+class JobLease(Document):
+    """
+    One per scheduled job. Whoever holds the lease (locked_until in the future)
+    runs the job; `last_slot` records the schedule minute already claimed so a
+    second worker waking up in the same minute skips it.
+    """
+    name: Indexed(str, unique=True)
+    owner: Optional[str] = None
+    locked_until: Optional[datetime] = None
+    last_slot: Optional[str] = None
+    last_run_at: Optional[datetime] = None
+    last_status: Optional[str] = None
+
+    class Settings:
+        name = "job_leases"
+
+class JobRun(Document):
+    name: str
+    trigger: str = "schedule" # schedule, manual
+    status: str = "RUNNING" # RUNNING, SUCCESS, FAILED
+    owner: Optional[str] = None
+    started_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+    duration_ms: Optional[int] = None
+    result: Optional[Any] = None
+    error: Optional[str] = None
+    triggered_by: Optional[str] = None
+
+    class Settings:
+        name = "job_runs"
+        indexes = [
+            IndexModel([("name", ASCENDING), ("started_at", DESCENDING)]),
+        ]
@@ -1,8 +1,8 @@
-from beanie import Document
 from typing import Optional
 from datetime import datetime
+from app.models.sync import VersionedDocument
 
-class Service(Document):
+class Service(VersionedDocument):
     name: str
     price: float
     category: str  # Consulta, Vacuna, Cirugia, Examen, Otro
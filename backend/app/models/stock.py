@@ -1,15 +1,16 @@
-from beanie import Document, PydanticObjectId
-from datetime import datetime
+from beanie import PydanticObjectId
 from pymongo import IndexModel, ASCENDING
+from app.models.sync import VersionedDocument
 
-class Stock(Document):
+class Stock(VersionedDocument):
     branch_id: PydanticObjectId
     product_id: PydanticObjectId
     quantity: int = 0
-    updated_at: datetime = datetime.utcnow()
 
     class Settings:
         name = "stocks"
         indexes = [
-            IndexModel([("branch_id", ASCENDING), ("product_id", ASCENDING)], unique=True)
+            IndexModel([("branch_id", ASCENDING), ("product_id", ASCENDING)], unique=True),
+            # A product's stock across branches (stock matrix)
+            IndexModel([("product_id", ASCENDING), ("branch_id", ASCENDING)]),
         ]
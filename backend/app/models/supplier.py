@@ -1,8 +1,8 @@
-from beanie import Document
 from datetime import datetime
 from typing import Optional
+from app.models.sync import VersionedDocument
 
-class Supplier(Document):
+class Supplier(VersionedDocument):
     name: str
     contact_name: Optional[str] = None
     email: Optional[str] = None
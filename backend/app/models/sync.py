@@ -0,0 +1,75 @@
+from beanie import Document, PydanticObjectId, Indexed, before_event, after_event, Insert, Replace, Save, SaveChanges, Update, Delete
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import Field
+from pymongo import IndexModel, ASCENDING
+
+class VersionedDocument(Document):
+    """
+    Base for documents the frontend keeps in a local cache (GET /sync/{collection}).
+    Every write gets a new `version`, increasing per collection, and deletes
+    leave a Tombstone. Writes that bypass Beanie (raw motor updates,
+    insert_many) must set the fields themselves, see sync_service.version_stamp.
+    Writes to live collections are also pushed to GET /live/{branch_id}.
+    """
+    version: Indexed(int) = 0
+    updated_at: Optional[datetime] = None
+
+    @before_event(Insert, Replace, Save, SaveChanges)
+    async def stamp_version(self):
+        from app.services.sync_service import next_version
+        self.version = await next_version(self.get_settings().name)
+        self.updated_at = datetime.now(timezone.utc)
+
+    async def update(self, *args, **kwargs):
+        # set()/inc() and friends end up here; add the stamp to the same update
+        from beanie.odm.operators.update import BaseUpdateOperator
+        from app.services.sync_service import version_stamp
+        merged = {}
+        for arg in args:
+            expression = arg.query if isinstance(arg, BaseUpdateOperator) else arg
+            for operator, fields in expression.items():
+                merged.setdefault(operator, {}).update(fields)
+        merged.setdefault("$set", {}).update(await version_stamp(self.get_settings().name))
+        return await super().update(merged, **kwargs)
+
+    def _publish(self, action: str):
+        from app.services.live_events import publish_document
+        publish_document(self.get_settings().name, {**self.model_dump(), "_id": self.id}, action)
+
+    @after_event(Insert)
+    def publish_insert(self):
+        self._publish("created")
+
+    @after_event(Replace, Update)
+    def publish_update(self):
+        # save() and save_changes() go through update()
+        self._publish("updated")
+
+    @after_event(Delete)
+    async def leave_tombstone(self):
+        from app.services.sync_service import record_tombstones
+        await record_tombstones(self.get_settings().name, [self.id])
+        self._publish("deleted")
+
+class Tombstone(Document):
+    """A deleted VersionedDocument, so synced clients drop it from their cache."""
+    collection: str
+    doc_id: PydanticObjectId
+    version: int
+    deleted_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "tombstones"
+        indexes = [
+            IndexModel([("collection", ASCENDING), ("version", ASCENDING)]),
+        ]
+
+class SyncCounter(Document):
+    """Per-collection version counter. Tokens older than reset_before must resync from scratch."""
+    id: str # Collection name
+    seq: int = 0
+    reset_before: int = 0
+
+    class Settings:
+        name = "sync_counters"
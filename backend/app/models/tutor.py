@@ -1,8 +1,8 @@
-from beanie import Document
 from datetime import datetime
 from typing import Optional
+from app.models.sync import VersionedDocument
 
-class Tutor(Document):
+class Tutor(VersionedDocument):
     first_name: str
     last_name: str
     phone: str
@@ -0,0 +1,23 @@
+from beanie import Document, PydanticObjectId, Indexed
+from datetime import datetime, timezone
+from typing import Optional
+from pydantic import Field
+
+class TutorSummary(Document):
+    """
+    Per-tutor counters for the client profile, kept up to date by the sale, void,
+    consultation and debt payment paths (see app/services/tutor_summary_service.py).
+    """
+    tutor_id: Indexed(PydanticObjectId, unique=True)
+    visits: int = 0 # Every consultation of the tutor's patients
+    attended: int = 0
+    no_shows: int = 0
+    last_visit: Optional[datetime] = None
+    total_spent: float = 0.0 # COMPLETED sales only
+    total_purchases: int = 0
+    last_purchase: Optional[datetime] = None
+    debt: float = 0.0
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+    class Settings:
+        name = "tutor_summaries"
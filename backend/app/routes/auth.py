@@ -424,7 +424,7 @@ async def forgot_password(request: Request, data: ForgotPasswordRequest):
     
     # Send Email
     try:
-        from app.services.email import send_email_sync
+        from app.services.email_outbox import enqueue_email
         from app.services.templates import get_email_template
 
         subject = "Restablecimiento de Contraseña - CalFer"
@@ -445,7 +445,7 @@ async def forgot_password(request: Request, data: ForgotPasswordRequest):
         
         html_body = get_email_template("Recuperar Acceso", html_content)
         
-        send_email_sync(
+        await enqueue_email(
             to_email=user.email,
             subject=subject,
             body=body,
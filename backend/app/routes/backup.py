@@ -1,8 +1,13 @@
+import os
+import re
 from fastapi import APIRouter, HTTPException, Depends
-from typing import Annotated
+from typing import Annotated, Optional
+from pydantic import BaseModel
+from app.core.config import settings
 from app.models.user import User
 from app.routes.auth import get_current_user
-from app.services.backup_service import perform_backup, get_latest_backup_status
+from app.services.backup_service import BACKUP_DIR, backup_chain, get_latest_backup_status, read_backup_metadata
+from app.services.job_queue import submit_job
 
 router = APIRouter()
 
@@ -14,13 +19,66 @@ async def backup_status(current_user: Annotated[User, Depends(get_current_user)]
     status = await get_latest_backup_status()
     return status or {"message": "No hay respaldos registrados"}
 
-@router.post("/run")
-async def run_backup(current_user: Annotated[User, Depends(get_current_user)]):
+@router.post("/run", status_code=202)
+async def run_backup(current_user: Annotated[User, Depends(get_current_user)], incremental: bool = False):
     if "admin" not in current_user.roles and "superadmin" not in current_user.roles:
         raise HTTPException(status_code=403, detail="No autorizado")
     
-    status = await perform_backup()
-    if not status["success"]:
-        raise HTTPException(status_code=500, detail=f"Error en respaldo: {status['error']}")
-    
-    return {"message": "Respaldo completado exitosamente", "details": status}
+    # Runs in the job workers; poll GET /jobs/{job_id}
+    job = await submit_job("backup", {"incremental": incremental}, user=current_user)
+    return {"message": "Respaldo en curso", "job_id": str(job.id), "status": job.status}
+
+@router.get("/list")
+async def list_backups(current_user: Annotated[User, Depends(get_current_user)]):
+    if "admin" not in current_user.roles and "superadmin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+    if not os.path.exists(BACKUP_DIR):
+        return []
+    result = []
+    for name in sorted(os.listdir(BACKUP_DIR), reverse=True):
+        meta = read_backup_metadata(name) if name.startswith("backup_") else None
+        if meta is None:
+            continue
+        result.append({
+            "name": name,
+            "type": meta.get("type", "full"),
+            "parent": meta.get("parent"),
+            "success": meta.get("success", False),
+            "restorable": meta.get("success", False),
+            "collections": len(meta.get("collections", [])),
+            "size_kb": round(sum(c.get("size_kb", 0) for c in meta.get("collections", [])), 1),
+        })
+    return result
+
+class RestoreRequest(BaseModel):
+    backup: str
+    target_db: Optional[str] = None # Default: <DB_NAME>_restore
+    confirm_overwrite: bool = False # Required to restore over the live database
+
+@router.post("/restore", status_code=202)
+async def restore(data: RestoreRequest, current_user: Annotated[User, Depends(get_current_user)]):
+    if "admin" not in current_user.roles and "superadmin" not in current_user.roles:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+    target_db = data.target_db or f"{settings.DB_NAME}_restore"
+    if not re.fullmatch(r"[A-Za-z0-9_-]{1,63}", target_db):
+        raise HTTPException(status_code=400, detail="Nombre de base de datos inválido")
+    if target_db == settings.DB_NAME and not data.confirm_overwrite:
+        raise HTTPException(status_code=400, detail="Restaurar sobre la base de datos en uso requiere confirm_overwrite")
+    try:
+        backup_chain(data.backup)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    job = await submit_job("restore", {"backup": data.backup, "target_db": target_db}, user=current_user)
+
+    from app.services.activity_service import log_activity
+    await log_activity(
+        user=current_user,
+        action_type="BACKUP_RESTORE",
+        description=f"Restauración de {data.backup} en {target_db}",
+        reference_id=str(job.id)
+    )
+
+    return {"message": "Restauración en curso", "job_id": str(job.id), "status": job.status, "target_db": target_db}
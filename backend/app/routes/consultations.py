@@ -1,12 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, BackgroundTasks, Query
 from typing import List, Optional
-from datetime import datetime
+from datetime import datetime, date
 from app.models.consultation import Consultation
 from app.models.patient import Patient
 from app.models.tutor import Tutor
 from app.routes.auth import get_current_user
 from app.services.file_service import save_upload_file
-from app.services.email import send_email_sync
+from app.services.email_outbox import enqueue_email
+from app.core.config import settings
 from pydantic import BaseModel
 from beanie import PydanticObjectId
 
@@ -44,6 +45,39 @@ class ConsultationUpdate(BaseModel):
     reference_sale_id: Optional[str] = None
 
 from app.services.templates import get_email_template
+from app.services import availability_service
+
+@router.get("/availability")
+async def get_availability(
+    date: date,
+    days: int = Query(1, ge=1, le=14), # 7 for a week view
+    branch_id: Optional[str] = None,
+    appointment_type: str = "VET",
+    staff_id: Optional[str] = None,
+    step_minutes: Optional[int] = Query(None, ge=5, le=240),
+    user = Depends(get_current_user)
+):
+    """Free slots per day within opening hours (VetSettings.schedule, clinic timezone)."""
+    return {
+        "timezone": settings.CLINIC_TIMEZONE,
+        "slot_minutes": availability_service.duration_of(appointment_type),
+        "days": await availability_service.free_slots(
+            date,
+            days=days,
+            branch_id=branch_id,
+            appointment_type=appointment_type,
+            staff_id=staff_id,
+            step_minutes=step_minutes
+        )
+    }
+
+def _conflict_error(conflicts):
+    kinds = {key[0] for key in conflicts}
+    who = "El profesional asignado" if "staff" in kinds else "La sucursal"
+    return HTTPException(status_code=409, detail=f"Horario no disponible: {who} ya tiene una cita a esa hora.")
+
+def _busy_error():
+    return HTTPException(status_code=409, detail="Otra reserva para el mismo horario está en curso. Intenta de nuevo.")
 
 @router.post("/", response_model=Consultation)
 async def create_consultation(
@@ -65,7 +99,25 @@ async def create_consultation(
         con_data['date'] = datetime.utcnow()
         
     new_con = Consultation(**con_data)
-    await new_con.insert()
+    # Check and insert under the resources' leases so concurrent bookings can't both take the slot
+    keys = []
+    if new_con.status == "scheduled":
+        keys = availability_service.resources_of(new_con.branch_id, new_con.appointment_type, new_con.assigned_staff_id)
+    try:
+        async with availability_service.booking_lock(keys):
+            if keys:
+                conflicts = await availability_service.find_conflicts(
+                    new_con.date, new_con.branch_id, new_con.appointment_type, new_con.assigned_staff_id
+                )
+                if conflicts:
+                    raise _conflict_error(conflicts)
+            await new_con.insert()
+    except availability_service.BookingBusy:
+        raise _busy_error()
+    availability_service.index_consultation(new_con)
+
+    from app.services.tutor_summary_service import on_consultation_created
+    await on_consultation_created(new_con)
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -168,8 +220,7 @@ Si tienes alguna pregunta, no dudes en contactarnos vía WhatsApp o llamando al:
             
             html_body = get_email_template("Reserva Confirmada", html_content, phone=branch_phone)
             
-            print(f"DEBUG: Sending email synchronously to {tutor.email}")
-            send_email_sync(tutor.email, subject, body, html_body)
+            await enqueue_email(tutor.email, subject, body, html_body)
         else:
             print(f"DEBUG: Tutor not found or no email. Tutor: {tutor}, Email: {tutor.email if tutor else 'None'}")
     except Exception as e:
@@ -195,6 +246,7 @@ async def update_consultation(
         raise HTTPException(status_code=404, detail="Consultation not found")
 
     old_date = con.date
+    old_status = con.status
     update_data = data.model_dump(exclude_unset=True)
     
     # Logic: Grooming Check
@@ -206,7 +258,32 @@ async def update_consultation(
              if not has_sale:
                  raise HTTPException(status_code=400, detail="Grooming appointments require a Sale before finishing.")
 
-    await con.set(update_data)
+    slot_fields = ("date", "branch_id", "appointment_type", "assigned_staff_id", "status")
+    slot = (
+        update_data.get("date", con.date),
+        update_data.get("branch_id", con.branch_id),
+        update_data.get("appointment_type", con.appointment_type),
+        update_data.get("assigned_staff_id", con.assigned_staff_id),
+    )
+    keys = []
+    if any(f in update_data for f in slot_fields) and update_data.get("status", con.status) == "scheduled":
+        keys = availability_service.resources_of(*slot[1:])
+    try:
+        async with availability_service.booking_lock(keys):
+            if keys:
+                conflicts = await availability_service.find_conflicts(*slot, exclude_id=con.id)
+                if conflicts:
+                    raise _conflict_error(conflicts)
+            if "date" in update_data and update_data["date"] != old_date:
+                # Rescheduled: the reminder for the new date is still to be sent
+                update_data["reminder_sent_at"] = None
+            await con.set(update_data)
+    except availability_service.BookingBusy:
+        raise _busy_error()
+    availability_service.index_consultation(con)
+
+    from app.services.tutor_summary_service import on_consultation_status_changed
+    await on_consultation_status_changed(con, old_status)
     
     # Check if date was updated and is different AND notification is requested
     if notify_tutor and data.date and data.date != old_date:
@@ -259,8 +336,7 @@ async def update_consultation(
 # In update_consultation:
                     html_body = get_email_template("Cita Reagendada", html_content, phone=branch_phone)
                     
-                    print(f"DEBUG: Sending reschedule email synchronously to {tutor.email}")
-                    send_email_sync(tutor.email, subject, body, html_body)
+                    await enqueue_email(tutor.email, subject, body, html_body)
                 else:
                     print("DEBUG: Reschedule - Tutor/Email missing")
         except Exception as e:
@@ -281,6 +357,13 @@ async def delete_consultation(id: str, user = Depends(get_current_user)):
     date_str = con.date.strftime('%d/%m/%Y') if con.date else "N/A"
     
     await con.delete()
+    availability_service.unindex_consultation(con.id)
+
+    from app.services.file_service import release_owner_files
+    await release_owner_files("consultation", str(con.id))
+
+    from app.services.tutor_summary_service import on_consultation_deleted
+    await on_consultation_deleted(con)
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -350,20 +433,12 @@ async def delete_consultation_file(id: str, file_id: str, user = Depends(get_cur
         con.file_ids.remove(file_id)
         await con.save()
         
-        # Determine if we should delete the actual file record and file from disk
-        # Ideally, yes.
+        # Delete the record; the stored blob goes once no other record uses it
         from app.models.file_record import FileRecord
-        import os
-        from app.core.config import settings
+        from app.services.file_service import release_file
         
         file_record = await FileRecord.get(file_id)
         if file_record:
-            file_path = os.path.join(settings.UPLOAD_DIR, file_record.path)
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                except Exception as e:
-                    print(f"Error deleting file from disk: {e}")
-            await file_record.delete()
+            await release_file(file_record)
 
     return {"message": "File deleted"}
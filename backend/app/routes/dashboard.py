@@ -1,5 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
 from datetime import datetime, timedelta
+from typing import List, Optional
+from beanie import PydanticObjectId
 from app.models.patient import Patient
 from app.models.tutor import Tutor
 from app.models.consultation import Consultation
@@ -14,8 +16,7 @@ async def get_dashboard_stats(user = Depends(get_current_user)):
     total_tutors = await Tutor.count()
     
     # Consultations today
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
+    today_start, today_end = _today_range()
     
     consultations_today = await Consultation.find(
         Consultation.date >= today_start,
@@ -28,107 +29,129 @@ async def get_dashboard_stats(user = Depends(get_current_user)):
         "consultations_today": consultations_today
     }
 
+# --- Consultation events ---
+# Calendar, today and upcoming share one aggregation: an indexed range match on
+# consultations, $lookup of just the patient/branch fields needed, and a $project
+# straight into the response shape (no per-row Patient.get / Branch.get).
+
+ISO_UTC = "%Y-%m-%dT%H:%M:%S.%LZ"
+EVENT_MINUTES = 30
+
+_patient_name = {"$arrayElemAt": ["$patient.name", 0]}
+_patient_species = {"$ifNull": [{"$arrayElemAt": ["$patient.species", 0]}, ""]}
+
+EVENT_FIELDS = {
+    "id": {"$toString": "$_id"},
+    "title": {"$cond": [
+        {"$gt": [{"$size": "$patient"}, 0]},
+        {"$concat": [{"$ifNull": [_patient_name, ""]}, " (", _patient_species, ")"]},
+        "Desconocido"
+    ]},
+    "start": {"$dateToString": {"date": "$date", "format": ISO_UTC}},
+    "end": {"$dateToString": {"date": {"$add": ["$date", EVENT_MINUTES * 60 * 1000]}, "format": ISO_UTC}},
+    "date": {"$dateToString": {"date": "$date", "format": ISO_UTC}},
+    "reason": "$reason",
+    "status": "$status",
+    "appointment_type": "$appointment_type",
+    "patient_id": {"$toString": "$patient_id"},
+    "patient_name": {"$ifNull": [_patient_name, "Desconocido"]},
+    "patient_species": _patient_species,
+    "branch_id": {"$cond": [{"$ifNull": ["$branch_id", False]}, {"$toString": "$branch_id"}, None]},
+    "branch_name": {"$ifNull": [{"$arrayElemAt": ["$branch.name", 0]}, "Sucursal Desconocida"]},
+}
+
+CALENDAR_FIELDS = ["id", "title", "start", "end", "reason", "patient_id", "branch_name", "branch_id"]
+SUMMARY_FIELDS = ["id", "date", "reason", "patient_name", "patient_species"]
+
+PATIENT_FIELDS = {"title", "patient_name", "patient_species"}
+BRANCH_FIELDS = {"branch_name"}
+
+async def fetch_consultation_events(
+    match: dict,
+    fields: List[str],
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> List[dict]:
+    pipeline = [{"$match": match}, {"$sort": {"date": 1}}]
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit:
+        pipeline.append({"$limit": limit})
+
+    # Join only what the requested fields need, projected down to the used keys
+    if PATIENT_FIELDS.intersection(fields):
+        pipeline.append({"$lookup": {
+            "from": "patients",
+            "let": {"pid": "$patient_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$pid"]}}},
+                {"$project": {"name": 1, "species": 1}}
+            ],
+            "as": "patient"
+        }})
+    if BRANCH_FIELDS.intersection(fields):
+        pipeline.append({"$lookup": {
+            "from": "branches",
+            "let": {"bid": "$branch_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$bid"]}}},
+                {"$project": {"name": 1}}
+            ],
+            "as": "branch"
+        }})
+
+    projection = {"_id": 0}
+    for f in fields:
+        projection[f] = EVENT_FIELDS[f]
+    pipeline.append({"$project": projection})
+
+    return await Consultation.get_motor_collection().aggregate(pipeline).to_list(length=None)
+
+def _today_range():
+    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today_start, today_start + timedelta(days=1)
+
 @router.get("/today")
 async def get_today_consultations(user = Depends(get_current_user)):
-    # Start and end of today
-    today_start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
-    today_end = today_start + timedelta(days=1)
-    
-    consultations = await Consultation.find(
-        Consultation.date >= today_start,
-        Consultation.date < today_end
-    ).sort("date").to_list()
-    
-    result = []
-    result = []
-    for c in consultations:
-        patient = await Patient.get(c.patient_id)
-        
-        # Ensure UTC timezone is indicated
-        date_str = c.date.isoformat() + 'Z' if c.date.tzinfo is None else c.date.isoformat()
-
-        result.append({
-            "id": str(c.id),
-            "date": date_str,
-            "reason": c.reason,
-            "patient_name": patient.name if patient else "Desconocido",
-            "patient_species": patient.species if patient else ""
-        })
-        
-    return result
+    today_start, today_end = _today_range()
+    return await fetch_consultation_events(
+        {"date": {"$gte": today_start, "$lt": today_end}},
+        SUMMARY_FIELDS
+    )
 
 @router.get("/upcoming")
 async def get_upcoming_consultations(limit: int = 5, user = Depends(get_current_user)):
-    now = datetime.utcnow()
-    # Fetch upcoming consultations
-    consultations = await Consultation.find(
-        Consultation.date >= now
-    ).sort("date").limit(limit).to_list()
-    
-    # Enrich with patient data
-    result = []
-    for c in consultations:
-        patient = await Patient.get(c.patient_id)
-        
-        # Ensure UTC timezone is indicated
-        date_str = c.date.isoformat() + 'Z' if c.date.tzinfo is None else c.date.isoformat()
-        
-        result.append({
-            "id": str(c.id),
-            "date": date_str,
-            "reason": c.reason,
-            "patient_name": patient.name if patient else "Desconocido",
-            "patient_species": patient.species if patient else ""
-        })
-        
-    return result
-
-from app.models.branch import Branch
-from typing import Optional
+    return await fetch_consultation_events(
+        {"date": {"$gte": datetime.utcnow()}},
+        SUMMARY_FIELDS,
+        limit=limit
+    )
 
 @router.get("/calendar")
 async def get_calendar_events(
     start: datetime,
     end: datetime,
     appointment_type: str = None,
-    branch_id: Optional[str] = None,
+    branch_id: Optional[str] = None, # One id or a comma separated list
+    fields: Optional[str] = None, # e.g. "id,start,end,title"
+    limit: int = Query(2000, ge=1, le=5000),
+    skip: int = Query(0, ge=0),
     user = Depends(get_current_user)
 ):
-    query = [
-        Consultation.date >= start,
-        Consultation.date <= end
-    ]
-    
-    if appointment_type:
-        query.append(Consultation.appointment_type == appointment_type)
-    
+    match = {}
     if branch_id:
-        query.append(Consultation.branch_id == branch_id)
-        
-    consultations = await Consultation.find(*query).to_list()
-    
-    events = []
-    for c in consultations:
-        patient = await Patient.get(c.patient_id)
-        branch = await Branch.get(c.branch_id) if c.branch_id else None
-        
-        # Ensure UTC timezone is indicated if naive
-        start_date = c.date
-        end_date = c.date + timedelta(minutes=30)
-        
-        # If naive, assume UTC and append Z. If aware, isoformat will include offset.
-        start_str = start_date.isoformat() + 'Z' if start_date.tzinfo is None else start_date.isoformat()
-        end_str = end_date.isoformat() + 'Z' if end_date.tzinfo is None else end_date.isoformat()
-
-        events.append({
-            "id": str(c.id),
-            "title": f"{patient.name} ({patient.species.value if hasattr(patient.species, 'value') else patient.species})" if patient else "Desconocido",
-            "start": start_str,
-            "end": end_str, 
-            "reason": c.reason,
-            "patient_id": str(c.patient_id),
-            "branch_name": branch.name if branch else "Sucursal Desconocida",
-            "branch_id": str(c.branch_id) if c.branch_id else None
-        })
-        
-    return events
+        parts = [b.strip() for b in branch_id.split(",") if b.strip()]
+        if not parts or not all(PydanticObjectId.is_valid(b) for b in parts):
+            raise HTTPException(status_code=400, detail="Sucursal inválida")
+        branch_ids = [PydanticObjectId(b) for b in parts]
+        match["branch_id"] = branch_ids[0] if len(branch_ids) == 1 else {"$in": branch_ids}
+    match["date"] = {"$gte": start, "$lte": end}
+    if appointment_type:
+        match["appointment_type"] = appointment_type
+
+    selected = CALENDAR_FIELDS
+    if fields:
+        requested = [f.strip() for f in fields.split(",")]
+        selected = ["id"] + [f for f in requested if f in EVENT_FIELDS and f != "id"]
+
+    return await fetch_consultation_events(match, selected, skip=skip, limit=limit)
@@ -1,6 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.encoders import jsonable_encoder
-from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from datetime import datetime, timedelta
 from app.models.delivery import DeliveryOrder
 from app.routes.auth import get_current_user
 from app.models.user import User
@@ -12,36 +11,115 @@ from pydantic import BaseModel
 
 router = APIRouter()
 
-@router.get("/", response_model=List[DeliveryOrder])
-async def get_deliveries(status: str = None, user: User = Depends(get_current_user)):
-    query = DeliveryOrder.find_all()
-    
-    # If delivery role, maybe only show assigned or unassigned?
-    # Prompt: "Repartidor ve pedidos asingados"
+# Statuses the board shows unless asked otherwise
+ACTIVE_STATUSES = ["PENDING", "ASSIGNED", "IN_TRANSIT"]
+# DELIVERED/FAILED orders are listed this far back when no date range is given
+CLOSED_DAYS = 7
+# Sale fields the board shows; the rest of the sale stays in the database
+SALE_SUMMARY = {"_id": 0, "total": 1, "status": 1, "customer_name": 1, "receipt_number": 1,
+                "items.name": 1, "items.quantity": 1, "items.unit_price": 1}
+
+async def _board_orders(match: Dict, limit: int) -> List[Dict]:
+    """Delivery orders newest first, each with a summary of its sale."""
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"created_at": -1, "_id": -1}},
+        {"$limit": limit},
+        {"$lookup": {
+            "from": "sales",
+            "let": {"sid": "$sale_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$_id", "$$sid"]}}},
+                {"$project": SALE_SUMMARY},
+            ],
+            "as": "sale",
+        }},
+        {"$addFields": {"sale_details": {"$arrayElemAt": ["$sale", 0]}}},
+        {"$project": {"sale": 0}},
+    ]
+    orders = await DeliveryOrder.get_motor_collection().aggregate(pipeline).to_list(None)
+    for order in orders:
+        sale = order.get("sale_details")
+        # Populate customer name if missing in snapshot but present in sale
+        if sale and not order.get("customer_snapshot") and sale.get("customer_name"):
+            order["customer_snapshot"] = {"name": sale["customer_name"]}
+    return orders
+
+def _courier_scope(user: User) -> Optional[Dict]:
+    """Couriers see what is assigned to them and what is still up for grabs."""
     if "delivery" in user.roles and "admin" not in user.roles:
-        # Show assigned to ME or PENDING (to pick up?) - usually assigned.
-        # "asignación y estados para repartidor".
-        query = query.find({"$or": [{"assigned_user_id": user.id}, {"status": "PENDING"}]}) 
-    elif status:
-        query = query.find(DeliveryOrder.status == status)
-        
-    deliveries = await query.sort("-created_at").to_list()
-    
-    # Populate Sale Info manually (Beanie doesn't define relations automatically unless configured)
-    results = []
-    for d in deliveries:
-        d_dict = d.dict()
-        if d.sale_id:
-            sale = await Sale.get(d.sale_id)
-            if sale:
-                # Add sale details to the response dict check
-                d_dict['sale_details'] = jsonable_encoder(sale)
-                # Populate customer name if missing in snapshot but present in sale
-                if not d.customer_snapshot and sale.customer_name:
-                     d_dict['customer_snapshot'] = {"name": sale.customer_name}
-        results.append(d_dict)
-
-    return results
+        return {"$or": [{"assigned_user_id": user.id}, {"status": "PENDING"}]}
+    return None
+
+@router.get("/", response_model=List[DeliveryOrder])
+async def get_deliveries(
+    response: Response,
+    status: Optional[str] = None, # One status or a comma separated list; default: the active ones
+    branch_id: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    cursor: Optional[str] = None, # X-Next-Cursor of the previous page
+    limit: int = Query(50, ge=1, le=200),
+    user: User = Depends(get_current_user)
+):
+    """
+    One page of the delivery board, newest first. Each order carries a summary
+    of its sale in sale_details. While X-Next-Cursor is set there are more
+    orders: pass it back as `cursor`. Status changes after loading arrive on
+    GET /live/{branch_id} as "delivery" events.
+    """
+    statuses = [s.strip() for s in status.split(",") if s.strip()] if status else ACTIVE_STATUSES
+    conditions = [{"status": {"$in": statuses}}]
+    if branch_id:
+        if not PydanticObjectId.is_valid(branch_id):
+            raise HTTPException(status_code=400, detail="Sucursal inválida")
+        conditions.append({"branch_id": PydanticObjectId(branch_id)})
+
+    if date_from is None and date_to is None and not set(statuses) <= set(ACTIVE_STATUSES):
+        date_from = datetime.utcnow() - timedelta(days=CLOSED_DAYS)
+    created = {}
+    if date_from:
+        created["$gte"] = date_from
+    if date_to:
+        created["$lt"] = date_to
+    if created:
+        conditions.append({"created_at": created})
+
+    scope = _courier_scope(user)
+    if scope:
+        conditions.append(scope)
+
+    if cursor:
+        last = await DeliveryOrder.get_motor_collection().find_one(
+            {"_id": PydanticObjectId(cursor)} if PydanticObjectId.is_valid(cursor) else {"_id": None},
+            {"created_at": 1}
+        )
+        if not last:
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        conditions.append({"$or": [
+            {"created_at": {"$lt": last["created_at"]}},
+            {"created_at": last["created_at"], "_id": {"$lt": last["_id"]}},
+        ]})
+
+    orders = await _board_orders({"$and": conditions}, limit + 1)
+    if len(orders) > limit:
+        orders = orders[:limit]
+        response.headers["X-Next-Cursor"] = str(orders[-1]["_id"])
+    return orders
+
+@router.get("/{id}", response_model=DeliveryOrder)
+async def get_delivery(id: str, user: User = Depends(get_current_user)):
+    """One board entry, e.g. for an order announced by a live "created" event."""
+    if not PydanticObjectId.is_valid(id):
+        raise HTTPException(status_code=404, detail="Order not found")
+    match = {"_id": PydanticObjectId(id)}
+    scope = _courier_scope(user)
+    if scope:
+        match = {"$and": [match, scope]}
+    orders = await _board_orders(match, 1)
+    if not orders:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return orders[0]
 
 @router.put("/{id}/status", response_model=DeliveryOrder)
 async def update_delivery_status(id: str, status: str, user: User = Depends(get_current_user)):
@@ -62,6 +140,9 @@ async def update_delivery_status(id: str, status: str, user: User = Depends(get_
         if sale and sale.status == "PENDING_DELIVERY":
             sale.status = "COMPLETED"
             await sale.save()
+
+            from app.services.tutor_summary_service import on_sale_completed
+            await on_sale_completed(sale)
             
     return order
 
@@ -119,12 +200,19 @@ async def delete_delivery(id: str, user: User = Depends(get_current_user)):
                         )
                         await mov.insert()
             
+            previous_status = sale.status
             sale.status = "VOIDED"
             sale.voided_by = user.id
             sale.voided_at = datetime.utcnow()
             sale.void_reason = "Despacho Cancelado"
             await sale.save()
 
+            from app.services.debt_service import reverse_sale_debt
+            await reverse_sale_debt(sale, user=user, note=sale.void_reason)
+
+            from app.services.tutor_summary_service import on_sale_voided
+            await on_sale_voided(sale, previous_status)
+
     await order.delete()
     
     # Log Activity
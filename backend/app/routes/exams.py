@@ -4,7 +4,7 @@ from datetime import datetime
 from app.models.exam import Exam
 from app.models.patient import Patient
 from app.routes.auth import get_current_user
-from app.services.file_service import save_upload_file
+from app.services.file_service import save_upload_file, release_owner_files
 from pydantic import BaseModel
 from beanie import PydanticObjectId
 
@@ -127,6 +127,7 @@ async def delete_exam(id: str, user = Depends(get_current_user)):
     
     exam_type = exam.type
     await exam.delete()
+    await release_owner_files("exam", str(exam.id))
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -1,20 +1,109 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from fastapi.responses import FileResponse
+from typing import Dict, Optional
 from app.models.file_record import FileRecord
 from app.routes.auth import get_current_user
 from app.core.config import settings
+from app.services import preview_service
+from app.services.file_service import get_file_record, forget_file_record, is_content_addressed
+from urllib.parse import quote
 import os
 
 router = APIRouter()
 
-@router.get("/{id}")
-async def get_file(id: str):
-    file_record = await FileRecord.get(id)
+# Blob contents never change (the path is their hash), so browsers may keep
+# them for a year without revalidating. Private: these are patient records.
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+def _send(path: str, filename: str, media_type: str, headers: Dict[str, str], inline: bool = False) -> Response:
+    """
+    Streams the file, or with FILE_SERVING=nginx|sendfile hands the transfer
+    to the reverse proxy so the worker is free as soon as the request is
+    authorized. The proxy then serves ranges and the body itself.
+    """
+    mode = settings.FILE_SERVING
+    if mode not in ("nginx", "sendfile"):
+        return FileResponse(path, filename=filename, media_type=media_type, headers=headers,
+                            content_disposition_type="inline" if inline else "attachment")
+
+    # Reuse FileResponse's Content-Disposition (RFC 5987 for non-ASCII names)
+    disposition = FileResponse(path, filename=filename, content_disposition_type="inline" if inline else "attachment").headers["content-disposition"]
+    headers = {**headers, "Content-Disposition": disposition}
+    if mode == "nginx":
+        relative = os.path.relpath(path, settings.UPLOAD_DIR).replace(os.sep, "/")
+        headers["X-Accel-Redirect"] = settings.FILE_ACCEL_PREFIX.rstrip("/") + "/" + quote(relative)
+    else:
+        headers["X-Sendfile"] = os.path.abspath(path)
+    return Response(media_type=media_type, headers=headers)
+
+def _validators(file_record: FileRecord, suffix: str = "") -> Dict[str, str]:
+    """Strong ETag and caching headers; files stored before hashing keep Starlette's mtime/size ETag."""
+    if not file_record.sha256:
+        return {}
+    headers = {"ETag": f'"{file_record.sha256}{suffix}"'}
+    if is_content_addressed(file_record):
+        headers["Cache-Control"] = IMMUTABLE
+    return headers
+
+@router.post("/gc", status_code=202)
+async def run_file_gc(dry_run: bool = True, mode: Optional[str] = None, user = Depends(get_current_user)):
+    if "admin" not in user.roles and "superadmin" not in user.roles:
+        raise HTTPException(status_code=403, detail="No autorizado")
+    if mode not in (None, "quarantine", "delete"):
+        raise HTTPException(status_code=400, detail="mode debe ser quarantine o delete")
+
+    # Runs in the job workers; the report is in GET /jobs/{job_id}
+    from app.services.job_queue import submit_job
+    job = await submit_job("file_gc", {"dry_run": dry_run, "mode": mode}, user=user)
+    return {"message": "Revisión de archivos en curso", "job_id": str(job.id), "status": job.status}
+
+@router.api_route("/{id}", methods=["GET", "HEAD"])
+async def get_file(id: str, request: Request, variant: Optional[str] = None):
+    file_record = await get_file_record(id)
     if not file_record:
         raise HTTPException(status_code=404, detail="File not found")
+
+    fmt = None
+    headers = {}
+    if variant:
+        if variant not in preview_service.VARIANTS:
+            raise HTTPException(status_code=400, detail=f"Unknown variant (use {', '.join(preview_service.VARIANTS)})")
+        fmt = preview_service.pick_format(request.headers.get("accept"))
+        headers["Vary"] = "Accept"
+    headers.update(_validators(file_record, f"-{variant}-{fmt}" if variant else ""))
+
+    # Re-opening a file the browser already has: answer from metadata alone
+    if "ETag" in headers and _etag_matches(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
     
     file_path = os.path.join(settings.UPLOAD_DIR, file_record.path)
     if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
-        
-    return FileResponse(file_path, filename=file_record.original_name, media_type=file_record.mime_type)
+        # The cached record may be stale (moved by migrate_files_to_blobs.py, or deleted)
+        forget_file_record(id)
+        file_record = await get_file_record(id)
+        if not file_record:
+            raise HTTPException(status_code=404, detail="File not found")
+        file_path = os.path.join(settings.UPLOAD_DIR, file_record.path)
+        if not os.path.exists(file_path):
+            raise HTTPException(status_code=404, detail="File not found on disk")
+
+    if variant:
+        # ?variant=thumb|preview: a small JPEG/WebP rendering, cached next to the file
+        preview_path = await preview_service.get_variant(file_record, variant, fmt)
+        if not preview_path:
+            raise HTTPException(status_code=404, detail="Preview not available")
+        name = os.path.splitext(file_record.original_name)[0]
+        return _send(preview_path, f"{name}.{variant}.{fmt}", preview_service.media_type(fmt), headers, inline=True)
+
+    # FileResponse answers Range / If-Range requests (PDF viewers fetch pages
+    # on demand) and uses our ETag for If-Range
+    return _send(file_path, file_record.original_name, file_record.mime_type, headers)
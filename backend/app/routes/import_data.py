@@ -1,354 +1,72 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import csv
-from io import StringIO
-from typing import List, Optional
-from app.models.tutor import Tutor
-from app.models.product import Product
-from app.models.supplier import Supplier
-from app.models.branch import Branch
-from app.models.stock import Stock
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from beanie import PydanticObjectId
+from app.services.job_queue import submit_job, JOBS_DIR
+from app.routes.auth import get_current_user
+from app.models.user import User
+import asyncio
+import os
 
 router = APIRouter()
 
-def parse_currency(value: str, is_percentage: bool = False) -> float:
-    if not value or str(value).strip() == "":
-        return 0.0
-    
-    # Remove symbols
-    clean_val = str(value).replace('$', '').replace('%', '').strip()
-    
-    # Handle thousands/decimal separators
-    # If there's a dot AND a comma, dot is thousands, comma is decimal
-    if '.' in clean_val and ',' in clean_val:
-        clean_val = clean_val.replace('.', '').replace(',', '.')
-    elif ',' in clean_val:
-        # If there's only a comma, it's likely decimal
-        clean_val = clean_val.replace(',', '.')
-    elif '.' in clean_val:
-        # If there's only a dot, it could be thousands (1.064) or decimal (1.5)
-        # In Chile, dots are typically thousands.
-        # But for small numbers (like 19.0 or 0.19), it's likely decimal.
-        parts = clean_val.split('.')
-        if not is_percentage and len(parts[-1]) == 3:
-            # Likely thousands separator: 1.064
-            clean_val = clean_val.replace('.', '')
-        else:
-            # Likely decimal or small number: 19.0 or 1.5
-            pass
+# Read the upload in chunks so large files are never held in memory at once
+UPLOAD_CHUNK = 1024 * 1024
 
-    try:
-        return float(clean_val)
-    except ValueError:
-        return 0.0
-
-def get_row_val(row: dict, *possible_keys: str) -> Optional[str]:
-    """Search for a value in a dictionary with case-insensitive and stripped keys."""
-    normalized_keys = [k.strip().lower() for k in possible_keys]
-    for key, value in row.items():
-        if key and key.strip().lower() in normalized_keys:
-            return str(value) if value is not None else None
-    return None
+async def _queue_import(kind: str, file: UploadFile, delete_existing: bool, user: User):
+    if not file.filename.endswith(".txt") and not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="El archivo debe ser .txt o .csv")
 
-@router.post("/tutors")
+    # Stage the upload next to the job so the worker (or a resumed run) can read it
+    job_id = PydanticObjectId()
+    job_dir = os.path.join(JOBS_DIR, str(job_id))
+    os.makedirs(job_dir, exist_ok=True)
+    path = os.path.join(job_dir, "input.csv")
+    out = await asyncio.to_thread(open, path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK):
+            await asyncio.to_thread(out.write, chunk)
+    finally:
+        await asyncio.to_thread(out.close)
+
+    job = await submit_job(
+        kind,
+        {"path": path, "filename": file.filename, "delete_existing": delete_existing},
+        user=user,
+        job_id=job_id
+    )
+    return {"job_id": str(job.id), "status": job.status, "message": "Importación en curso"}
+
+@router.post("/tutors", status_code=202)
 async def import_tutors(
     file: UploadFile = File(...),
-    delete_existing: bool = False
+    delete_existing: bool = False,
+    user: User = Depends(get_current_user)
 ):
-    if not file.filename.endswith(".txt") and not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser .txt o .csv")
-    
-    if delete_existing:
-        await Tutor.find_all().delete()
-
-    content = await file.read()
-    decoded = ""
-    for enc in ["utf-8-sig", "latin-1", "utf-8"]:
-        try:
-            decoded = content.decode(enc)
-            break
-        except:
-            continue
-    
-    if not decoded:
-        raise HTTPException(status_code=400, detail="No se pudo decodificar el archivo")
+    return await _queue_import("import_tutors", file, delete_existing, user)
 
-    # Detect delimiter
-    delimiter = ','
-    first_line = decoded.split('\n')[0]
-    if '\t' in first_line:
-        delimiter = '\t'
-    elif ';' in first_line:
-        delimiter = ';'
-
-    csv_reader = csv.DictReader(StringIO(decoded), delimiter=delimiter)
-    tutors_to_insert = []
-    
-    for row in csv_reader:
-        try:
-            # Clean row keys (handle BOM or invisible characters)
-            cleaned_row = {str(k).strip().lstrip('\ufeff'): v for k, v in row.items() if k is not None}
-            
-            first_name = get_row_val(cleaned_row, "Nombre", "first_name", "FirstName") or ""
-            last_name = get_row_val(cleaned_row, "Apellidos", "last_name", "LastName") or ""
-            full_name = get_row_val(cleaned_row, "full_name", "Nombre Completo") or f"{first_name} {last_name}".strip()
-            
-            if not first_name and not last_name and not full_name:
-                continue
-
-            phone = get_row_val(cleaned_row, "Teléfono", "phone", "Telefono", "Celular") or ""
-            email = get_row_val(cleaned_row, "Email", "email", "Correo")
-            
-            # Clean email and phone
-            if email: email = email.strip()
-            if not email: email = None
-            
-            if phone: phone = phone.strip()
-            
-            raw_total_spent = get_row_val(cleaned_row, "Total gastado", "total_spent", "Gasto")
-            total_spent_val = parse_currency(raw_total_spent) if raw_total_spent else 0.0
-            
-            notes = f"Importado. Gasto Histórico: {raw_total_spent}" if raw_total_spent else ""
-            
-            tutor = Tutor(
-                first_name=first_name if first_name else full_name,
-                last_name=last_name if last_name else "",
-                phone=phone,
-                email=email,
-                notes=notes,
-                discount_percent=0.0,
-                total_spent=total_spent_val,
-                is_tutor=False,
-                is_client=True
-            )
-            tutors_to_insert.append(tutor)
-        except Exception as e:
-            print(f"Error parsing tutor row: {e}")
-            continue
-
-    if tutors_to_insert:
-        # Use a loop or insert_many. insert_many is faster.
-        await Tutor.insert_many(tutors_to_insert)
-    
-    return {"message": f"Se han importado {len(tutors_to_insert)} clientes exitosamente"}
-
-@router.post("/products")
+@router.post("/products", status_code=202)
 async def import_products(
     file: UploadFile = File(...),
-    delete_existing: bool = False
+    delete_existing: bool = False,
+    mode: str = "insert",
+    user: User = Depends(get_current_user)
 ):
-    if not file.filename.endswith(".txt") and not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser .txt o .csv")
-    
-    try:
+    """
+    mode=insert adds every row as a new product (with delete_existing to replace
+    the catalog). mode=upsert updates products matched by external_id or sku in
+    place and adjusts stock with inventory movements, keeping product ids.
+    """
+    if mode not in ("insert", "upsert"):
+        raise HTTPException(status_code=400, detail="mode debe ser 'insert' o 'upsert'")
+    if mode == "upsert":
         if delete_existing:
-            await Product.find_all().delete()
-            await Stock.find_all().delete()
-
-        content = await file.read()
-        decoded = ""
-        for enc in ["utf-8-sig", "latin-1", "utf-8"]:
-            try:
-                decoded = content.decode(enc)
-                break
-            except:
-                continue
-        
-        # Detect delimiter
-        delimiter = ','
-        first_line = decoded.splitlines()[0]
-        if '\t' in first_line:
-            delimiter = '\t'
-        elif ';' in first_line:
-            delimiter = ';'
+            raise HTTPException(status_code=400, detail="delete_existing no aplica al modo upsert")
+        return await _queue_import("upsert_products", file, False, user)
+    return await _queue_import("import_products", file, delete_existing, user)
 
-        csv_reader = csv.DictReader(StringIO(decoded), delimiter=delimiter)
-        
-        products_to_insert = []
-        stocks_data = [] # List of (row_idx, {branch_name: qty})
-        
-        branches_cache = {}
-        all_branches = await Branch.find_all().to_list()
-        for b in all_branches:
-            if b.name:
-                branches_cache[b.name.upper().strip()] = b
-
-        async def get_or_create_branch(branch_name: str) -> Branch:
-            norm_name = branch_name.upper().strip()
-            if norm_name in branches_cache:
-                return branches_cache[norm_name]
-            new_branch = Branch(name=branch_name, is_active=True)
-            await new_branch.insert()
-            branches_cache[norm_name] = new_branch
-            return new_branch
-
-        row_count = 0
-        skipped_count = 0
-
-        for row in csv_reader:
-            try:
-                name = get_row_val(row, "Nombre Artículo", "name", "Producto", "Artículo")
-                if not name:
-                    skipped_count += 1
-                    continue
-
-                sku = get_row_val(row, "UPC/EAN/ISBN", "sku", "Código", "Barcode")
-                category = get_row_val(row, "Categoría", "category", "Grupo")
-                supplier_name = get_row_val(row, "Nombre de la Compañía", "supplier_name", "Proveedor")
-                
-                p_price = parse_currency(get_row_val(row, "Precio de Compra", "purchase_price", "Costo") or "0")
-                s_price = parse_currency(get_row_val(row, "Precio de Venta", "sale_price", "Precio") or "0")
-                tax = parse_currency(get_row_val(row, "Porcentaje de Impuesto(s)", "tax_percent", "IVA", "Impuesto") or "0", is_percentage=True)
-                avatar = get_row_val(row, "Avatar", "image_url", "Imagen", "Foto")
-                
-                ext_id_str = get_row_val(row, "Id", "external_id", "ID Sistema")
-                ext_id = None
-                if ext_id_str:
-                    try:
-                        ext_id = int(float(ext_id_str))
-                    except:
-                        pass
-
-                product = Product(
-                    external_id=ext_id,
-                    name=name,
-                    sku=sku,
-                    category=category,
-                    supplier_name=supplier_name,
-                    purchase_price=p_price,
-                    sale_price=s_price,
-                    tax_percent=tax,
-                    avatar=avatar,
-                    kind="PRODUCT",
-                    is_active=True
-                )
-                
-                # Parse branch stock columns
-                branch_stocks = {}
-                found_specific_stock = False
-                for key, value in row.items():
-                    if not key: continue
-                    key_upper = key.upper().strip()
-                    
-                    # Pattern: "CANTIDAD EN STOCK BODEGA" or "STOCK BODEGA" or "EXISTENCIA BODEGA"
-                    match_keywords = ["CANTIDAD EN STOCK", "STOCK", "EXISTENCIA", "CANTIDAD"]
-                    for kw in match_keywords:
-                        if key_upper.startswith(kw):
-                            branch_name = key_upper.replace(kw, "").replace("[", "").replace("]", "").strip()
-                            if branch_name == "VENCIMIENTO" or branch_name == "VALOR":
-                                continue
-                            if not branch_name:
-                                branch_name = "Principal"
-                            
-                            try:
-                                qty = int(parse_currency(value or "0"))
-                                branch_stocks[branch_name] = qty
-                                found_specific_stock = True
-                                break # Found a match for this key
-                            except:
-                                pass
-                
-                # Fallback: simple "Stock" + "Sucursal" columns if no specific headers found
-                if not found_specific_stock:
-                    stock_val = get_row_val(row, "Stock", "Cantidad", "Existencia", "Stock Actual")
-                    if stock_val is not None:
-                        qty = int(parse_currency(stock_val or "0"))
-                        branch_name = get_row_val(row, "Sucursal", "Branch", "Bodega", "Ubicación") or "Principal"
-                        branch_stocks[branch_name] = qty
-                
-                products_to_insert.append(product)
-                stocks_data.append((row_count, branch_stocks))
-                row_count += 1
-
-            except Exception as e:
-                print(f"Error parsing product row: {e}")
-                skipped_count += 1
-                continue
-
-        if products_to_insert:
-            # Insert products one by one to ensure IDs are populated in the objects
-            for i, product in enumerate(products_to_insert):
-                await product.insert()
-                
-                # Get the associated stock data for this product
-                _, branch_map = stocks_data[i]
-                
-                for branch_name, qty in branch_map.items():
-                    branch = await get_or_create_branch(branch_name)
-                    stock_record = Stock(
-                        branch_id=branch.id,
-                        product_id=product.id,
-                        quantity=qty
-                    )
-                    await stock_record.insert()
-        
-        msg = f"Importación finalizada. {len(products_to_insert)} productos creados con su respectivo stock."
-        if skipped_count > 0:
-            msg += f" {skipped_count} filas omitidas por errores."
-        
-        return {"message": msg}
-
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Error interno: {str(e)}")
-
-@router.post("/suppliers")
+@router.post("/suppliers", status_code=202)
 async def import_suppliers(
     file: UploadFile = File(...),
-    delete_existing: bool = False
+    delete_existing: bool = False,
+    user: User = Depends(get_current_user)
 ):
-    if not file.filename.endswith(".txt") and not file.filename.endswith(".csv"):
-        raise HTTPException(status_code=400, detail="El archivo debe ser .txt o .csv")
-    
-    if delete_existing:
-        await Supplier.find_all().delete()
-
-    content = await file.read()
-    decoded = ""
-    for enc in ["utf-8-sig", "latin-1", "utf-8"]:
-        try:
-            decoded = content.decode(enc)
-            break
-        except:
-            continue
-            
-    delimiter = ','
-    first_line = decoded.split('\n')[0]
-    if '\t' in first_line:
-        delimiter = '\t'
-    elif ';' in first_line:
-        delimiter = ';'
-
-    csv_reader = csv.DictReader(StringIO(decoded), delimiter=delimiter)
-    suppliers_to_insert = []
-    
-    for row in csv_reader:
-        try:
-            company_name = get_row_val(row, "Nombre de la Compañía", "name") or get_row_val(row, "Nombre de la Agencia")
-            if not company_name:
-                last = get_row_val(row, "Apellidos") or ""
-                first = get_row_val(row, "Nombre") or ""
-                company_name = f"{first} {last}".strip()
-            
-            if not company_name:
-                continue
-
-            contact_name = f"{get_row_val(row, 'Nombre') or ''} {get_row_val(row, 'Apellidos') or ''}".strip()
-            
-            supplier = Supplier(
-                name=company_name,
-                contact_name=contact_name,
-                phone=get_row_val(row, "Teléfono", "phone"),
-                email=get_row_val(row, "Email", "email"),
-                is_active=True
-            )
-            suppliers_to_insert.append(supplier)
-        except Exception as e:
-            print(f"Error parsing supplier row: {e}")
-            continue
-
-    if suppliers_to_insert:
-        await Supplier.insert_many(suppliers_to_insert)
-    
-    return {"message": f"Se han importado {len(suppliers_to_insert)} proveedores exitosamente"}
+    return await _queue_import("import_suppliers", file, delete_existing, user)
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from beanie import PydanticObjectId
 from app.models.stock import Stock
@@ -25,6 +26,40 @@ async def get_stock(
     # For now, return raw stock objects.
     return await query.to_list()
 
+@router.get("/matrix")
+async def get_stock_matrix(
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    supplier_name: Optional[str] = None,
+    branch_id: Optional[str] = None, # Only this branch's column (and low stock there)
+    low_stock: bool = False,
+    cursor: Optional[str] = None, # next_cursor of the previous page
+    limit: int = Query(200, ge=1, le=1000),
+    format: str = Query("json", pattern="^(json|csv)$"),
+    user: User = Depends(get_current_user)
+):
+    """
+    Products by name with their stock in every active branch:
+    {branches: [{id, name}], items: [{id, name, sku, category,
+    stock_alert_threshold, quantities: {branch_id: qty}, total_stock,
+    low_stock}], next_cursor}. format=csv streams every matching product
+    instead of a page.
+    """
+    from app.services import stock_matrix_service
+    if branch_id and not PydanticObjectId.is_valid(branch_id):
+        raise HTTPException(status_code=400, detail="Sucursal inválida")
+    filters = dict(search=search, category=category, supplier_name=supplier_name, branch_id=branch_id, low_stock=low_stock)
+    if format == "csv":
+        return StreamingResponse(
+            stock_matrix_service.stock_matrix_csv(**filters),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="stock_por_sucursal.csv"'},
+        )
+    try:
+        return await stock_matrix_service.stock_matrix(**filters, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 from pydantic import BaseModel
 
 class InventoryMovementCreate(BaseModel):
@@ -0,0 +1,65 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi.responses import FileResponse
+from typing import Annotated, Optional
+from beanie import PydanticObjectId
+from app.models.user import User
+from app.models.background_job import BackgroundJob
+from app.routes.auth import get_current_user
+from app.services import job_queue
+import os
+
+router = APIRouter()
+
+def _is_admin(user: User) -> bool:
+    return "admin" in user.roles or "superadmin" in user.roles
+
+async def _get_job(id: str, user: User) -> BackgroundJob:
+    try:
+        job = await BackgroundJob.get(PydanticObjectId(id))
+    except Exception:
+        job = None
+    if not job:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+    if job.created_by and job.created_by != user.id and not _is_admin(user):
+        raise HTTPException(status_code=403, detail="No autorizado")
+    return job
+
+@router.get("/")
+async def list_jobs(
+    current_user: Annotated[User, Depends(get_current_user)],
+    kind: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100)
+):
+    query = {}
+    if not _is_admin(current_user):
+        query["created_by"] = current_user.id
+    if kind:
+        query["kind"] = kind
+    return await BackgroundJob.find(query).sort("-created_at").limit(limit).to_list()
+
+@router.get("/{id}")
+async def get_job(id: str, current_user: Annotated[User, Depends(get_current_user)]):
+    """Pollable status: progress (0-100), counters, message, result and artifact."""
+    job = await _get_job(id, current_user)
+    data = job.model_dump(exclude={"checkpoint", "owner", "lease_until"})
+    data["id"] = str(job.id)
+    data["artifact_url"] = f"/api/v1/jobs/{job.id}/artifact" if job.artifact_path else None
+    return data
+
+@router.post("/{id}/cancel")
+async def cancel_job(id: str, current_user: Annotated[User, Depends(get_current_user)]):
+    job = await _get_job(id, current_user)
+    doc = await job_queue.request_cancel(job.id)
+    if doc is None:
+        raise HTTPException(status_code=409, detail="La tarea ya terminó")
+    return {"id": id, "status": doc["status"], "cancel_requested": True}
+
+@router.get("/{id}/artifact")
+async def download_artifact(id: str, current_user: Annotated[User, Depends(get_current_user)]):
+    job = await _get_job(id, current_user)
+    if job.status != "SUCCEEDED" or not job.artifact_path:
+        raise HTTPException(status_code=404, detail="La tarea no tiene archivo de resultado")
+    path = os.path.join(job_queue.JOBS_DIR, job.artifact_path)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="El archivo de resultado ya no está disponible")
+    return FileResponse(path, filename=job.artifact_name or os.path.basename(path))
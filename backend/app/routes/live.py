@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from beanie import PydanticObjectId
+from app.routes.auth import get_current_user
+from app.services import live_events
+
+router = APIRouter()
+
+@router.get("/{branch_id}")
+async def live_branch_events(branch_id: str, user = Depends(get_current_user)):
+    """
+    Server-sent events for one branch, instead of polling products, stock and
+    the calendar:
+      stock         {branch_id, product_id, quantity, version}
+      consultation  {action: created|updated|cancelled, id, date, status, ...}
+      delivery      {action, id, status, assigned_user_id, scheduled_at, ...}
+      resync        reload everything (bulk changes, or this client fell behind)
+    Events carry the document's sync version; ignore ones older than what is
+    shown. After connecting or reconnecting ("ready"), refetch once.
+    branch_id "all" (admins) receives every branch.
+    """
+    if branch_id == live_events.ALL_BRANCHES:
+        if "admin" not in user.roles and "superadmin" not in user.roles:
+            raise HTTPException(status_code=403, detail="No autorizado")
+    elif not PydanticObjectId.is_valid(branch_id):
+        raise HTTPException(status_code=400, detail="Sucursal inválida")
+
+    return StreamingResponse(
+        live_events.event_stream(branch_id),
+        media_type="text/event-stream",
+        # No buffering in nginx, or events arrive in bursts
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -4,6 +4,9 @@ from datetime import datetime
 from app.models.patient import Patient, Species
 from app.models.tutor import Tutor
 from app.routes.auth import get_current_user
+from app.services.fuzzy_search import (
+    patient_index, index_patient, unindex_patient, ensure_search_indexes, FUZZY_CANDIDATES
+)
 from pydantic import BaseModel, Field
 from beanie import PydanticObjectId
 
@@ -61,6 +64,7 @@ async def create_patient(request: Request, patient_data: PatientCreate, user = D
 
     new_patient = Patient(**p_data)
     await new_patient.insert()
+    index_patient(new_patient)
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -76,7 +80,24 @@ async def create_patient(request: Request, patient_data: PatientCreate, user = D
     return new_patient
 
 @router.get("/", response_model=List[Patient])
-async def get_patients(response: Response, search: Optional[str] = None, limit: int = 50, skip: int = 0, user = Depends(get_current_user)):
+async def get_patients(
+    response: Response,
+    search: Optional[str] = None,
+    mode: str = "prefix", # prefix, fuzzy
+    limit: int = 50,
+    skip: int = 0,
+    user = Depends(get_current_user)
+):
+    if search and mode == "fuzzy":
+        # Typo tolerant search (e.g. "Firulai") ranked by trigram similarity
+        await ensure_search_indexes()
+        matches = patient_index.search(search, limit=FUZZY_CANDIDATES)
+        ranking = {key: i for i, (key, _) in enumerate(matches)}
+        results = await Patient.find({"_id": {"$in": [PydanticObjectId(key) for key, _ in matches]}}).to_list()
+        results.sort(key=lambda p: ranking.get(str(p.id), len(ranking)))
+        response.headers["X-Total-Count"] = str(len(results))
+        return results[skip : skip + limit]
+
     query = Patient.find_all()
     if search:
         query = Patient.find({"name": {"$regex": search, "$options": "i"}})
@@ -118,7 +139,14 @@ async def update_patient(request: Request, id: str, update_data: PatientUpdate,
     if 'tutor2_id' in data and data['tutor2_id']:
          data['tutor2_id'] = PydanticObjectId(data['tutor2_id'])
 
+    old_tutors = [patient.tutor_id, patient.tutor2_id]
     await patient.set(data)
+    index_patient(patient)
+
+    new_tutors = [patient.tutor_id, patient.tutor2_id]
+    if new_tutors != old_tutors:
+        from app.services.tutor_summary_service import on_patient_moved
+        await on_patient_moved(old_tutors, new_tutors)
 
     # Log Activity
     field_map = {
@@ -158,6 +186,7 @@ async def delete_patient(request: Request, id: str, user = Depends(get_current_u
     
     name = patient.name
     await patient.delete()
+    unindex_patient(id)
     
     # Log Activity
     from app.services.activity_service import log_activity
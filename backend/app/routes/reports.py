@@ -780,3 +780,33 @@ async def commission_details(
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/debt-aging")
+async def debt_aging(user: User = Depends(get_current_user)):
+    """Outstanding internal credit per client, aged 0-30 / 31-60 / 61-90 / 90+ days."""
+    from app.services.debt_service import debt_aging_report
+    return await debt_aging_report()
+
+@router.post("/sales/export", status_code=202)
+async def export_sales(
+    start: str,
+    end: str,
+    status: Optional[str] = None,
+    user: User = Depends(get_current_user)
+):
+    """Queues a CSV export of the sales in range; download it from GET /jobs/{job_id}/artifact."""
+    if "admin" not in user.roles and "superadmin" not in user.roles and not user.branch_id:
+        raise HTTPException(status_code=403, detail="Not authorized")
+
+    params = {
+        "start": parse_date(start).isoformat(),
+        "end": parse_date(end, end_of_day=True).isoformat(),
+        "status": status,
+    }
+    # Same branch rule as the sales report
+    if "admin" not in user.roles and "superadmin" not in user.roles:
+        params["branch_ids"] = [str(user.branch_id)]
+
+    from app.services.job_queue import submit_job
+    job = await submit_job("export_sales", params, user=user)
+    return {"job_id": str(job.id), "status": job.status, "message": "Exportación en curso"}
@@ -67,22 +67,11 @@ async def create_sale(data: SaleCreate, user: User = Depends(get_current_user)):
         if not sale.customer_id:
             raise HTTPException(status_code=400, detail="Client required for DEBT payment")
         
-        # Verify customer exists and update debt
+        # Verify customer exists (the debt itself is charged once the sale has an id)
         from app.models.tutor import Tutor
         tutor = await Tutor.get(sale.customer_id)
         if not tutor:
              raise HTTPException(status_code=404, detail="Client not found")
-        
-        tutor.debt += sale.total
-        tutor.total_spent += sale.total # Also count debt creation as spending, or only payment? Usually sale total.
-        await tutor.save()
-    elif sale.customer_id:
-        # Normal sale with customer
-        from app.models.tutor import Tutor
-        tutor = await Tutor.get(sale.customer_id)
-        if tutor:
-            tutor.total_spent += sale.total
-            await tutor.save()
 
     # 2. Process Items & Stock
     for item in data.items:
@@ -109,6 +98,22 @@ async def create_sale(data: SaleCreate, user: User = Depends(get_current_user)):
     # 3. Save Sale
     await sale.insert()
 
+    # 3.1 Customer balances: atomic $inc, DEBT sales also go to the debt ledger
+    from app.services import debt_service
+    if sale.payment_method == "DEBT":
+        # Debt creation also counts as spending
+        await debt_service.record_debt_entry(
+            sale.customer_id, "CHARGE", sale.total,
+            user=user, sale_id=sale.id, branch_id=sale.branch_id, count_as_spent=True
+        )
+    elif sale.customer_id:
+        await debt_service.add_to_total_spent(sale.customer_id, sale.total)
+
+    # 3.2 Client profile counters
+    from app.services.tutor_summary_service import on_sale_completed
+    if sale.status == "COMPLETED":
+        await on_sale_completed(sale)
+
     # 3. Create Inventory Movements (Now we have sale.id)
     for item in data.items:
         if item.type == "PRODUCT" and item.product_id:
@@ -191,11 +196,18 @@ async def void_sale(id: str, reason: str = "Anulación Admin", user: User = Depe
                 )
                 await mov.insert()
 
+    previous_status = sale.status
     sale.status = "VOIDED"
     sale.voided_by = user.id
     sale.voided_at = datetime.now(timezone.utc)
     sale.void_reason = reason
     await sale.save()
+
+    from app.services.debt_service import reverse_sale_debt
+    await reverse_sale_debt(sale, user=user, note=reason)
+
+    from app.services.tutor_summary_service import on_sale_voided
+    await on_sale_voided(sale, previous_status)
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -321,7 +333,7 @@ async def send_sale_receipt_email(id: str, user: User = Depends(get_current_user
         
         from app.models.tutor import Tutor
         from app.models.branch import Branch
-        from app.services.email import send_email_sync
+        from app.services.email_outbox import enqueue_email
         from app.services.receipt_service import generate_receipt_html
         
         tutor = await Tutor.get(sale.customer_id)
@@ -339,8 +351,8 @@ async def send_sale_receipt_email(id: str, user: User = Depends(get_current_user
         subject = f"Comprobante de Venta - CalFer (#{str(sale.id)[-8:].upper()})"
         body = f"Hola {tutor.first_name}, adjuntamos tu comprobante de venta por ${sale.total:,.0f}."
         
-        # We call sync but could be async in future.
-        send_email_sync(tutor.email, subject, body, html_content)
+        # Delivered by the outbox worker
+        await enqueue_email(tutor.email, subject, body, html_content)
         
         # Log Activity
         from app.services.activity_service import log_activity
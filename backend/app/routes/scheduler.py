@@ -0,0 +1,46 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Annotated
+from app.models.user import User
+from app.models.scheduled_job import JobRun
+from app.routes.auth import get_current_user
+from app.services import scheduler
+
+router = APIRouter()
+
+def _require_admin(user: User):
+    if "admin" not in user.roles and "superadmin" not in user.roles:
+        raise HTTPException(status_code=403, detail="No autorizado")
+
+@router.get("/")
+async def list_jobs(current_user: Annotated[User, Depends(get_current_user)]):
+    _require_admin(current_user)
+    return await scheduler.list_jobs()
+
+@router.get("/{name}/runs")
+async def list_job_runs(
+    name: str,
+    current_user: Annotated[User, Depends(get_current_user)],
+    limit: int = Query(20, ge=1, le=200)
+):
+    _require_admin(current_user)
+    return await JobRun.find(JobRun.name == name).sort("-started_at").limit(limit).to_list()
+
+@router.post("/{name}/run")
+async def run_job(name: str, current_user: Annotated[User, Depends(get_current_user)]):
+    _require_admin(current_user)
+    scheduler.ensure_jobs_registered()
+    if name not in scheduler.JOBS:
+        raise HTTPException(status_code=404, detail="Tarea no encontrada")
+
+    run = await scheduler.trigger_job(name, triggered_by=current_user.email)
+    if run is None:
+        raise HTTPException(status_code=409, detail="La tarea ya se está ejecutando")
+
+    from app.services.activity_service import log_activity
+    await log_activity(
+        user=current_user,
+        action_type="JOB_RUN",
+        description=f"Tarea '{name}' ejecutada manualmente ({run.status})",
+        reference_id=str(run.id)
+    )
+    return run
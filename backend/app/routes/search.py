@@ -0,0 +1,217 @@
+from fastapi import APIRouter, Depends, Query
+from typing import List, Dict, Optional
+from app.models.tutor import Tutor
+from app.models.patient import Patient
+from app.models.product import Product
+from app.models.sale import Sale
+from app.models.user import User
+from app.routes.auth import get_current_user
+from app.services.fuzzy_search import tutor_index, patient_index, search_indexes_ready, start_search_index_build
+from beanie import PydanticObjectId
+import asyncio
+import re
+
+router = APIRouter()
+
+# Receipts store the last 8 hex characters of the sale id ("Boleta N° 3F9A0C12");
+# sale screens show only the last 6, so shorter queries match the end
+RECEIPT_REGEX = re.compile(r"^#?[0-9a-fA-F]{6,8}$")
+
+# Per-source latency budget (seconds). A slow source is dropped from the
+# response instead of holding back the others.
+SOURCE_TIMEOUTS = {
+    "tutor": 0.3,
+    "patient": 0.3,
+    "product": 0.5,
+    "sale": 0.5,
+}
+
+async def _search_tutors(q: str, limit: int) -> Optional[List[Dict]]:
+    if not search_indexes_ready():
+        # Building (after startup or an import) may take longer than the budget:
+        # report the source as incomplete and let the build finish in the background
+        start_search_index_build()
+        return None
+    matches = tutor_index.search(q, limit=limit)
+    if not matches:
+        return []
+    scores = dict(matches)
+    docs = await Tutor.get_motor_collection().find(
+        {"_id": {"$in": [PydanticObjectId(key) for key in scores]}},
+        {"first_name": 1, "last_name": 1, "phone": 1, "debt": 1}
+    ).to_list(length=None)
+    return [{
+        "type": "tutor",
+        "id": str(d["_id"]),
+        "title": f"{d.get('first_name', '')} {d.get('last_name', '')}".strip(),
+        "subtitle": d.get("phone"),
+        "debt": d.get("debt", 0),
+        "score": scores.get(str(d["_id"]), 0),
+    } for d in docs]
+
+async def _search_patients(q: str, limit: int) -> Optional[List[Dict]]:
+    if not search_indexes_ready():
+        start_search_index_build()
+        return None
+    matches = patient_index.search(q, limit=limit)
+    if not matches:
+        return []
+    scores = dict(matches)
+    docs = await Patient.get_motor_collection().find(
+        {"_id": {"$in": [PydanticObjectId(key) for key in scores]}},
+        {"name": 1, "species": 1, "breed": 1, "tutor_id": 1}
+    ).to_list(length=None)
+    return [{
+        "type": "patient",
+        "id": str(d["_id"]),
+        "title": d.get("name"),
+        "subtitle": " · ".join(v for v in [d.get("species"), d.get("breed")] if v),
+        "tutor_id": str(d["tutor_id"]) if d.get("tutor_id") else None,
+        "score": scores.get(str(d["_id"]), 0),
+    } for d in docs]
+
+async def _search_products(q: str, limit: int) -> List[Dict]:
+    q_safe = re.escape(q)
+    # Anchored, case-insensitive prefix on name and SKU (same rule as GET /products/)
+    docs = await Product.get_motor_collection().find(
+        {
+            "is_active": True,
+            "$or": [
+                {"name": {"$regex": f"^{q_safe}", "$options": "i"}},
+                {"sku": {"$regex": f"^{q_safe}", "$options": "i"}}
+            ]
+        },
+        {"name": 1, "sku": 1, "category": 1, "sale_price": 1, "kind": 1}
+    ).limit(limit).to_list(length=None)
+
+    q_lower = q.lower()
+    results = []
+    for d in docs:
+        sku = d.get("sku") or ""
+        if sku.lower() == q_lower:
+            score = 1.0
+        elif (d.get("name") or "").lower().startswith(q_lower):
+            score = 0.9
+        else:
+            score = 0.8
+        results.append({
+            "type": "product",
+            "id": str(d["_id"]),
+            "title": d.get("name"),
+            "subtitle": " · ".join(v for v in [sku, d.get("category")] if v),
+            "kind": d.get("kind"),
+            "sale_price": d.get("sale_price", 0),
+            "score": score,
+        })
+    return results
+
+async def _search_sales(q: str, limit: int) -> List[Dict]:
+    number = q.lstrip("#").upper()
+    if len(number) == 8:
+        query = {"receipt_number": number}
+    else:
+        # Suffix regex can't seek, but scans only the receipt_number index keys
+        query = {"receipt_number": {"$regex": f"{number}$"}}
+
+    docs = await Sale.get_motor_collection().find(
+        query,
+        {"receipt_number": 1, "total": 1, "status": 1, "created_at": 1, "customer_id": 1, "customer_name": 1}
+    ).sort("created_at", -1).limit(limit).to_list(length=None)
+    return [{
+        "type": "sale",
+        "id": str(d["_id"]),
+        "title": f"Boleta N° {d.get('receipt_number')}",
+        "subtitle": f"{d['created_at'].strftime('%d/%m/%Y %H:%M')} · ${d.get('total', 0):,.0f}" if d.get("created_at") else None,
+        "status": d.get("status"),
+        "customer_id": str(d["customer_id"]) if d.get("customer_id") else None,
+        "score": 1.0,
+    } for d in docs]
+
+async def _run_source(name: str, coro) -> Optional[List[Dict]]:
+    try:
+        return await asyncio.wait_for(coro, timeout=SOURCE_TIMEOUTS[name])
+    except asyncio.TimeoutError:
+        return None
+    except Exception as e:
+        print(f"Search source '{name}' failed: {e}")
+        return None
+
+async def _link_tutors_and_patients(results: List[Dict]):
+    """Attaches owners to patient hits and pets to tutor hits with one query each way."""
+    tutors = [r for r in results if r["type"] == "tutor"]
+    patients = [r for r in results if r["type"] == "patient"]
+
+    tutor_names = {t["id"]: t["title"] for t in tutors}
+    missing = {p["tutor_id"] for p in patients if p["tutor_id"] and p["tutor_id"] not in tutor_names}
+
+    async def fetch_owners():
+        if not missing:
+            return []
+        return await Tutor.get_motor_collection().find(
+            {"_id": {"$in": [PydanticObjectId(t) for t in missing]}},
+            {"first_name": 1, "last_name": 1}
+        ).to_list(length=None)
+
+    async def fetch_pets():
+        if not tutors:
+            return []
+        ids = [PydanticObjectId(t["id"]) for t in tutors]
+        return await Patient.get_motor_collection().find(
+            {"$or": [{"tutor_id": {"$in": ids}}, {"tutor2_id": {"$in": ids}}]},
+            {"name": 1, "species": 1, "tutor_id": 1, "tutor2_id": 1}
+        ).to_list(length=None)
+
+    owners, pets = await asyncio.gather(fetch_owners(), fetch_pets())
+
+    for o in owners:
+        tutor_names[str(o["_id"])] = f"{o.get('first_name', '')} {o.get('last_name', '')}".strip()
+    for p in patients:
+        p["tutor_name"] = tutor_names.get(p["tutor_id"])
+
+    pets_by_tutor: Dict[str, List[Dict]] = {}
+    for pet in pets:
+        summary = {"id": str(pet["_id"]), "name": pet.get("name"), "species": pet.get("species")}
+        for key in ("tutor_id", "tutor2_id"):
+            if pet.get(key):
+                pets_by_tutor.setdefault(str(pet[key]), []).append(summary)
+    for t in tutors:
+        t["patients"] = pets_by_tutor.get(t["id"], [])
+
+@router.get("/")
+async def global_search(
+    q: str = Query(..., min_length=2),
+    limit: int = Query(20, ge=1, le=50),
+    user: User = Depends(get_current_user)
+):
+    """
+    Front desk search box: tutors, patients, products and (for receipt-shaped
+    queries) sales in a single round trip, ranked and tagged by type.
+    """
+    q = q.strip()
+    sources = {
+        "tutor": _search_tutors(q, limit),
+        "patient": _search_patients(q, limit),
+        "product": _search_products(q, limit),
+    }
+    if RECEIPT_REGEX.match(q):
+        sources["sale"] = _search_sales(q, limit)
+
+    outcomes = await asyncio.gather(*(_run_source(name, coro) for name, coro in sources.items()))
+
+    results = []
+    timed_out = []
+    for name, outcome in zip(sources, outcomes):
+        if outcome is None:
+            timed_out.append(name)
+        else:
+            results.extend(outcome)
+
+    results.sort(key=lambda r: r["score"], reverse=True)
+    results = results[:limit]
+    await _link_tutors_and_patients(results)
+
+    return {
+        "query": q,
+        "results": results,
+        "incomplete_sources": timed_out
+    }
@@ -0,0 +1,27 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Optional
+from app.routes.auth import get_current_user
+from app.services import sync_service
+
+router = APIRouter()
+
+@router.get("/{collection}")
+async def sync_collection(
+    collection: str,
+    since: Optional[str] = None,
+    limit: int = Query(sync_service.SNAPSHOT_PAGE, ge=1, le=2000),
+    user = Depends(get_current_user)
+):
+    """
+    Keeps a client-side cache of a collection current. Without `since` it pages
+    through the whole collection; pass each response's `next` back as `since`.
+    Once has_more is false, keep polling with the last `next`: only documents
+    written since come back (as upserts), and `deleted` lists removed ids.
+    reset=true means the token is too old: drop the cache and start over.
+    """
+    try:
+        return await sync_service.changes_since(collection, since, limit)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"'{collection}' no se puede sincronizar")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -2,7 +2,11 @@ from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from typing import List, Optional
 from app.models.tutor import Tutor
 from app.routes.auth import get_current_user
+from app.services.fuzzy_search import (
+    tutor_index, index_tutor, unindex_tutor, ensure_search_indexes, FUZZY_CANDIDATES
+)
 from pydantic import BaseModel, Field, EmailStr
+from beanie import PydanticObjectId
 
 router = APIRouter()
 
@@ -32,6 +36,7 @@ class TutorUpdate(BaseModel):
 async def create_tutor(request: Request, tutor: TutorCreate, user = Depends(get_current_user)):
     new_tutor = Tutor(**tutor.model_dump())
     await new_tutor.insert()
+    index_tutor(new_tutor)
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -52,6 +57,7 @@ async def get_tutors(
     search: Optional[str] = None, 
     filter: Optional[str] = None,
     role: Optional[str] = "all", # tutor, client, all
+    mode: str = "prefix", # prefix, fuzzy
     limit: int = 50, 
     skip: int = 0, 
     user = Depends(get_current_user)
@@ -59,7 +65,14 @@ async def get_tutors(
     # Base Query
     query_filters = {}
     
-    if search:
+    fuzzy_ranking = None
+    if search and mode == "fuzzy":
+        # Typo tolerant search (e.g. "Gonsalez") ranked by trigram similarity
+        await ensure_search_indexes()
+        matches = tutor_index.search(search, limit=FUZZY_CANDIDATES)
+        fuzzy_ranking = {key: i for i, (key, _) in enumerate(matches)}
+        query_filters["_id"] = {"$in": [PydanticObjectId(key) for key, _ in matches]}
+    elif search:
         # Prefix Search (starts with)
         pattern = f"^{search}.*"
         query_filters["$or"] = [
@@ -86,6 +99,11 @@ async def get_tutors(
         total = await query.count()
         response.headers["X-Total-Count"] = str(total)
         
+        if fuzzy_ranking is not None:
+            results = await query.to_list()
+            results.sort(key=lambda t: fuzzy_ranking.get(str(t.id), len(fuzzy_ranking)))
+            return results[skip : skip + limit]
+
         # If searching, sort by relevance (name match)
         if search:
             results = await query.to_list()
@@ -118,6 +136,7 @@ async def update_tutor(request: Request, id: str, update_data: TutorUpdate, user
     
     data = update_data.model_dump(exclude_unset=True)
     await tutor.set(data)
+    index_tutor(tutor)
 
     # Log Activity
     field_map = {
@@ -153,6 +172,10 @@ async def delete_tutor(request: Request, id: str, user = Depends(get_current_use
     
     name = f"{tutor.first_name} {tutor.last_name}"
     await tutor.delete()
+    unindex_tutor(id)
+
+    from app.services.tutor_summary_service import on_tutor_deleted
+    await on_tutor_deleted(tutor.id)
     
     # Log Activity
     from app.services.activity_service import log_activity
@@ -168,7 +191,12 @@ async def delete_tutor(request: Request, id: str, user = Depends(get_current_use
     return {"message": "Tutor deleted"}
 
 @router.get("/{id}/details")
-async def get_tutor_details(id: str, user = Depends(get_current_user)):
+async def get_tutor_details(
+    id: str,
+    limit: int = 20,
+    skip: int = 0,
+    user = Depends(get_current_user)
+):
     tutor = await Tutor.get(id)
     if not tutor:
         raise HTTPException(status_code=404, detail="Tutor not found")
@@ -180,57 +208,109 @@ async def get_tutor_details(id: str, user = Depends(get_current_user)):
         Or(Patient.tutor_id == tutor.id, Patient.tutor2_id == tutor.id)
     ).to_list()
     
-    # Get consultations for these patients
+    # Recent activity only (paged); totals come from the maintained summary
     from app.models.consultation import Consultation
     patient_ids = [p.id for p in patients]
     consultations = await Consultation.find(
         {"patient_id": {"$in": patient_ids}}
-    ).sort("-date").to_list()
+    ).sort("-date").skip(skip).limit(limit).to_list()
     
-    # Calculate stats
-    total_appointments = len(consultations)
-    attended = len([c for c in consultations if c.status == "attended"])
-    no_shows = len([c for c in consultations if c.status == "no_show"])
-    
-    # Get Sales Stats
-    from app.models.sale import Sale
-    sales = await Sale.find(Sale.customer_id == tutor.id, Sale.status == "COMPLETED").to_list()
-    total_spent = sum(s.total for s in sales)
-    total_purchases = len(sales)
+    from app.services.tutor_summary_service import get_summary
+    summary = await get_summary(tutor.id)
 
     return {
         "tutor": tutor,
         "patients": patients,
         "consultations": consultations,
         "stats": {
-            "total_appointments": total_appointments,
-            "attended": attended,
-            "no_shows": no_shows,
-            "formatted_attendance": f"{attended}/{total_appointments}" if total_appointments > 0 else "0/0",
-            "total_spent": total_spent,
-            "total_purchases": total_purchases
+            "total_appointments": summary.visits,
+            "attended": summary.attended,
+            "no_shows": summary.no_shows,
+            "formatted_attendance": f"{summary.attended}/{summary.visits}" if summary.visits > 0 else "0/0",
+            "total_spent": summary.total_spent,
+            "total_purchases": summary.total_purchases,
+            "last_visit": summary.last_visit,
+            "last_purchase": summary.last_purchase,
+            "debt": summary.debt
         }
     }
 
 class DebtPayment(BaseModel):
     amount: float = Field(..., gt=0)
+    note: Optional[str] = None
+
+class DebtAdjustment(BaseModel):
+    amount: float # Positive increases the debt, negative reduces it
+    note: str = Field(..., min_length=3)
 
 @router.post("/{id}/pay-debt", response_model=Tutor)
-async def pay_debt(id: str, payment: DebtPayment, user = Depends(get_current_user)):
+async def pay_debt(request: Request, id: str, payment: DebtPayment, user = Depends(get_current_user)):
     tutor = await Tutor.get(id)
     if not tutor:
         raise HTTPException(status_code=404, detail="Tutor not found")
     
-    if payment.amount > tutor.debt:
-        # Optional: You might want to allow it and have negative debt (credit)?
-        # For now, let's just reduce it, even if it goes below 0 (credit balance)
-        pass # Allow overpayment as credit? Or clamp? 
-             # Let's simple reduce. Logic says "pay what is owed". 
-             # If user pays more, it becomes credit. OK.
-
-    tutor.debt -= payment.amount
-    await tutor.save()
-    
-    # Log activity? Optional but good practice.
+    # Overpayment is allowed and becomes credit (negative debt)
+    from app.services.debt_service import record_debt_entry
+    await record_debt_entry(tutor.id, "PAYMENT", -payment.amount, user=user, note=payment.note)
+    tutor = await Tutor.get(tutor.id)
+
+    from app.services.activity_service import log_activity
+    await log_activity(
+        user=user,
+        action_type="DEBT_PAYMENT",
+        description=f"Abono de deuda por ${payment.amount:,.0f}: {tutor.first_name} {tutor.last_name}",
+        reference_id=id,
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent"),
+        metadata={"amount": payment.amount, "balance": tutor.debt}
+    )
     
     return tutor
+
+@router.post("/{id}/debt-adjustment", response_model=Tutor)
+async def adjust_debt(request: Request, id: str, adjustment: DebtAdjustment, user = Depends(get_current_user)):
+    if "admin" not in user.roles and "superadmin" not in user.roles:
+        raise HTTPException(status_code=403, detail="Only Admins can adjust debts")
+    if adjustment.amount == 0:
+        raise HTTPException(status_code=400, detail="Amount must not be zero")
+
+    from app.services.debt_service import record_debt_entry
+    entry = await record_debt_entry(PydanticObjectId(id), "ADJUSTMENT", adjustment.amount, user=user, note=adjustment.note)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Tutor not found")
+    tutor = await Tutor.get(id)
+
+    from app.services.activity_service import log_activity
+    await log_activity(
+        user=user,
+        action_type="DEBT_ADJUST",
+        description=f"Ajuste de deuda por ${adjustment.amount:,.0f}: {tutor.first_name} {tutor.last_name}. Motivo: {adjustment.note}",
+        reference_id=id,
+        ip_address=request.client.host,
+        user_agent=request.headers.get("user-agent"),
+        metadata={"amount": adjustment.amount, "balance": tutor.debt}
+    )
+
+    return tutor
+
+@router.get("/{id}/debt-statement")
+async def get_debt_statement(
+    response: Response,
+    id: str,
+    limit: int = 50,
+    skip: int = 0,
+    user = Depends(get_current_user)
+):
+    tutor = await Tutor.get(id)
+    if not tutor:
+        raise HTTPException(status_code=404, detail="Tutor not found")
+
+    from app.services.debt_service import get_statement
+    statement = await get_statement(tutor.id, limit=limit, skip=skip)
+    response.headers["X-Total-Count"] = str(statement["total"])
+
+    return {
+        "tutor_id": str(tutor.id),
+        "balance": tutor.debt,
+        "entries": statement["entries"]
+    }
@@ -0,0 +1,345 @@
+import re
+import uuid
+import bisect
+import asyncio
+import contextlib
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+
+# Length of an appointment by type, in minutes (the calendar draws 30 min blocks)
+APPOINTMENT_MINUTES = {"VET": 30, "GROOMING": 30}
+DEFAULT_MINUTES = 30
+
+# Appointments a branch can run at once per type when no staff member is assigned
+# (one consulting room, one grooming table)
+BRANCH_CAPACITY = {"VET": 1, "GROOMING": 1}
+
+# Statuses that keep a slot taken; a no-show frees it
+BLOCKING_STATUSES = ("scheduled", "attended")
+
+# Only appointments from this many days back are kept in memory; bookings are
+# never made further in the past.
+INDEX_PAST_DAYS = 1
+
+# A booking's hold on its resources; bounds the wait if its worker dies mid-booking
+BOOKING_LEASE_SECONDS = 15
+# How long a booking waits for another one on the same resources before giving up
+BOOKING_WAIT_SECONDS = 5
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_HOURS = re.compile(r"(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})")
+
+def clinic_tz() -> ZoneInfo:
+    return ZoneInfo(settings.CLINIC_TIMEZONE)
+
+def to_ts(dt: datetime) -> float:
+    """Consultation dates are stored as naive UTC."""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def to_naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
+def duration_of(appointment_type: Optional[str]) -> int:
+    return APPOINTMENT_MINUTES.get(appointment_type or "VET", DEFAULT_MINUTES)
+
+def resources_of(branch_id, appointment_type: Optional[str], staff_id) -> List[Tuple]:
+    """What an appointment occupies: its staff member and/or a branch room for its type."""
+    keys = []
+    if staff_id:
+        keys.append(("staff", str(staff_id)))
+    if branch_id:
+        keys.append(("branch", str(branch_id), appointment_type or "VET"))
+    return keys
+
+def capacity_of(key: Tuple) -> int:
+    if key[0] == "branch":
+        return BRANCH_CAPACITY.get(key[2], 1)
+    return 1
+
+class IntervalIndex:
+    """
+    Appointment intervals per resource (branch room or staff member), each kept as a
+    list sorted by start so overlap lookups are a bisect plus a short scan.
+    Durations are bounded, so anything overlapping [start, end) starts after
+    start - longest duration.
+    """
+
+    def __init__(self):
+        self._by_key: Dict[Tuple, List[Tuple[float, float, str]]] = {}
+        self._entries: Dict[str, Tuple[List[Tuple], float, float]] = {}
+        self._max_span = max(APPOINTMENT_MINUTES.values(), default=DEFAULT_MINUTES) * 60
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, con_id: str, keys: List[Tuple], start: float, end: float):
+        self.remove(con_id)
+        if not keys:
+            return
+        for key in keys:
+            bisect.insort(self._by_key.setdefault(key, []), (start, end, con_id))
+        self._entries[con_id] = (keys, start, end)
+
+    def remove(self, con_id: str):
+        entry = self._entries.pop(con_id, None)
+        if entry is None:
+            return
+        keys, start, end = entry
+        for key in keys:
+            intervals = self._by_key.get(key, [])
+            i = bisect.bisect_left(intervals, (start, end, con_id))
+            if i < len(intervals) and intervals[i] == (start, end, con_id):
+                del intervals[i]
+            if not intervals:
+                self._by_key.pop(key, None)
+
+    def overlapping(self, key: Tuple, start: float, end: float, exclude: Optional[str] = None) -> List[Tuple[float, float, str]]:
+        intervals = self._by_key.get(key)
+        if not intervals:
+            return []
+        i = bisect.bisect_left(intervals, (start - self._max_span,))
+        found = []
+        while i < len(intervals) and intervals[i][0] < end:
+            s, e, cid = intervals[i]
+            if e > start and cid != exclude:
+                found.append(intervals[i])
+            i += 1
+        return found
+
+    def is_full(self, key: Tuple, start: float, end: float, exclude: Optional[str] = None) -> bool:
+        busy = self.overlapping(key, start, end, exclude)
+        capacity = capacity_of(key)
+        if len(busy) < capacity:
+            return False
+        if capacity == 1:
+            return True
+        # Peak concurrency inside the window
+        events = []
+        for s, e, _ in busy:
+            events.append((max(s, start), 1))
+            events.append((min(e, end), -1))
+        events.sort()
+        running = peak = 0
+        for _, step in events:
+            running += step
+            peak = max(peak, running)
+        return peak >= capacity
+
+index = IntervalIndex()
+
+_built = False
+_build_lock: Optional[asyncio.Lock] = None
+
+class BookingBusy(Exception):
+    """Another booking kept one of the resources leased for BOOKING_WAIT_SECONDS."""
+
+async def _take_lease(key: str, token: str) -> bool:
+    from app.models.booking_lease import BookingLease
+    now = datetime.now(timezone.utc)
+    try:
+        doc = await BookingLease.get_motor_collection().find_one_and_update(
+            {"key": key, "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]},
+            {"$set": {"owner": token, "locked_until": now + timedelta(seconds=BOOKING_LEASE_SECONDS)}},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # Held by someone else: the upsert lost
+        return False
+    return doc is not None and doc.get("owner") == token
+
+@contextlib.asynccontextmanager
+async def booking_lock(keys: List[Tuple]):
+    """
+    Serializes check-and-write for these resources across all API workers, so
+    two bookings can't both take the last slot. Leases are taken in a fixed
+    order, so bookings sharing resources can't deadlock. Raises BookingBusy.
+    """
+    from app.models.booking_lease import BookingLease
+    loop = asyncio.get_running_loop()
+    token = uuid.uuid4().hex
+    held = []
+    try:
+        deadline = loop.time() + BOOKING_WAIT_SECONDS
+        for key in sorted({":".join(k) for k in keys}):
+            while not await _take_lease(key, token):
+                if loop.time() > deadline:
+                    raise BookingBusy()
+                await asyncio.sleep(0.05)
+            held.append(key)
+        yield
+    finally:
+        if held:
+            await BookingLease.get_motor_collection().update_many(
+                {"key": {"$in": held}, "owner": token}, {"$set": {"locked_until": None}}
+            )
+
+def _horizon() -> datetime:
+    return datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=INDEX_PAST_DAYS)
+
+def index_consultation(con):
+    con_id = str(con.id)
+    if con.status not in BLOCKING_STATUSES or not con.date:
+        index.remove(con_id)
+        return
+    start = to_ts(con.date)
+    index.add(
+        con_id,
+        resources_of(con.branch_id, con.appointment_type, con.assigned_staff_id),
+        start,
+        start + duration_of(con.appointment_type) * 60
+    )
+
+def unindex_consultation(con_id):
+    index.remove(str(con_id))
+
+async def build_availability_index(batch_size: int = 2000):
+    """Loads recent and upcoming appointments (projected) into memory."""
+    global _built
+    from app.models.consultation import Consultation
+
+    fresh = IntervalIndex()
+    cursor = Consultation.get_motor_collection().find(
+        {"date": {"$gte": _horizon()}, "status": {"$in": list(BLOCKING_STATUSES)}},
+        {"date": 1, "branch_id": 1, "appointment_type": 1, "assigned_staff_id": 1},
+        batch_size=batch_size
+    )
+    async for doc in cursor:
+        start = to_ts(doc["date"])
+        fresh.add(
+            str(doc["_id"]),
+            resources_of(doc.get("branch_id"), doc.get("appointment_type"), doc.get("assigned_staff_id")),
+            start,
+            start + duration_of(doc.get("appointment_type")) * 60
+        )
+
+    index.__dict__.update(fresh.__dict__)
+    _built = True
+    print(f"--- AVAILABILITY INDEX BUILT: {len(index)} appointments ---")
+
+async def ensure_availability_index():
+    global _build_lock
+    if _built:
+        return
+    if _build_lock is None:
+        _build_lock = asyncio.Lock()
+    async with _build_lock:
+        if not _built:
+            await build_availability_index()
+
+def invalidate_availability_index():
+    """
+    The next lookup reloads from the database. Writes through the consultation
+    routes keep the index current; bulk ones must call this (mark_reset does).
+    The index lives in this process, so free_slots only sees writes made
+    elsewhere (scripts, other API workers) after the next start; bookings are
+    checked against the database (find_conflicts) either way.
+    """
+    global _built
+    _built = False
+
+async def find_conflicts(
+    date_: datetime,
+    branch_id=None,
+    appointment_type: Optional[str] = None,
+    staff_id=None,
+    exclude_id: Optional[str] = None
+) -> List[Tuple]:
+    """
+    Resources already full at the given time. Past bookings (records) are not
+    checked. Reads the database rather than the in-memory index, which misses
+    bookings made by other workers; call it under booking_lock.
+    """
+    from app.models.consultation import Consultation
+    if to_naive_utc(date_) < _horizon():
+        return []
+    keys = resources_of(branch_id, appointment_type, staff_id)
+    if not keys:
+        return []
+    start = to_ts(date_)
+    end = start + duration_of(appointment_type) * 60
+
+    # Same overlap bound as IntervalIndex.overlapping
+    window = IntervalIndex()
+    naive = to_naive_utc(date_)
+    owners = []
+    if staff_id:
+        owners.append({"assigned_staff_id": PydanticObjectId(staff_id)})
+    if branch_id:
+        owners.append({"branch_id": PydanticObjectId(branch_id)})
+    cursor = Consultation.get_motor_collection().find(
+        {
+            "date": {"$gt": naive - timedelta(seconds=window._max_span), "$lt": naive + timedelta(seconds=end - start)},
+            "status": {"$in": list(BLOCKING_STATUSES)},
+            "$or": owners,
+        },
+        {"date": 1, "branch_id": 1, "appointment_type": 1, "assigned_staff_id": 1}
+    )
+    async for doc in cursor:
+        begins = to_ts(doc["date"])
+        window.add(
+            str(doc["_id"]),
+            resources_of(doc.get("branch_id"), doc.get("appointment_type"), doc.get("assigned_staff_id")),
+            begins,
+            begins + duration_of(doc.get("appointment_type")) * 60
+        )
+    return [key for key in keys if window.is_full(key, start, end, exclude=str(exclude_id) if exclude_id else None)]
+
+# --- Opening hours ---
+
+def parse_hours(value: Optional[str]) -> List[Tuple[time, time]]:
+    """'09:00-19:00' or '09:00-13:00, 15:00-19:00'; anything else ('Cerrado') is closed."""
+    ranges = []
+    for h1, m1, h2, m2 in _HOURS.findall(value or ""):
+        opens, closes = time(int(h1), int(m1)), time(int(h2), int(m2))
+        if closes > opens:
+            ranges.append((opens, closes))
+    return ranges
+
+async def get_schedule() -> Dict[str, str]:
+    from app.models.settings import VetSettings
+    vet_settings = await VetSettings.find_one()
+    return vet_settings.schedule if vet_settings else VetSettings.model_fields["schedule"].default
+
+async def free_slots(
+    day: date,
+    days: int = 1,
+    branch_id=None,
+    appointment_type: str = "VET",
+    staff_id=None,
+    step_minutes: Optional[int] = None
+) -> List[Dict]:
+    await ensure_availability_index()
+    schedule = await get_schedule()
+    tz = clinic_tz()
+    minutes = duration_of(appointment_type)
+    step = (step_minutes or minutes) * 60
+    span = minutes * 60
+    keys = resources_of(branch_id, appointment_type, staff_id)
+    now = datetime.now(timezone.utc).timestamp()
+
+    result = []
+    for offset in range(days):
+        current = day + timedelta(days=offset)
+        hours = schedule.get(WEEKDAYS[current.weekday()])
+        slots = []
+        for opens, closes in parse_hours(hours):
+            start = datetime.combine(current, opens, tzinfo=tz).timestamp()
+            close = datetime.combine(current, closes, tzinfo=tz).timestamp()
+            while start + span <= close:
+                if start >= now and not any(index.is_full(k, start, start + span) for k in keys):
+                    slots.append({
+                        "start": datetime.fromtimestamp(start, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                        "end": datetime.fromtimestamp(start + span, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+                    })
+                start += step
+        result.append({"date": current.isoformat(), "hours": hours, "slots": slots})
+    return result
@@ -1,17 +1,172 @@
 import os
+import gzip
 import json
-from datetime import datetime, timezone
+import shutil
+import struct
+import hashlib
+from datetime import datetime, timezone, timedelta
+from typing import List, Optional
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from pymongo import IndexModel, ReplaceOne
 import motor.motor_asyncio
 from app.core.config import settings
 from beanie import Document
+from beanie.odm.utils.encoder import Encoder
+from pydantic import TypeAdapter
 import asyncio
 
+try:
+    import zstandard
+except ImportError: # Optional: only needed for BACKUP_COMPRESSION=zstd
+    zstandard = None
+
 BACKUP_DIR = os.path.join(os.getcwd(), "backups")
 
-async def perform_backup():
+# Documents per cursor batch. Each collection being dumped holds one raw batch
+# in memory at a time, so memory use doesn't grow with the database.
+BACKUP_BATCH_SIZE = 1000
+EXTENSIONS = {"gzip": ".bson.gz", "zstd": ".bson.zst"}
+
+class _HashingWriter:
+    """Passes bytes through to a file, keeping their SHA-256 and total size."""
+
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._f.write(data)
+
+    def flush(self):
+        self._f.flush()
+
+def _compression() -> str:
+    compression = settings.BACKUP_COMPRESSION
+    if compression == "zstd" and zstandard is None:
+        print("BACKUP: zstandard is not installed, using gzip")
+        return "gzip"
+    return compression if compression in EXTENSIONS else "gzip"
+
+def _open_compressed(hashed: _HashingWriter, compression: str):
+    if compression == "zstd":
+        return zstandard.ZstdCompressor(level=3).stream_writer(hashed, closefd=False)
+    return gzip.GzipFile(fileobj=hashed, mode="wb", compresslevel=6)
+
+def _write_batch(stream, batch: bytes) -> int:
+    """Writes a raw batch (concatenated BSON documents) and returns how many documents it held."""
+    stream.write(batch)
+    count = pos = 0
+    while pos < len(batch):
+        # Every BSON document starts with its total length (int32, little endian)
+        pos += struct.unpack_from("<i", batch, pos)[0]
+        count += 1
+    return count
+
+async def _dump_collection(db, coll_name: str, folder: str, compression: str, query: Optional[dict] = None) -> dict:
+    """
+    Streams a collection to <name>.bson.gz (or .zst): the same layout as
+    `mongodump --gzip`, so mongorestore can read it too. Raw batches are written
+    as they arrive, without decoding documents.
+    """
+    filename = coll_name + EXTENSIONS[compression]
+    with open(os.path.join(folder, filename), "wb") as raw:
+        hashed = _HashingWriter(raw)
+        stream = _open_compressed(hashed, compression)
+        count = 0
+        async for batch in db[coll_name].find_raw_batches(query or {}, batch_size=BACKUP_BATCH_SIZE):
+            # Compression and disk writes run off the event loop
+            count += await asyncio.to_thread(_write_batch, stream, batch)
+        await asyncio.to_thread(stream.close)
+
+    return {
+        "name": coll_name,
+        "file": filename,
+        "count": count,
+        "size_kb": hashed.size / 1024,
+        "sha256": hashed.sha256.hexdigest(),
+        "indexes": await _index_specs(db[coll_name]),
+    }
+
+async def _index_specs(collection) -> List[dict]:
+    """Index definitions (besides _id), so a restore can rebuild them after loading."""
+    specs = []
+    async for index in collection.list_indexes():
+        spec = {k: v for k, v in index.items() if k not in ("v", "ns")}
+        if spec["name"] == "_id_":
+            continue
+        spec["key"] = [[field, direction] for field, direction in spec["key"].items()]
+        specs.append(spec)
+    return specs
+
+# How an incremental backup finds what changed since the previous one.
+# Append-only collections go by _id (an ObjectId starts with its creation time);
+# sales and consultations by updated_at, which their models keep current (new
+# documents are also caught by _id). Collections not listed here are edited in
+# place without a timestamp and are copied whole into every backup; all of them
+# are small. Deletions are not captured: the next full backup drops them.
+INCREMENTAL_FIELDS = {
+    "activity_logs": "_id",
+    "inventory_movements": "_id",
+    "debt_entries": "_id",
+    "sales": "updated_at",
+    "consultations": "updated_at",
+}
+# Watermarks are moved back by this much so clock differences between the app
+# and this process can't skip a write; restore replays by _id, so overlap is harmless
+WATERMARK_SLACK = timedelta(minutes=5)
+
+def read_backup_metadata(name: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(BACKUP_DIR, name, "metadata.json"), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def latest_chain_backup() -> Optional[dict]:
+    """Newest successful backup an incremental can build on (older JSON backups can't)."""
+    if not os.path.exists(BACKUP_DIR):
+        return None
+    for name in sorted(os.listdir(BACKUP_DIR), reverse=True):
+        meta = read_backup_metadata(name) if name.startswith("backup_") else None
+        if meta and meta.get("success") and meta.get("format") == "bson" and meta.get("started_at"):
+            meta["name"] = name
+            return meta
+    return None
+
+def _changes_query(field: str, since: datetime) -> dict:
+    since_id = ObjectId.from_datetime(since)
+    if field == "_id":
+        return {"_id": {"$gte": since_id}}
+    # Stored dates are naive UTC
+    return {"$or": [{field: {"$gte": since.replace(tzinfo=None)}}, {"_id": {"$gte": since_id}}]}
+
+def backup_chain(name: str) -> List[dict]:
+    """The backups to replay to restore `name`: its full backup first, then each incremental."""
+    chain = []
+    while name:
+        meta = read_backup_metadata(name)
+        if meta is None or not meta.get("success"):
+            raise ValueError(f"Respaldo {name} no existe o está incompleto")
+        meta["name"] = name
+        chain.append(meta)
+        name = meta.get("parent") if meta.get("type") == "incremental" else None
+    return list(reversed(chain))
+
+async def perform_backup(progress=None, incremental: bool = False):
     """
     Performs a logical backup of all collections in the configured MongoDB database.
-    Saves each collection as a JSON file in a timestamped folder.
+    Each collection is streamed to a compressed BSON file in a timestamped folder;
+    up to BACKUP_CONCURRENCY collections are dumped at once. metadata.json lists
+    every file with its document count and SHA-256.
+
+    With `incremental`, collections in INCREMENTAL_FIELDS only get the documents
+    written since the previous backup (`parent`), which in turn chains back to a
+    full backup (`base`). Without a usable previous backup a full one is taken.
+    `progress(done, total, collection)` is awaited after each collection, if given.
     """
     if not os.path.exists(BACKUP_DIR):
         os.makedirs(BACKUP_DIR)
@@ -20,71 +175,415 @@ async def perform_backup():
     current_backup_path = os.path.join(BACKUP_DIR, f"backup_{timestamp}")
     os.makedirs(current_backup_path)
 
-    client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URI)
-    db = client[settings.DB_NAME]
-    
-    collections = await db.list_collection_names()
-    
+    started_at = datetime.now(timezone.utc)
+    parent = latest_chain_backup() if incremental else None
+    compression = _compression()
     status = {
         "timestamp": timestamp,
+        "type": "incremental" if parent else "full",
+        "parent": parent["name"] if parent else None,
+        "base": (parent.get("base") or parent["name"]) if parent else None,
+        "started_at": started_at.isoformat(),
+        "format": "bson",
+        "compression": compression,
         "collections": [],
         "success": True,
         "error": None
     }
+    since = datetime.fromisoformat(parent["started_at"]) - WATERMARK_SLACK if parent else None
+    parent_collections = {c["name"] for c in parent["collections"]} if parent else set()
 
+    client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URI)
+    db = client[settings.DB_NAME]
     try:
-        for coll_name in collections:
-            cursor = db[coll_name].find()
-            docs = await cursor.to_list(length=None)
-            
-            # Serialize for JSON (handling ObjectIds and Datetimes)
-            def serialize(obj):
-                if isinstance(obj, (datetime)):
-                    return obj.isoformat()
-                if hasattr(obj, "__str__") and "ObjectId" in str(type(obj)):
-                    return str(obj)
-                return obj
-
-            file_path = os.path.join(current_backup_path, f"{coll_name}.json")
-            with open(file_path, "w", encoding="utf-8") as f:
-                # We use a custom encoder or simple mapping
-                # For basic logic:
-                json_docs = []
-                for d in docs:
-                    # Deep copy and convert
-                    d_str = json.loads(json.dumps(d, default=serialize))
-                    json_docs.append(d_str)
-                
-                json.dump(json_docs, f, indent=2, ensure_ascii=False)
-            
-            status["collections"].append({
-                "name": coll_name,
-                "count": len(docs),
-                "size_kb": os.path.getsize(file_path) / 1024
-            })
+        # Views have no documents of their own
+        collections = await db.list_collection_names(filter={"type": "collection"})
+        semaphore = asyncio.Semaphore(max(1, settings.BACKUP_CONCURRENCY))
+
+        async def dump(coll_name):
+            field = INCREMENTAL_FIELDS.get(coll_name)
+            # A collection new since the parent has no watermark yet: copy it whole
+            query = _changes_query(field, since) if since and field and coll_name in parent_collections else None
+            async with semaphore:
+                info = await _dump_collection(db, coll_name, current_backup_path, compression, query)
+            info["mode"] = "changes" if query else "full"
+            if query:
+                info["since"] = since.isoformat()
+            status["collections"].append(info)
+            if progress:
+                await progress(len(status["collections"]), len(collections), coll_name)
+
+        results = await asyncio.gather(*(dump(c) for c in collections), return_exceptions=True)
+        errors = [f"{name}: {r}" for name, r in zip(collections, results) if isinstance(r, Exception)]
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        status["collections"].sort(key=lambda c: c["name"])
 
     except Exception as e:
         status["success"] = False
         status["error"] = str(e)
-        from app.services.activity_service import log_activity
-        # We need a system user or dummy user for system logs
-        # For now we'll just print or use log_activity with None if supported
         print(f"BACKUP ERROR: {e}")
+    finally:
+        client.close()
 
     # Save metatada
     with open(os.path.join(current_backup_path, "metadata.json"), "w") as f:
-        json.dump(status, f, indent=2)
-
-    # Log Success to activity (if success)
-    if status["success"]:
-        # Optional: cleanup old backups (retention policy: 7 days)
-        await cleanup_old_backups(7)
+        # default=str: partial index filters may hold dates or ObjectIds
+        json.dump(status, f, indent=2, default=str)
 
     return status
 
-async def cleanup_old_backups(days_retention: int):
-    # Logic to delete folders older than N days
-    pass
+async def cleanup_old_backups(days_retention: int = None):
+    """
+    Deletes backup folders older than `days_retention` days (BACKUP_RETENTION_DAYS
+    by default). The newest successful backup is always kept, and so is every
+    backup a kept incremental depends on.
+    """
+    if days_retention is None:
+        days_retention = settings.BACKUP_RETENTION_DAYS
+    if not os.path.exists(BACKUP_DIR):
+        return {"deleted": []}
+
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days_retention)
+    backups = sorted(
+        d for d in os.listdir(BACKUP_DIR)
+        if d.startswith("backup_") and os.path.isdir(os.path.join(BACKUP_DIR, d))
+    )
+
+    def succeeded(name):
+        meta_path = os.path.join(BACKUP_DIR, name, "metadata.json")
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f).get("success", False)
+        except (OSError, ValueError):
+            return False
+
+    newest_ok = next((b for b in reversed(backups) if succeeded(b)), None)
+
+    def created_at(name):
+        try:
+            return datetime.strptime(name[len("backup_"):], "%Y%m%d_%H%M%S").replace(tzinfo=timezone.utc)
+        except ValueError:
+            return None
+
+    # Backups that kept incrementals build on can't go, however old
+    needed = {newest_ok}
+    for name in backups:
+        created = created_at(name)
+        if created is None or created >= cutoff or name == newest_ok:
+            meta = read_backup_metadata(name) or {}
+            parent = meta.get("parent") if meta.get("type") == "incremental" else None
+            while parent and parent not in needed:
+                needed.add(parent)
+                parent_meta = read_backup_metadata(parent) or {}
+                parent = parent_meta.get("parent") if parent_meta.get("type") == "incremental" else None
+
+    deleted = []
+    for name in backups:
+        created = created_at(name)
+        if created is None:
+            continue
+        if created < cutoff and name not in needed:
+            await asyncio.to_thread(shutil.rmtree, os.path.join(BACKUP_DIR, name), True)
+            deleted.append(name)
+    return {"deleted": deleted, "kept": len(backups) - len(deleted)}
+
+# --- Restore ---
+
+# Documents per insert; the driver splits larger messages itself
+RESTORE_BATCH_SIZE = 5000
+RESTORE_READ_CHUNK = 4 * 1024 * 1024
+RESTORE_COLLECTIONS_AT_ONCE = 4
+RESTORE_INSERTS_IN_FLIGHT = 4 # Per collection
+# State of the running installation rather than clinic data: restoring it over
+# the live database would drop the restore's own job, re-run jobs and leases
+# captured mid-flight, re-send queued emails and rewind the sync counters
+OPERATIONAL_COLLECTIONS = {
+    "jobs", "job_leases", "job_runs", "booking_leases", "email_outbox", "user_sessions", "sync_counters",
+}
+# Collections load under this suffix and replace the real ones only once the
+# whole restore has been verified
+STAGING_SUFFIX = "__restore"
+
+class _HashingReader:
+    """Reads from a file while keeping the SHA-256 of everything read."""
+
+    def __init__(self, f):
+        self._f = f
+        self.sha256 = hashlib.sha256()
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self.sha256.update(data)
+        return data
+
+class _BackupFileReader:
+    """
+    Reads a backup file as batches of raw BSON documents (never decoded), and
+    checksums the file on the way. Blocking: call it from a thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._raw = open(path, "rb")
+        self._hashed = _HashingReader(self._raw)
+        if path.endswith(".zst"):
+            if zstandard is None:
+                self._raw.close()
+                raise RuntimeError("Este respaldo usa zstd y el paquete zstandard no está instalado")
+            self._stream = zstandard.ZstdDecompressor().stream_reader(self._hashed)
+        else:
+            self._stream = gzip.GzipFile(fileobj=self._hashed, mode="rb")
+        self._buffer = b""
+        self._pos = 0
+        self.count = 0
+        self.digest = None
+
+    def next_batch(self) -> Optional[List[RawBSONDocument]]:
+        docs = []
+        while len(docs) < RESTORE_BATCH_SIZE:
+            buf, pos = self._buffer, self._pos
+            while len(docs) < RESTORE_BATCH_SIZE and pos + 4 <= len(buf):
+                size = struct.unpack_from("<i", buf, pos)[0]
+                if pos + size > len(buf):
+                    break
+                docs.append(RawBSONDocument(buf[pos:pos + size]))
+                pos += size
+            self._pos = pos
+            if len(docs) >= RESTORE_BATCH_SIZE:
+                break
+            chunk = self._stream.read(RESTORE_READ_CHUNK)
+            self._buffer, self._pos = buf[pos:] + chunk, 0
+            if not chunk:
+                if self._buffer:
+                    raise ValueError(f"{os.path.basename(self.path)}: archivo truncado")
+                break
+        self.count += len(docs)
+        return docs or None
+
+    @property
+    def sha256(self) -> str:
+        # Whatever the decompressor left unread still counts for the checksum
+        while self._hashed.read(RESTORE_READ_CHUNK):
+            pass
+        return self._hashed.sha256.hexdigest()
+
+    def close(self):
+        self._stream.close()
+        self._raw.close()
+
+def _models_by_collection() -> dict:
+    """Beanie models by collection name (the ones init_beanie has set up)."""
+    models, pending = {}, list(Document.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        try:
+            models[cls.get_collection_name()] = cls
+        except Exception: # Abstract bases have no settings
+            pass
+    return models
+
+class _JsonFileReader:
+    """
+    Reads a <collection>.json file from the JSON backups written before the
+    BSON format. Those flattened ObjectIds and dates to strings, so each field
+    the collection's model declares is parsed back to its type; other fields
+    (and fields that don't parse) are kept as stored. The files are a single
+    JSON array, so they are read whole (they were written whole too).
+    Blocking: call it from a thread.
+    """
+
+    def __init__(self, path: str, model=None):
+        self.path = path
+        with open(path, "rb") as f:
+            data = f.read()
+        self._digest = hashlib.sha256(data).hexdigest()
+        self._docs = json.loads(data)
+        self._pos = 0
+        self._encoder = Encoder(to_db=True)
+        self._fields = {}
+        for name, field in (model.model_fields.items() if model else ()):
+            if name != "id":
+                self._fields[field.alias or name] = TypeAdapter(field.annotation)
+        self.count = 0
+        self.digest = None
+
+    def _revive(self, doc: dict) -> dict:
+        if isinstance(doc.get("_id"), str) and ObjectId.is_valid(doc["_id"]):
+            doc["_id"] = ObjectId(doc["_id"])
+        for name, value in doc.items():
+            adapter = self._fields.get(name)
+            if adapter is None or value is None:
+                continue
+            try:
+                doc[name] = self._encoder.encode(adapter.validate_python(value))
+            except Exception:
+                pass
+        return doc
+
+    def next_batch(self) -> Optional[List[dict]]:
+        batch = self._docs[self._pos:self._pos + RESTORE_BATCH_SIZE]
+        self._pos += len(batch)
+        self.count += len(batch)
+        return [self._revive(doc) for doc in batch] or None
+
+    @property
+    def sha256(self) -> str:
+        return self._digest
+
+    def close(self):
+        self._docs = []
+
+def _backup_file(info: dict) -> str:
+    # JSON backups list no file name
+    return info.get("file") or f"{info['name']}.json"
+
+def _index_model(spec: dict) -> IndexModel:
+    options = {k: v for k, v in spec.items() if k != "key"}
+    return IndexModel([tuple(pair) for pair in spec["key"]], **options)
+
+async def _load_file(collection, path: str, whole: bool, model=None):
+    """Inserts (or, for incremental changes, upserts) a file with several batches in flight."""
+    if path.endswith(".json"):
+        reader = await asyncio.to_thread(_JsonFileReader, path, model)
+    else:
+        reader = await asyncio.to_thread(_BackupFileReader, path)
+    in_flight = set()
+    try:
+        # File reads and decompression run off the event loop
+        while (batch := await asyncio.to_thread(reader.next_batch)) is not None:
+            if len(in_flight) >= RESTORE_INSERTS_IN_FLIGHT:
+                done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            if whole:
+                write = collection.insert_many(batch, ordered=False)
+            else:
+                write = collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+            in_flight.add(asyncio.ensure_future(write))
+        if in_flight:
+            await asyncio.gather(*in_flight)
+        reader.digest = await asyncio.to_thread(lambda: reader.sha256)
+    except BaseException:
+        for task in in_flight:
+            task.cancel()
+        raise
+    finally:
+        await asyncio.to_thread(reader.close)
+    return reader
+
+async def _restore_collection(collection, steps: List[tuple], indexes: Optional[List[dict]], model=None) -> dict:
+    """
+    Loads into `collection` (a staging one). `steps`: (backup metadata, file
+    info, whole) in replay order, starting with a whole copy.
+    """
+    problems = []
+    await collection.drop()
+    for meta, info, whole in steps:
+        path = os.path.join(BACKUP_DIR, meta["name"], _backup_file(info))
+        reader = await _load_file(collection, path, whole, model)
+        label = f"{meta['name']}/{_backup_file(info)}"
+        if reader.count != info["count"]:
+            problems.append(f"{label}: {reader.count} documentos, se esperaban {info['count']}")
+        if info.get("sha256") and reader.digest != info["sha256"]:
+            problems.append(f"{label}: el checksum no coincide")
+
+    count = await collection.count_documents({})
+    # With incrementals the final count can't be known up front (upserts overlap)
+    if len(steps) == 1 and count != steps[0][1]["count"]:
+        name = collection.name[:-len(STAGING_SUFFIX)]
+        problems.append(f"{name}: {count} documentos cargados, se esperaban {steps[0][1]['count']}")
+
+    # Building indexes once after the load is much faster than maintaining them per insert
+    if indexes:
+        await collection.create_indexes([_index_model(spec) for spec in indexes])
+    return {"documents": count, "files": len(steps), "indexes": len(indexes or []), "problems": problems}
+
+async def restore_backup(name: str, target_db: str, progress=None) -> dict:
+    """
+    Loads backup `name` into database `target_db`, replaying its chain: the full
+    backup, then each incremental. Each collection starts from the last backup
+    that copied it whole, so older steps are skipped. Up to
+    RESTORE_COLLECTIONS_AT_ONCE collections load in parallel with unordered bulk
+    inserts; indexes recorded in the backup are built after loading.
+
+    Collections load into staging copies (STAGING_SUFFIX) and every file is
+    checked against metadata.json (document count and SHA-256). Only if all of
+    them pass do the copies replace the collections in `target_db`; otherwise
+    the copies are dropped, `target_db` is left untouched, the mismatches are
+    listed in `problems` and `verified` is False.
+    `progress(done, total, collection)` is awaited after each collection, if given.
+    Restoring into the live database (settings.DB_NAME) leaves
+    OPERATIONAL_COLLECTIONS as they are and reports them under `skipped`.
+    JSON backups from before the BSON format restore too (see _JsonFileReader).
+    """
+    chain = backup_chain(name)
+    plans = {}
+    indexes = {}
+    for meta in chain:
+        for info in meta["collections"]:
+            whole = meta.get("type") != "incremental" or info.get("mode") != "changes"
+            if whole or info["name"] not in plans:
+                plans[info["name"]] = []
+            plans[info["name"]].append((meta, info, whole))
+            if "indexes" in info:
+                indexes[info["name"]] = info["indexes"]
+
+    live = target_db == settings.DB_NAME
+    skipped = sorted(c for c in plans if live and c in OPERATIONAL_COLLECTIONS)
+    for coll_name in skipped:
+        del plans[coll_name]
+
+    client = motor.motor_asyncio.AsyncIOMotorClient(settings.MONGODB_URI)
+    db = client[target_db]
+    models = _models_by_collection()
+    report = {}
+    semaphore = asyncio.Semaphore(RESTORE_COLLECTIONS_AT_ONCE)
+    try:
+        async def restore_one(coll_name):
+            async with semaphore:
+                report[coll_name] = await _restore_collection(
+                    db[coll_name + STAGING_SUFFIX], plans[coll_name], indexes.get(coll_name), models.get(coll_name)
+                )
+            if progress:
+                await progress(len(report), len(plans), coll_name)
+
+        results = await asyncio.gather(*(restore_one(c) for c in plans), return_exceptions=True)
+        for coll_name, result in zip(plans, results):
+            if isinstance(result, Exception):
+                report[coll_name] = {"problems": [f"{coll_name}: {result}"]}
+
+        applied = not any(coll["problems"] for coll in report.values())
+        if applied:
+            for coll_name in plans:
+                await db[coll_name + STAGING_SUFFIX].rename(coll_name, dropTarget=True)
+    finally:
+        # Left over from a failed run (or this one if it did not verify)
+        for coll_name in plans:
+            await db[coll_name + STAGING_SUFFIX].drop()
+        client.close()
+
+    if live and applied:
+        # Synced frontend caches hold data newer than what was just restored
+        from app.services.sync_service import mark_reset_all
+        await mark_reset_all()
+        # The in-memory indexes describe the replaced data
+        from app.services.fuzzy_search import invalidate_search_indexes
+        from app.services.availability_service import invalidate_availability_index
+        invalidate_search_indexes()
+        invalidate_availability_index()
+
+    problems = [p for coll in report.values() for p in coll["problems"]]
+    return {
+        "backup": name,
+        "database": target_db,
+        "chain": [m["name"] for m in chain],
+        "collections": {c: report[c] for c in sorted(report)},
+        "skipped": skipped,
+        "verified": not problems,
+        "problems": problems,
+    }
 
 async def get_latest_backup_status():
     if not os.path.exists(BACKUP_DIR):
@@ -0,0 +1,148 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timezone, timedelta
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from app.models.debt_entry import DebtEntry
+from app.models.tutor import Tutor
+from app.services.sync_service import version_stamp
+
+KINDS = ("CHARGE", "PAYMENT", "ADJUSTMENT", "VOID")
+
+# Aging buckets (days since the charge), oldest last
+AGING_BUCKETS = [("0_30", 0, 30), ("31_60", 31, 60), ("61_90", 61, 90), ("90_plus", 91, None)]
+
+async def record_debt_entry(
+    tutor_id: PydanticObjectId,
+    kind: str,
+    amount: float,
+    user=None,
+    sale_id: Optional[PydanticObjectId] = None,
+    branch_id: Optional[PydanticObjectId] = None,
+    note: Optional[str] = None,
+    count_as_spent: bool = False
+) -> Optional[DebtEntry]:
+    """
+    Applies a signed change to Tutor.debt with an atomic $inc (no read-modify-write)
+    and appends the matching ledger entry with the resulting balance.
+    Returns None if the tutor does not exist.
+    """
+    if kind not in KINDS:
+        raise ValueError(f"Invalid debt entry kind: {kind}")
+
+    inc = {"debt": amount}
+    if count_as_spent:
+        inc["total_spent"] = amount
+
+    tutor = await Tutor.get_motor_collection().find_one_and_update(
+        {"_id": tutor_id},
+        {"$inc": inc, "$set": await version_stamp("tutors")},
+        projection={"debt": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if tutor is None:
+        return None
+
+    entry = DebtEntry(
+        tutor_id=tutor_id,
+        kind=kind,
+        amount=amount,
+        balance_after=tutor.get("debt", 0.0),
+        sale_id=sale_id,
+        branch_id=branch_id,
+        note=note,
+        created_by=user.id if user else None
+    )
+    await entry.insert()
+
+    from app.services.tutor_summary_service import on_debt_changed
+    await on_debt_changed(tutor_id, amount)
+    return entry
+
+async def reverse_sale_debt(sale, user=None, note: Optional[str] = None) -> Optional[DebtEntry]:
+    """When a DEBT sale is voided: takes its charge back off Tutor.debt with a VOID entry."""
+    if sale.payment_method != "DEBT" or not sale.customer_id:
+        return None
+    return await record_debt_entry(
+        sale.customer_id, "VOID", -sale.total,
+        user=user, sale_id=sale.id, branch_id=sale.branch_id, note=note
+    )
+
+async def add_to_total_spent(tutor_id: PydanticObjectId, amount: float):
+    await Tutor.get_motor_collection().update_one(
+        {"_id": tutor_id},
+        {"$inc": {"total_spent": amount}, "$set": await version_stamp("tutors")}
+    )
+
+async def get_statement(tutor_id: PydanticObjectId, limit: int = 50, skip: int = 0) -> Dict:
+    query = DebtEntry.find(DebtEntry.tutor_id == tutor_id)
+    total = await query.count()
+    entries = await query.sort("-created_at").skip(skip).limit(limit).to_list()
+    return {"total": total, "entries": entries}
+
+async def debt_aging_report(as_of: Optional[datetime] = None) -> Dict:
+    """
+    Ages outstanding balances by charge date. Charges are summed per bucket in
+    Mongo; payments and credit adjustments are then applied oldest bucket first (FIFO).
+    A voided sale's charge and its VOID entry cancel out and are left out.
+    """
+    now = as_of or datetime.now(timezone.utc)
+    voided = await DebtEntry.get_motor_collection().distinct(
+        "sale_id", {"kind": "VOID", "created_at": {"$lte": now}}
+    )
+
+    def charged_between(min_days: int, max_days: Optional[int]):
+        conditions = [{"$gt": ["$amount", 0]}, {"$lte": ["$created_at", now - timedelta(days=min_days)]}]
+        if max_days is not None:
+            conditions.append({"$gt": ["$created_at", now - timedelta(days=max_days + 1)]})
+        return {"$sum": {"$cond": [{"$and": conditions}, "$amount", 0]}}
+
+    group = {"_id": "$tutor_id"}
+    for name, min_days, max_days in AGING_BUCKETS:
+        group[name] = charged_between(min_days, max_days)
+    group["credits"] = {"$sum": {"$cond": [{"$lt": ["$amount", 0]}, {"$multiply": ["$amount", -1]}, 0]}}
+    group["last_payment"] = {"$max": {"$cond": [{"$eq": ["$kind", "PAYMENT"]}, "$created_at", None]}}
+
+    pipeline = [
+        {"$match": {"created_at": {"$lte": now}, "sale_id": {"$nin": voided}}},
+        {"$group": group},
+    ]
+    rows = await DebtEntry.get_motor_collection().aggregate(pipeline).to_list(length=None)
+
+    results: List[Dict] = []
+    totals = {name: 0.0 for name, _, _ in AGING_BUCKETS}
+    for row in rows:
+        buckets = {name: row[name] for name, _, _ in AGING_BUCKETS}
+        credit = row["credits"]
+        for name, _, _ in reversed(AGING_BUCKETS):
+            applied = min(buckets[name], credit)
+            buckets[name] -= applied
+            credit -= applied
+        balance = sum(buckets.values())
+        if balance <= 0:
+            continue
+        for name in totals:
+            totals[name] += buckets[name]
+        results.append({
+            "tutor_id": str(row["_id"]),
+            "balance": balance,
+            "last_payment": row["last_payment"],
+            **buckets
+        })
+
+    if results:
+        tutors = await Tutor.get_motor_collection().find(
+            {"_id": {"$in": [PydanticObjectId(r["tutor_id"]) for r in results]}},
+            {"first_name": 1, "last_name": 1, "phone": 1}
+        ).to_list(length=None)
+        names = {str(t["_id"]): t for t in tutors}
+        for r in results:
+            t = names.get(r["tutor_id"], {})
+            r["tutor_name"] = f"{t.get('first_name', '')} {t.get('last_name', '')}".strip() or "Desconocido"
+            r["phone"] = t.get("phone")
+
+    results.sort(key=lambda r: (r["90_plus"], r["61_90"], r["balance"]), reverse=True)
+    return {
+        "as_of": now,
+        "totals": {**totals, "balance": sum(totals.values())},
+        "tutors": results
+    }
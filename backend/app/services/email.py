@@ -1,5 +1,10 @@
+import os
+import json
+import uuid
 import logging
+import urllib3
 import sib_api_v3_sdk
+from datetime import datetime, timezone
 from sib_api_v3_sdk.rest import ApiException
 from app.core.config import settings
 
@@ -7,15 +12,19 @@ from app.core.config import settings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def send_email_sync(to_email: str, subject: str, body: str, html_body: str = None):
+# Seconds a Brevo request may take before it is aborted and counted as a failed attempt
+SEND_TIMEOUT = 30
+
+class EmailDeliveryError(Exception):
+    """Raised by a transport when the message was not accepted."""
+
+def deliver_brevo(to_email: str, subject: str, body: str, html_body: str = None):
     """
-    Sends an email using Brevo (Sendinblue) API.
+    Sends an email using Brevo (Sendinblue) API. Blocking; raises EmailDeliveryError.
     """
     api_key = settings.BREVO_API_KEY
     if not api_key:
-        logger.error("BREVO_API_KEY is not set. Cannot send email.")
-        print("DEBUG: Missing BREVO_API_KEY")
-        return
+        raise EmailDeliveryError("BREVO_API_KEY is not set. Cannot send email.")
 
     # Configure API key authorization: api-key
     configuration = sib_api_v3_sdk.Configuration()
@@ -23,13 +32,13 @@ def send_email_sync(to_email: str, subject: str, body: str, html_body: str = Non
 
     # Create an instance of the API class
     api_instance = sib_api_v3_sdk.TransactionalEmailsApi(sib_api_v3_sdk.ApiClient(configuration))
-    
+
     # Define sender (must be verified in Brevo provided user uses that domain)
-    # Using the MAIL_FROM setting or a fallback. 
+    # Using the MAIL_FROM setting or a fallback.
     # Note: Brevo requires the sender email to be verified.
     sender = {"name": "CalFer", "email": settings.MAIL_FROM or settings.MAIL_USERNAME or "no-reply@calfer.cl"}
     to = [{"email": to_email}]
-    
+
     send_smtp_email = sib_api_v3_sdk.SendSmtpEmail(
         to=to,
         sender=sender,
@@ -38,14 +47,49 @@ def send_email_sync(to_email: str, subject: str, body: str, html_body: str = Non
         text_content=body
     )
 
-    print(f"DEBUG: Attempting to send email via Brevo to: {to_email}")
-
     try:
-        api_response = api_instance.send_transac_email(send_smtp_email)
-        print(f"DEBUG: Brevo API Response: {api_response}")
-        logger.info(f"Email sent successfully via Brevo to {to_email}")
+        api_response = api_instance.send_transac_email(send_smtp_email, _request_timeout=SEND_TIMEOUT)
+        logger.info(f"Email sent successfully via Brevo to {to_email}: {api_response}")
     except ApiException as e:
-        logger.error(f"Failed to send email via Brevo: {e}")
-        print(f"DEBUG: FAILED to send email via Brevo. Error: {e}")
-        import traceback
-        traceback.print_exc()
+        raise EmailDeliveryError(f"Brevo rejected the email: {e.status} {e.reason}") from e
+    except urllib3.exceptions.HTTPError as e:
+        raise EmailDeliveryError(f"Brevo did not answer: {e}") from e
+
+def deliver_file(to_email: str, subject: str, body: str, html_body: str = None):
+    """
+    Local transport for development and tests: writes each message as a JSON file
+    into EMAIL_SINK_DIR instead of sending it.
+    """
+    os.makedirs(settings.EMAIL_SINK_DIR, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    path = os.path.join(settings.EMAIL_SINK_DIR, f"{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "to": to_email,
+            "subject": subject,
+            "body": body,
+            "html_body": html_body,
+            "sent_at": now.isoformat()
+        }, f, ensure_ascii=False, indent=2)
+
+TRANSPORTS = {
+    "brevo": deliver_brevo,
+    "file": deliver_file,
+}
+
+def deliver(to_email: str, subject: str, body: str, html_body: str = None):
+    """Sends through the configured EMAIL_TRANSPORT. Blocking; raises on failure."""
+    transport = TRANSPORTS.get(settings.EMAIL_TRANSPORT)
+    if transport is None:
+        raise EmailDeliveryError(f"Unknown EMAIL_TRANSPORT: {settings.EMAIL_TRANSPORT}")
+    transport(to_email, subject, body, html_body)
+
+def send_email_sync(to_email: str, subject: str, body: str, html_body: str = None):
+    """
+    Sends immediately, logging instead of raising. Blocking: request handlers
+    should use `app.services.email_outbox.enqueue_email` instead.
+    """
+    try:
+        deliver(to_email, subject, body, html_body)
+    except Exception as e:
+        logger.error(f"Failed to send email to {to_email}: {e}")
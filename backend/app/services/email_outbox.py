@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.core.config import settings
+from app.models.email_outbox import EmailOutbox
+from app.services.email import deliver, SEND_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+POLL_SECONDS = 5
+RETRY_BASE_SECONDS = 30
+RETRY_MAX_SECONDS = 3600
+# Backstop over the transport's own timeout: a send still running after this
+# fails the attempt, so a hung transport can't hold up the worker
+SEND_DEADLINE = SEND_TIMEOUT + 15
+# A message left in SENDING this long (worker crashed mid-send) is retried. Far
+# above SEND_DEADLINE, so no live send is handed to another worker
+STALE_SENDING = timedelta(minutes=10)
+# How often the worker looks for such messages
+RECOVER_SECONDS = STALE_SENDING.total_seconds() / 2
+
+_executor: Optional[ThreadPoolExecutor] = None
+_worker: Optional[asyncio.Task] = None
+_wake: Optional[asyncio.Event] = None
+
+def _now():
+    return datetime.now(timezone.utc)
+
+def retry_delay(attempts: int) -> timedelta:
+    """Exponential backoff: 30s, 60s, 120s... capped at one hour."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+async def enqueue_email(
+    to_email: str,
+    subject: str,
+    body: str,
+    html_body: str = None,
+    dedupe_key: Optional[str] = None
+) -> Optional[EmailOutbox]:
+    """Stores the message for the worker and returns right away (None if deduplicated)."""
+    message = EmailOutbox(to_email=to_email, subject=subject, body=body, html_body=html_body, dedupe_key=dedupe_key)
+    try:
+        await message.insert()
+    except DuplicateKeyError:
+        return None
+    if _wake is not None:
+        _wake.set()
+    return message
+
+async def enqueue_many(messages: List[Dict]) -> int:
+    """
+    Bulk enqueue in one unordered insert. Each dict takes the enqueue_email
+    arguments; messages whose dedupe_key is already queued are skipped.
+    Returns how many were inserted.
+    """
+    if not messages:
+        return 0
+    try:
+        result = await EmailOutbox.insert_many([EmailOutbox(**m) for m in messages], ordered=False)
+        inserted = len(result.inserted_ids)
+    except BulkWriteError as e:
+        if any(err.get("code") != 11000 for err in e.details.get("writeErrors", [])):
+            raise
+        inserted = e.details.get("nInserted", 0)
+    if inserted and _wake is not None:
+        _wake.set()
+    return inserted
+
+async def _claim() -> Optional[dict]:
+    now = _now()
+    return await EmailOutbox.get_motor_collection().find_one_and_update(
+        {"status": "PENDING", "next_attempt_at": {"$lte": now}},
+        {"$set": {"status": "SENDING", "updated_at": now}, "$inc": {"attempts": 1}},
+        sort=[("next_attempt_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def _send(doc: dict):
+    collection = EmailOutbox.get_motor_collection()
+    loop = asyncio.get_running_loop()
+    try:
+        # The transports are blocking HTTP / file calls; keep them off the event loop
+        await asyncio.wait_for(loop.run_in_executor(
+            _executor, deliver, doc["to_email"], doc["subject"], doc["body"], doc.get("html_body")
+        ), SEND_DEADLINE)
+    except Exception as e:
+        if isinstance(e, asyncio.TimeoutError):
+            e = f"no response after {SEND_DEADLINE} s"
+        attempts = doc.get("attempts", 1)
+        failed = attempts >= doc.get("max_attempts", 5)
+        await collection.update_one({"_id": doc["_id"]}, {"$set": {
+            "status": "FAILED" if failed else "PENDING",
+            "next_attempt_at": _now() + retry_delay(attempts),
+            "last_error": str(e)[:500],
+            "updated_at": _now(),
+        }})
+        logger.warning(f"Email to {doc['to_email']} failed (attempt {attempts}): {e}")
+        return
+
+    await collection.update_one({"_id": doc["_id"]}, {"$set": {
+        "status": "SENT", "sent_at": _now(), "last_error": None, "updated_at": _now()
+    }})
+
+async def _recover_stale():
+    await EmailOutbox.get_motor_collection().update_many(
+        {"status": "SENDING", "updated_at": {"$lt": _now() - STALE_SENDING}},
+        {"$set": {"status": "PENDING", "updated_at": _now()}}
+    )
+
+async def process_outbox(limit: Optional[int] = None) -> int:
+    """
+    Sends due messages with at most EMAIL_WORKER_CONCURRENCY in flight.
+    Returns how many were processed. Used by the worker loop and by scripts.
+    """
+    global _executor
+    concurrency = max(1, settings.EMAIL_WORKER_CONCURRENCY)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="email")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    in_flight = set()
+    processed = 0
+
+    async def run(doc):
+        try:
+            await _send(doc)
+        finally:
+            semaphore.release()
+
+    while limit is None or processed < limit:
+        await semaphore.acquire()
+        doc = await _claim()
+        if doc is None:
+            semaphore.release()
+            break
+        task = asyncio.create_task(run(doc))
+        in_flight.add(task)
+        task.add_done_callback(in_flight.discard)
+        processed += 1
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    return processed
+
+async def _loop():
+    next_recover = 0.0
+    while True:
+        try:
+            # Not only at startup: a send can also hang in a live worker
+            if time.monotonic() >= next_recover:
+                await _recover_stale()
+                next_recover = time.monotonic() + RECOVER_SECONDS
+            await process_outbox()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Email outbox worker error: {e}")
+        waiter = asyncio.ensure_future(_wake.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=POLL_SECONDS)
+        finally:
+            waiter.cancel()
+        _wake.clear()
+
+def start_email_worker():
+    global _worker, _wake
+    if _worker is not None and not _worker.done():
+        return
+    _wake = asyncio.Event()
+    _worker = asyncio.create_task(_loop())
+    print("--- EMAIL OUTBOX WORKER STARTED ---")
+
+async def stop_email_worker():
+    global _worker, _executor
+    if _worker is not None:
+        _worker.cancel()
+        try:
+            await _worker
+        except asyncio.CancelledError:
+            pass
+        _worker = None
+    if _executor is not None:
+        _executor.shutdown(wait=False)
+        _executor = None
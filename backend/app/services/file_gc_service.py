@@ -0,0 +1,274 @@
+import os
+import time
+import asyncio
+import contextlib
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from bson import ObjectId
+from app.core.config import settings
+from app.models.file_record import FileRecord
+from app.models.file_blob import FileBlob
+from app.services.file_service import BLOB_DIR, release_file
+from app.services.preview_service import VARIANTS
+
+# Records and files younger than this are never touched (uploads in flight)
+MIN_AGE = timedelta(days=1)
+BATCH_SIZE = 500
+# Share of wall time spent working; the rest is sleep, so the GC never hogs
+# the database or the disk even if it runs late into the morning
+DUTY_CYCLE = 0.25
+QUARANTINE_DIR = ".quarantine"
+# Report at most this many examples per category
+SAMPLE_SIZE = 50
+
+Progress = Callable[[int, int, str], Awaitable]
+
+class _Throttle:
+    def __init__(self, duty_cycle: float = DUTY_CYCLE):
+        self.idle_factor = (1 - duty_cycle) / duty_cycle
+        self.started = time.monotonic()
+
+    async def pause(self):
+        worked = time.monotonic() - self.started
+        await asyncio.sleep(worked * self.idle_factor)
+        self.started = time.monotonic()
+
+def _object_ids(values) -> List[ObjectId]:
+    return [ObjectId(v) for v in values if ObjectId.is_valid(v)]
+
+async def _existing_ids(collection: str, ids: List[ObjectId], projection: Optional[Dict] = None) -> Dict[str, Dict]:
+    db = FileRecord.get_motor_collection().database
+    cursor = db[collection].find({"_id": {"$in": ids}}, projection or {"_id": 1})
+    return {str(doc["_id"]): doc async for doc in cursor}
+
+async def _clinical_orphans(collection: str, reason: str, owner_ids: Set[str]) -> Dict[str, str]:
+    """Exam/consultation owners that are gone, or whose patient is gone."""
+    owners = await _existing_ids(collection, _object_ids(owner_ids), {"patient_id": 1})
+    patients = await _existing_ids("patients", list({doc["patient_id"] for doc in owners.values() if doc.get("patient_id")}))
+    orphans = {}
+    for owner_id in owner_ids:
+        owner = owners.get(owner_id)
+        if owner is None:
+            orphans[owner_id] = reason
+        elif str(owner.get("patient_id")) not in patients:
+            orphans[owner_id] = "paciente eliminado"
+    return orphans
+
+async def _unreferenced_signatures(records: List[Dict]) -> Set[str]:
+    """
+    A signature stays while its user still uses it or a prescription printed
+    with it does, even if the user was deleted: the prescription is reprinted
+    with it.
+    """
+    file_ids = [str(r["_id"]) for r in records]
+    db = FileRecord.get_motor_collection().database
+    used = set()
+    for collection in ("users", "prescriptions"):
+        cursor = db[collection].find({"signature_file_id": {"$in": file_ids}}, {"signature_file_id": 1})
+        used.update([doc["signature_file_id"] async for doc in cursor])
+    return {file_id for file_id in file_ids if file_id not in used}
+
+async def _orphan_reasons(batch: List[Dict]) -> Dict[str, str]:
+    """Orphaned record ids in the batch and why. Unknown owner types are left alone."""
+    by_type = defaultdict(set)
+    for record in batch:
+        by_type[record["owner_type"]].add(record["owner_id"])
+
+    orphan_owners = {}
+    for owner_type, collection, reason in (("exam", "exams", "examen eliminado"), ("consultation", "consultations", "consulta eliminada")):
+        if by_type[owner_type]:
+            orphan_owners[owner_type] = await _clinical_orphans(collection, reason, by_type[owner_type])
+
+    reasons = {}
+    for record in batch:
+        reason = orphan_owners.get(record["owner_type"], {}).get(record["owner_id"])
+        if reason:
+            reasons[str(record["_id"])] = reason
+    signatures = [r for r in batch if r["owner_type"] == "user_signature"]
+    if signatures:
+        for file_id in await _unreferenced_signatures(signatures):
+            reasons[file_id] = "firma en desuso"
+    return reasons
+
+async def _sweep_records(report: Dict, mode: str, dry_run: bool, throttle: _Throttle, progress: Optional[Progress]):
+    now = datetime.now(timezone.utc)
+    collection = FileRecord.get_motor_collection()
+    total = await collection.count_documents({})
+    quarantine_until = now - timedelta(days=settings.FILE_GC_QUARANTINE_DAYS)
+    # By _id: the ObjectId carries the insert time
+    cursor = collection.find(
+        {"_id": {"$lt": ObjectId.from_datetime(now - MIN_AGE)}},
+        {"owner_type": 1, "owner_id": 1, "size": 1, "quarantined_at": 1},
+        batch_size=BATCH_SIZE
+    )
+    batch, seen = [], 0
+
+    async def flush():
+        reasons = await _orphan_reasons(batch)
+        for record in batch:
+            file_id = str(record["_id"])
+            reason = reasons.get(file_id)
+            quarantined_at = record.get("quarantined_at")
+            if reason is None:
+                if quarantined_at and not dry_run:
+                    # Owner came back (e.g. restored from a backup)
+                    await collection.update_one({"_id": record["_id"]}, {"$unset": {"quarantined_at": ""}})
+                continue
+            report["orphan_records"] += 1
+            report["orphan_bytes"] += record.get("size", 0)
+            if len(report["records"]) < SAMPLE_SIZE:
+                report["records"].append({"id": file_id, "owner": f"{record['owner_type']}:{record['owner_id']}", "reason": reason})
+            if dry_run:
+                continue
+            if mode == "delete" or (quarantined_at and quarantined_at.replace(tzinfo=timezone.utc) < quarantine_until):
+                file_record = await FileRecord.get(record["_id"])
+                if file_record:
+                    await release_file(file_record)
+                    report["deleted_records"] += 1
+            elif not quarantined_at:
+                await collection.update_one({"_id": record["_id"]}, {"$set": {"quarantined_at": now}})
+                report["quarantined_records"] += 1
+        batch.clear()
+        if progress:
+            await progress(seen, total, "files")
+        await throttle.pause()
+
+    async for record in cursor:
+        batch.append(record)
+        seen += 1
+        if len(batch) >= BATCH_SIZE:
+            await flush()
+    if batch:
+        await flush()
+
+def _scan_uploads(root: str):
+    """Yields (relative path, stat) for every file under UPLOAD_DIR except the quarantine."""
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name != QUARANTINE_DIR:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield os.path.relpath(entry.path, root), entry.stat()
+
+def _derivative_base(rel_path: str) -> Optional[str]:
+    """blobs/ab/<sha>.thumb.webp -> blobs/ab/<sha>"""
+    parts = rel_path.rsplit(".", 2)
+    if len(parts) == 3 and parts[1] in VARIANTS:
+        return parts[0]
+    return None
+
+async def _unknown_paths(paths: List[str]) -> Set[str]:
+    """Which of these paths (blobs or pre-blob uploads) no record or blob accounts for."""
+    blob_shas = {os.path.basename(p): p for p in paths if p.startswith(BLOB_DIR + os.sep)}
+    legacy = [p for p in paths if not p.startswith(BLOB_DIR + os.sep)]
+    known = set()
+    if blob_shas:
+        cursor = FileBlob.get_motor_collection().find({"sha256": {"$in": list(blob_shas)}}, {"sha256": 1})
+        known.update([blob_shas[doc["sha256"]] async for doc in cursor])
+    if legacy:
+        cursor = FileRecord.get_motor_collection().find({"path": {"$in": legacy}}, {"path": 1})
+        known.update([doc["path"] async for doc in cursor])
+    return set(paths) - known
+
+async def _sweep_uploads(report: Dict, mode: str, dry_run: bool, throttle: _Throttle):
+    root = settings.UPLOAD_DIR
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - MIN_AGE.total_seconds()
+    stray = set()
+
+    def handle(rel_path: str, size: int, reason: str):
+        stray.add(rel_path)
+        report["stray_files"] += 1
+        report["stray_bytes"] += size
+        if len(report["files"]) < SAMPLE_SIZE:
+            report["files"].append({"path": rel_path, "reason": reason})
+        if dry_run:
+            return
+        full_path = os.path.join(root, rel_path)
+        # The blob GC or an upload may have moved it meanwhile
+        with contextlib.suppress(FileNotFoundError):
+            if mode == "delete":
+                os.remove(full_path)
+            else:
+                target = os.path.join(root, QUARANTINE_DIR, rel_path)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(full_path, target)
+
+    batch: Dict[str, int] = {}
+
+    async def flush():
+        for rel_path in await _unknown_paths(list(batch)):
+            handle(rel_path, batch[rel_path], "sin registro")
+        batch.clear()
+        await throttle.pause()
+
+    derivatives = []
+    for rel_path, stat in _scan_uploads(root):
+        if stat.st_mtime > cutoff:
+            continue
+        name = os.path.basename(rel_path)
+        if name.endswith(".tmp") or name.endswith(".gc"):
+            # Interrupted uploads, preview renders or blob GC runs
+            handle(rel_path, stat.st_size, "temporal abandonado")
+        elif name == rel_path and name.startswith("."):
+            # Not uploads: .gitkeep and the like at the top of UPLOAD_DIR
+            continue
+        elif _derivative_base(rel_path):
+            derivatives.append((rel_path, stat.st_size))
+        else:
+            batch[rel_path] = stat.st_size
+            if len(batch) >= BATCH_SIZE:
+                await flush()
+    if batch:
+        await flush()
+    # After the originals so previews of stray files go with them
+    for rel_path, size in derivatives:
+        base = _derivative_base(rel_path)
+        if base in stray or not os.path.exists(os.path.join(root, base)):
+            handle(rel_path, size, "vista previa sin original")
+
+def _purge_quarantine(report: Dict, dry_run: bool):
+    """Files moved to the quarantine are deleted after FILE_GC_QUARANTINE_DAYS."""
+    root = os.path.join(settings.UPLOAD_DIR, QUARANTINE_DIR)
+    if not os.path.isdir(root):
+        return
+    # Moving a file into the quarantine updates its ctime
+    cutoff = time.time() - settings.FILE_GC_QUARANTINE_DAYS * 86400
+    for rel_path, stat in _scan_uploads(root):
+        if stat.st_ctime < cutoff:
+            report["purged_files"] += 1
+            if not dry_run:
+                os.remove(os.path.join(root, rel_path))
+
+async def collect_orphan_files(dry_run: bool = False, mode: Optional[str] = None, progress: Optional[Progress] = None) -> Dict:
+    """
+    Finds FileRecords whose owner (or the owner's patient) is gone and files in
+    UPLOAD_DIR no record or blob accounts for. In "quarantine" mode (the
+    default) orphaned records are flagged and stray files moved to
+    UPLOAD_DIR/.quarantine, and both are deleted FILE_GC_QUARANTINE_DAYS later
+    if still orphaned; "delete" removes them right away. Record deletions only
+    release blobs, which the blob GC removes.
+    """
+    mode = mode or settings.FILE_GC_MODE
+    if mode not in ("quarantine", "delete"):
+        raise ValueError(f"Unknown mode: {mode}")
+    report = {
+        "dry_run": dry_run, "mode": mode,
+        "orphan_records": 0, "orphan_bytes": 0, "quarantined_records": 0, "deleted_records": 0,
+        "stray_files": 0, "stray_bytes": 0, "purged_files": 0,
+        "records": [], "files": [],
+    }
+    throttle = _Throttle()
+    await _sweep_records(report, mode, dry_run, throttle, progress)
+    await _sweep_uploads(report, mode, dry_run, throttle)
+    if mode == "quarantine":
+        _purge_quarantine(report, dry_run)
+    report["orphan_mb"] = round(report.pop("orphan_bytes") / 1024 / 1024, 1)
+    report["stray_mb"] = round(report.pop("stray_bytes") / 1024 / 1024, 1)
+    return report
@@ -1,44 +1,216 @@
-import shutil
 import os
 import uuid
+import asyncio
+import time
+import hashlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 from fastapi import UploadFile, HTTPException
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from app.core.config import settings
 from app.models.file_record import FileRecord
+from app.models.file_blob import FileBlob
+from app.services.preview_service import can_preview, remove_derivatives
 
 ALLOWED_MIME_TYPES = ["application/pdf", "image/jpeg", "image/png", "image/jpg"]
 MAX_FILE_SIZE = 10 * 1024 * 1024 # 10MB
+UPLOAD_CHUNK = 256 * 1024
+
+# Uploads are stored once per content, under UPLOAD_DIR/blobs/<2 hex>/<sha256>
+BLOB_DIR = "blobs"
+# An unreferenced blob is kept this long before the GC deletes it
+BLOB_GRACE = timedelta(hours=1)
+
+# FileRecords served recently, so repeat downloads (and 304s) skip the lookup.
+# Records never change after upload; the TTL bounds how long another worker
+# keeps serving one that was deleted elsewhere.
+RECORD_CACHE_SIZE = 2048
+RECORD_CACHE_TTL = 300
+_record_cache: "OrderedDict[str, tuple]" = OrderedDict()
+
+def _too_large():
+    return HTTPException(status_code=413, detail=f"File too large (max {MAX_FILE_SIZE // (1024 * 1024)} MB)")
+
+async def stream_to_disk(file: UploadFile, dest_dir: str, max_size: int = MAX_FILE_SIZE):
+    """
+    Copies an upload in chunks to a temp file in `dest_dir`, hashing it on the
+    way, and stops as soon as it grows past `max_size`. Reads and writes run in
+    threads so other requests are not stalled. Returns (temp_path, size, sha256);
+    the caller moves the temp file into place with os.replace (atomic on the same
+    filesystem) or removes it.
+    """
+    # The multipart parser already knows the size of most uploads
+    if file.size is not None and file.size > max_size:
+        raise _too_large()
+
+    os.makedirs(dest_dir, exist_ok=True)
+    tmp_path = os.path.join(dest_dir, f".upload-{uuid.uuid4().hex}.tmp")
+    digest = hashlib.sha256()
+    size = 0
+    out = await asyncio.to_thread(open, tmp_path, "wb")
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK):
+            size += len(chunk)
+            if size > max_size:
+                raise _too_large()
+            digest.update(chunk)
+            await asyncio.to_thread(out.write, chunk)
+        await asyncio.to_thread(out.close)
+    except BaseException:
+        out.close()
+        os.remove(tmp_path)
+        raise
+    return tmp_path, size, digest.hexdigest()
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+async def _acquire_blob(sha256: str, size: int, tmp_path: str) -> Dict:
+    """
+    Adds a reference to the blob for this content, creating it if needed. The
+    uploaded temp file becomes the blob only if the content isn't on disk yet.
+    """
+    collection = FileBlob.get_motor_collection()
+    now = datetime.now(timezone.utc)
+    for attempt in range(2):
+        try:
+            blob = await collection.find_one_and_update(
+                {"sha256": sha256},
+                {
+                    "$inc": {"ref_count": 1},
+                    "$set": {"released_at": None},
+                    "$setOnInsert": {"path": blob_path(sha256), "size": size, "created_at": now},
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            break
+        except DuplicateKeyError:
+            # Two uploads of new content raced on the upsert; the retry finds the blob
+            if attempt:
+                raise
+    full_path = os.path.join(settings.UPLOAD_DIR, blob["path"])
+    # Also covers a blob the GC is removing right now (see collect_unreferenced_blobs)
+    if not os.path.exists(full_path):
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        os.replace(tmp_path, full_path)
+    return blob
 
 async def save_upload_file(file: UploadFile, owner_type: str, owner_id: str, comment: str = None) -> FileRecord:
     if file.content_type not in ALLOWED_MIME_TYPES:
         raise HTTPException(status_code=400, detail="Invalid file type")
-    
-    # Check size? FastAPI doesn't easily give size before read, but we can check after read or stream.
-    # For simplicity, we trust stream or check length if Content-Length header exists.
-    
-    ext = file.filename.split(".")[-1]
-    filename = f"{uuid.uuid4()}.{ext}"
-    file_path = os.path.join(settings.UPLOAD_DIR, filename)
-    
-    # Ensure upload dir exists
-    os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # Get size
-    size = os.path.getsize(file_path)
-    if size > MAX_FILE_SIZE:
-        os.remove(file_path)
-        raise HTTPException(status_code=400, detail="File too large")
-        
+
+    tmp_path, size, sha256 = await stream_to_disk(file, settings.UPLOAD_DIR)
+    try:
+        # Identical content (the same lab PDF on several exams) shares one blob
+        blob = await _acquire_blob(sha256, size, tmp_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
     file_record = FileRecord(
         owner_type=owner_type,
         owner_id=owner_id,
-        path=filename, # Store relative filename
+        path=blob["path"], # Relative to UPLOAD_DIR
         original_name=file.filename,
         mime_type=file.content_type,
         size=size,
+        sha256=sha256,
         comment=comment
     )
-    await file_record.insert()
+    try:
+        await file_record.insert()
+    except Exception:
+        await _release_blob(sha256)
+        raise
+
+    if settings.PREVIEWS_EAGER and can_preview(file_record.mime_type):
+        from app.services.job_queue import submit_job
+        await submit_job("file_previews", {"file_id": str(file_record.id)})
     return file_record
+
+async def _release_blob(sha256: str):
+    collection = FileBlob.get_motor_collection()
+    blob = await collection.find_one_and_update(
+        {"sha256": sha256, "ref_count": {"$gt": 0}},
+        {"$inc": {"ref_count": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob and blob["ref_count"] == 0:
+        await collection.update_one(
+            {"_id": blob["_id"], "ref_count": 0},
+            {"$set": {"released_at": datetime.now(timezone.utc)}}
+        )
+
+def is_content_addressed(file_record: FileRecord) -> bool:
+    return bool(file_record.sha256) and file_record.path.startswith(BLOB_DIR + os.sep)
+
+async def get_file_record(file_id: str) -> Optional[FileRecord]:
+    """FileRecord.get through a small in-process LRU."""
+    now = time.monotonic()
+    cached = _record_cache.get(file_id)
+    if cached and cached[0] > now:
+        _record_cache.move_to_end(file_id)
+        return cached[1]
+    file_record = await FileRecord.get(file_id)
+    if file_record is None:
+        _record_cache.pop(file_id, None)
+        return None
+    _record_cache[file_id] = (now + RECORD_CACHE_TTL, file_record)
+    _record_cache.move_to_end(file_id)
+    if len(_record_cache) > RECORD_CACHE_SIZE:
+        _record_cache.popitem(last=False)
+    return file_record
+
+def forget_file_record(file_id: str):
+    _record_cache.pop(str(file_id), None)
+
+async def release_file(file_record: FileRecord):
+    """
+    Deletes a FileRecord. Its blob loses a reference and is removed by the blob
+    GC once unreferenced; files stored before blobs are deleted right away.
+    """
+    await file_record.delete()
+    forget_file_record(file_record.id)
+    if is_content_addressed(file_record):
+        await _release_blob(file_record.sha256)
+        return
+    file_path = os.path.join(settings.UPLOAD_DIR, file_record.path)
+    remove_derivatives(file_path)
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+        except Exception as e:
+            print(f"Error deleting file from disk: {e}")
+
+async def release_owner_files(owner_type: str, owner_id: str):
+    for file_record in await FileRecord.find(FileRecord.owner_type == owner_type, FileRecord.owner_id == owner_id).to_list():
+        await release_file(file_record)
+
+async def collect_unreferenced_blobs(grace: timedelta = BLOB_GRACE) -> Dict:
+    """
+    Deletes blobs unreferenced for longer than `grace`. The file is moved aside
+    before the record is deleted, and put back if an upload took a new
+    reference in between; an upload that finds the file missing writes its own
+    (identical) copy, so a racing upload never ends up without its file.
+    """
+    collection = FileBlob.get_motor_collection()
+    cutoff = datetime.now(timezone.utc) - grace
+    deleted, freed = 0, 0
+    async for blob in collection.find({"ref_count": 0, "released_at": {"$lt": cutoff}}):
+        full_path = os.path.join(settings.UPLOAD_DIR, blob["path"])
+        doomed = full_path + ".gc"
+        if os.path.exists(full_path):
+            os.replace(full_path, doomed)
+        result = await collection.delete_one({"_id": blob["_id"], "ref_count": 0})
+        if result.deleted_count:
+            if os.path.exists(doomed):
+                os.remove(doomed)
+            remove_derivatives(full_path)
+            deleted += 1
+            freed += blob.get("size", 0)
+        elif os.path.exists(doomed):
+            os.replace(doomed, full_path)
+    return {"deleted": deleted, "freed_mb": round(freed / 1024 / 1024, 1)}
@@ -0,0 +1,370 @@
+import re
+import math
+import heapq
+import bisect
+import asyncio
+import unicodedata
+from typing import Dict, List, Optional, Set, Tuple
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_NON_DIGIT = re.compile(r"\D+")
+_PHONE_LIKE = re.compile(r"^[\d\s()+-]+$")
+
+# How many ranked ids the list endpoints pull from the index before applying
+# their own Mongo filters (role, debt, etc.) and paging.
+FUZZY_CANDIDATES = 500
+DEFAULT_THRESHOLD = 0.4
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse anything non alphanumeric to spaces."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", text).strip()
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm style trigrams: every word padded with two leading spaces and one trailing."""
+    grams = set()
+    for word in normalize(text).split():
+        padded = f"  {word} "
+        for i in range(len(padded) - 2):
+            grams.add(padded[i:i + 3])
+    return grams
+
+def phone_digits(phone: str) -> str:
+    return _NON_DIGIT.sub("", phone or "")
+
+def is_phone_query(query: str) -> bool:
+    return bool(query) and bool(_PHONE_LIKE.match(query)) and any(c.isdigit() for c in query)
+
+class TrigramIndex:
+    """
+    In-memory fuzzy index for short texts such as person or pet names.
+
+    Trigrams are indexed per distinct *word* rather than per document: a clinic has
+    far fewer distinct names than records, so a query word is first matched against
+    the vocabulary (pg_trgm similarity) and the matching words are then expanded to
+    the documents that contain them. Phones are kept in a sorted list and matched by
+    prefix on their digits, which is how they are typed at the front desk.
+    """
+
+    def __init__(self):
+        # Vocabulary
+        self._word_slots: Dict[str, int] = {}
+        self._words: List[Optional[str]] = []
+        self._word_sizes: List[int] = []
+        self._word_docs: List[Set[int]] = []
+        self._free_words: List[int] = []
+        self._postings: Dict[str, Set[int]] = {}
+        # Documents
+        self._slots: Dict[str, int] = {}
+        self._keys: List[Optional[str]] = []
+        self._doc_words: List[Tuple[str, ...]] = []
+        self._doc_texts: List[Optional[str]] = []
+        self._free_docs: List[int] = []
+        self._phones: List[Tuple[str, int]] = []
+
+    def __len__(self):
+        return len(self._slots)
+
+    def __contains__(self, key: str):
+        return key in self._slots
+
+    def _add_word(self, word: str, doc: int):
+        slot = self._word_slots.get(word)
+        if slot is None:
+            grams = trigrams(word)
+            if self._free_words:
+                slot = self._free_words.pop()
+                self._words[slot] = word
+                self._word_sizes[slot] = len(grams)
+                self._word_docs[slot] = set()
+            else:
+                slot = len(self._words)
+                self._words.append(word)
+                self._word_sizes.append(len(grams))
+                self._word_docs.append(set())
+            self._word_slots[word] = slot
+            for g in grams:
+                posting = self._postings.get(g)
+                if posting is None:
+                    self._postings[g] = {slot}
+                else:
+                    posting.add(slot)
+        self._word_docs[slot].add(doc)
+
+    def _remove_word(self, word: str, doc: int):
+        slot = self._word_slots.get(word)
+        if slot is None:
+            return
+        docs = self._word_docs[slot]
+        docs.discard(doc)
+        if docs:
+            return
+        for g in trigrams(word):
+            posting = self._postings.get(g)
+            if posting is not None:
+                posting.discard(slot)
+                if not posting:
+                    del self._postings[g]
+        del self._word_slots[word]
+        self._words[slot] = None
+        self._word_sizes[slot] = 0
+        self._free_words.append(slot)
+
+    def add(self, key: str, text: str, phone: Optional[str] = None):
+        """Insert or replace the document stored under `key`."""
+        digits = phone_digits(phone)
+        stored = f"{text}\x00{digits}"
+        if key in self._slots:
+            if self._doc_texts[self._slots[key]] == stored:
+                return
+            self.remove(key)
+
+        words = tuple(set(normalize(text).split()))
+        if self._free_docs:
+            doc = self._free_docs.pop()
+            self._keys[doc] = key
+            self._doc_words[doc] = words
+            self._doc_texts[doc] = stored
+        else:
+            doc = len(self._keys)
+            self._keys.append(key)
+            self._doc_words.append(words)
+            self._doc_texts.append(stored)
+        self._slots[key] = doc
+
+        for w in words:
+            self._add_word(w, doc)
+        if digits:
+            bisect.insort(self._phones, (digits, doc))
+
+    def remove(self, key: str):
+        doc = self._slots.pop(key, None)
+        if doc is None:
+            return
+        for w in self._doc_words[doc]:
+            self._remove_word(w, doc)
+        digits = self._doc_texts[doc].split("\x00", 1)[1]
+        if digits:
+            i = bisect.bisect_left(self._phones, (digits, doc))
+            if i < len(self._phones) and self._phones[i] == (digits, doc):
+                del self._phones[i]
+        self._keys[doc] = None
+        self._doc_words[doc] = ()
+        self._doc_texts[doc] = None
+        self._free_docs.append(doc)
+
+    def similar_words(self, word: str, threshold: float = DEFAULT_THRESHOLD, limit: int = 64) -> List[Tuple[float, int]]:
+        """Vocabulary words whose trigram similarity with `word` reaches `threshold`."""
+        q_grams = trigrams(word)
+        n = len(q_grams)
+        if n == 0:
+            return []
+
+        lists = sorted(
+            (self._postings[g] for g in q_grams if g in self._postings),
+            key=len
+        )
+        # similarity = shared / (n + size - shared) >= threshold implies
+        # shared >= threshold * n, which bounds the candidates to check.
+        min_shared = max(1, math.ceil(threshold * n - 1e-9))
+        if len(lists) < min_shared:
+            return []
+
+        # Prefix filtering: a word sharing at least `min_shared` query trigrams must
+        # appear in one of the (len - min_shared + 1) rarest postings.
+        cut = len(lists) - min_shared + 1
+        counts: Dict[int, int] = {}
+        for posting in lists[:cut]:
+            for slot in posting:
+                counts[slot] = counts.get(slot, 0) + 1
+
+        rest = lists[cut:]
+        scored = []
+        for slot, shared in counts.items():
+            for posting in rest:
+                if slot in posting:
+                    shared += 1
+            similarity = shared / (n + self._word_sizes[slot] - shared)
+            if similarity >= threshold:
+                scored.append((similarity, slot))
+        return heapq.nlargest(limit, scored)
+
+    def _phone_matches(self, query: str) -> Set[int]:
+        digits = phone_digits(query)
+        prefixes = {digits}
+        if not digits.startswith("56"):
+            prefixes.add(("56" if digits.startswith("9") else "569") + digits)
+        found = set()
+        for prefix in prefixes:
+            i = bisect.bisect_left(self._phones, (prefix, -1))
+            while i < len(self._phones) and self._phones[i][0].startswith(prefix):
+                found.add(self._phones[i][1])
+                i += 1
+                if len(found) >= FUZZY_CANDIDATES:
+                    return found
+        return found
+
+    def search(self, query: str, limit: int = 50, threshold: float = DEFAULT_THRESHOLD) -> List[Tuple[str, float]]:
+        """
+        Returns up to `limit` (key, score) pairs ordered by similarity.
+        Each query word contributes its best matching word in the document; the score
+        is the average over query words, so "Catalna Rojaz" ranks documents that match
+        both words above those matching only one.
+        """
+        if is_phone_query(query):
+            return [(self._keys[doc], 1.0) for doc in sorted(self._phone_matches(query))[:limit]]
+
+        q_words = list(dict.fromkeys(normalize(query).split()))
+        if not q_words:
+            return []
+
+        # Per query word, its matching documents grouped by similarity: each
+        # document only in the level of its best matching word
+        per_word = []
+        for q in q_words:
+            levels, seen = [], set()
+            for similarity, slot in self.similar_words(q, threshold):
+                docs = self._word_docs[slot] - seen
+                if docs:
+                    levels.append((similarity, docs))
+                    seen |= docs
+            if levels:
+                per_word.append(levels)
+        if not per_word:
+            return []
+
+        # Documents grouped by total score, one query word at a time, with set
+        # operations instead of per document bookkeeping. Scores only grow, so
+        # once `limit` documents reach some score, groups that can't catch up
+        # even with the best match on every remaining word are dropped.
+        groups = [(0.0, set().union(*(docs for levels in per_word for _, docs in levels)))]
+        remaining = sum(levels[0][0] for levels in per_word)
+        for levels in per_word:
+            remaining -= levels[0][0]
+            merged: Dict[float, Set[int]] = {}
+            for score, docs in groups:
+                docs = set(docs)
+                for similarity, level_docs in levels:
+                    hit = docs & level_docs
+                    if hit:
+                        docs -= hit
+                        merged.setdefault(score + similarity, set()).update(hit)
+                        if not docs:
+                            break
+                if docs:
+                    merged.setdefault(score, set()).update(docs)
+            groups = sorted(merged.items(), reverse=True)
+            reached = 0
+            for score, docs in groups:
+                reached += len(docs)
+                if reached >= limit:
+                    # Tolerance for the float sums being added up in another order
+                    groups = [g for g in groups if g[0] + remaining >= score - 1e-9]
+                    break
+
+        # Ties go to documents with fewer words (the closer match), then to the
+        # oldest entry
+        n = len(q_words)
+        doc_words = self._doc_words
+        results = []
+        for score, docs in groups:
+            wanted = limit - len(results)
+            if wanted <= 0:
+                break
+            for doc in heapq.nsmallest(wanted, docs, key=lambda d: (len(doc_words[d]), d)):
+                results.append((self._keys[doc], round(score / n, 4)))
+        return results
+
+# --- Application indexes ---
+
+tutor_index = TrigramIndex()
+patient_index = TrigramIndex()
+
+_built = False
+# Bumped by invalidate_search_indexes; a build that started before it is stale
+_generation = 0
+_build_task: Optional[asyncio.Task] = None
+# Incremental writes made while a build runs, replayed onto the new indexes
+# before they replace the live ones
+_changes: Optional[List[Tuple[TrigramIndex, str, tuple]]] = None
+
+def _write(index: TrigramIndex, method: str, *args):
+    getattr(index, method)(*args)
+    if _changes is not None:
+        _changes.append((index, method, args))
+
+def index_tutor(tutor):
+    _write(tutor_index, "add", str(tutor.id), f"{tutor.first_name} {tutor.last_name}", tutor.phone)
+
+def index_patient(patient):
+    _write(patient_index, "add", str(patient.id), patient.name or "")
+
+def unindex_tutor(tutor_id: str):
+    _write(tutor_index, "remove", str(tutor_id))
+
+def unindex_patient(patient_id: str):
+    _write(patient_index, "remove", str(patient_id))
+
+async def build_search_indexes(batch_size: int = 2000):
+    """Loads every tutor and patient (projected to the indexed fields) into memory."""
+    global _built, _changes
+    generation = _generation
+    from app.models.tutor import Tutor
+    from app.models.patient import Patient
+
+    _changes = []
+    try:
+        tutors = TrigramIndex()
+        cursor = Tutor.get_motor_collection().find(
+            {}, {"first_name": 1, "last_name": 1, "phone": 1}, batch_size=batch_size
+        )
+        async for doc in cursor:
+            tutors.add(str(doc["_id"]), f"{doc.get('first_name') or ''} {doc.get('last_name') or ''}", doc.get("phone"))
+
+        patients = TrigramIndex()
+        cursor = Patient.get_motor_collection().find({}, {"name": 1}, batch_size=batch_size)
+        async for doc in cursor:
+            patients.add(str(doc["_id"]), doc.get("name") or "")
+
+        # The cursors may have read a document before a write the hooks made
+        # meanwhile; replaying in order leaves the latest state
+        fresh = {tutor_index: tutors, patient_index: patients}
+        for index, method, args in _changes:
+            getattr(fresh[index], method)(*args)
+    finally:
+        _changes = None
+
+    # Swap contents in place so modules holding a reference keep working
+    tutor_index.__dict__.update(tutors.__dict__)
+    patient_index.__dict__.update(patients.__dict__)
+    # Invalidated meanwhile: the next ensure_search_indexes builds again
+    _built = generation == _generation
+    print(f"--- SEARCH INDEX BUILT: {len(tutor_index)} tutors, {len(patient_index)} patients ---")
+
+def search_indexes_ready() -> bool:
+    return _built
+
+def start_search_index_build() -> asyncio.Task:
+    """Starts the build in the background, or returns the one already running."""
+    global _build_task
+    if _build_task is None or _build_task.done():
+        _build_task = asyncio.create_task(build_search_indexes())
+    return _build_task
+
+async def ensure_search_indexes():
+    """
+    Waits until the indexes are built. The build is a shared task behind
+    asyncio.shield: a caller that gives up (a timeout, a dropped request)
+    leaves it running instead of cancelling it.
+    """
+    while not _built:
+        await asyncio.shield(start_search_index_build())
+
+def invalidate_search_indexes():
+    """Bulk writes (imports, mass deletes) bypass the incremental hooks; rebuild lazily."""
+    global _built, _generation
+    _built = False
+    _generation += 1
@@ -0,0 +1,587 @@
+import io
+import os
+import csv
+import codecs
+from itertools import islice
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from beanie import PydanticObjectId
+from pymongo import UpdateOne
+from app.models.tutor import Tutor
+from app.models.product import Product
+from app.models.supplier import Supplier
+from app.models.branch import Branch
+from app.models.stock import Stock
+from app.models.inventory import InventoryMovement
+from app.services.sync_service import mark_reset, stamp_documents, version_stamp
+from app.services.live_events import publish_resync
+
+# Rows inserted (and checkpointed) per batch
+BATCH_SIZE = 500
+# Bytes read up front to pick the encoding and delimiter
+SAMPLE_BYTES = 64 * 1024
+
+def parse_currency(value: str, is_percentage: bool = False) -> float:
+    if not value or str(value).strip() == "":
+        return 0.0
+
+    # Remove symbols
+    clean_val = str(value).replace('$', '').replace('%', '').strip()
+
+    # Handle thousands/decimal separators
+    # If there's a dot AND a comma, dot is thousands, comma is decimal
+    if '.' in clean_val and ',' in clean_val:
+        clean_val = clean_val.replace('.', '').replace(',', '.')
+    elif ',' in clean_val:
+        # If there's only a comma, it's likely decimal
+        clean_val = clean_val.replace(',', '.')
+    elif '.' in clean_val:
+        # If there's only a dot, it could be thousands (1.064) or decimal (1.5)
+        # In Chile, dots are typically thousands.
+        # But for small numbers (like 19.0 or 0.19), it's likely decimal.
+        parts = clean_val.split('.')
+        if not is_percentage and len(parts[-1]) == 3:
+            # Likely thousands separator: 1.064
+            clean_val = clean_val.replace('.', '')
+        else:
+            # Likely decimal or small number: 19.0 or 1.5
+            pass
+
+    try:
+        return float(clean_val)
+    except ValueError:
+        return 0.0
+
+# --- Reading ---
+# Files are read row by row: only a sample is decoded up front, header aliases
+# are resolved to column positions once, and rows are plain lists.
+
+def detect_format(path: str) -> Tuple[str, str]:
+    """Encoding (utf-8 or latin-1) and delimiter, from the first bytes of the file."""
+    with open(path, "rb") as f:
+        sample = f.read(SAMPLE_BYTES)
+    if not sample.strip():
+        raise ValueError("El archivo está vacío")
+
+    encoding = "utf-8-sig"
+    try:
+        # final=False: a character cut at the end of the sample is not an error
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+    except UnicodeDecodeError:
+        encoding = "latin-1"
+
+    # Detect delimiter
+    delimiter = ','
+    first_line = sample.decode(encoding, errors="ignore").splitlines()[0]
+    if '\t' in first_line:
+        delimiter = '\t'
+    elif ';' in first_line:
+        delimiter = ';'
+    return encoding, delimiter
+
+class Columns:
+    """Header positions, looked up by any of a field's aliases (case and spacing ignored)."""
+
+    def __init__(self, header: List[str]):
+        self.names = [str(h).strip().lstrip('\ufeff') for h in header]
+        self._positions: Dict[str, int] = {}
+        for i, name in enumerate(self.names):
+            self._positions.setdefault(name.lower(), i)
+
+    def find(self, *aliases: str) -> Optional[int]:
+        # Like the old per-row lookup: the leftmost matching column wins
+        found = [self._positions[a.strip().lower()] for a in aliases if a.strip().lower() in self._positions]
+        return min(found) if found else None
+
+def cell(row: List[str], position: Optional[int]) -> Optional[str]:
+    if position is None or position >= len(row):
+        return None
+    return row[position]
+
+class CsvSource:
+    """An uploaded CSV/TXT opened for streaming. Use as a context manager."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.size = os.path.getsize(path)
+        self.encoding, self.delimiter = detect_format(path)
+        self._raw = None
+        self._text = None
+
+    def __enter__(self) -> "CsvSource":
+        self._raw = open(self.path, "rb")
+        # Strict: a file that only looked like utf-8 in the sample raises
+        # UnicodeDecodeError later, and _run_batches reads it again as latin-1
+        self._text = io.TextIOWrapper(self._raw, encoding=self.encoding, newline="")
+        self._reader = csv.reader(self._text, delimiter=self.delimiter)
+        self.columns = Columns(next(self._reader, []))
+        return self
+
+    def reopen(self, encoding: str):
+        """Starts reading again from the first data row with another encoding."""
+        self._text.close()
+        self.encoding = encoding
+        self.__enter__()
+
+    def __exit__(self, *exc):
+        self._text.close()
+
+    def rows(self) -> Iterator[List[str]]:
+        return self._reader
+
+    @property
+    def fraction_read(self) -> float:
+        return self._raw.tell() / self.size if self.size else 1.0
+
+# --- Row parsers ---
+# Each factory resolves its columns once and returns a function that parses a row.
+
+def tutor_parser(cols: Columns) -> Callable[[List[str]], Optional[Tutor]]:
+    first_col = cols.find("Nombre", "first_name", "FirstName")
+    last_col = cols.find("Apellidos", "last_name", "LastName")
+    full_col = cols.find("full_name", "Nombre Completo")
+    phone_col = cols.find("Teléfono", "phone", "Telefono", "Celular")
+    email_col = cols.find("Email", "email", "Correo")
+    spent_col = cols.find("Total gastado", "total_spent", "Gasto")
+
+    def parse(row: List[str]) -> Optional[Tutor]:
+        first_name = cell(row, first_col) or ""
+        last_name = cell(row, last_col) or ""
+        full_name = cell(row, full_col) or f"{first_name} {last_name}".strip()
+
+        if not first_name and not last_name and not full_name:
+            return None
+
+        phone = cell(row, phone_col) or ""
+        email = cell(row, email_col)
+
+        # Clean email and phone
+        if email: email = email.strip()
+        if not email: email = None
+
+        if phone: phone = phone.strip()
+
+        raw_total_spent = cell(row, spent_col)
+        total_spent_val = parse_currency(raw_total_spent) if raw_total_spent else 0.0
+
+        notes = f"Importado. Gasto Histórico: {raw_total_spent}" if raw_total_spent else ""
+
+        return Tutor(
+            first_name=first_name if first_name else full_name,
+            last_name=last_name if last_name else "",
+            phone=phone,
+            email=email,
+            notes=notes,
+            discount_percent=0.0,
+            total_spent=total_spent_val,
+            is_tutor=False,
+            is_client=True
+        )
+    return parse
+
+def stock_columns(cols: Columns) -> List[Tuple[int, str]]:
+    """(position, branch name) of per-branch stock columns such as "Stock Bodega"."""
+    found = []
+    for position, key in enumerate(cols.names):
+        if not key: continue
+        key_upper = key.upper().strip()
+
+        # Pattern: "CANTIDAD EN STOCK BODEGA" or "STOCK BODEGA" or "EXISTENCIA BODEGA"
+        match_keywords = ["CANTIDAD EN STOCK", "STOCK", "EXISTENCIA", "CANTIDAD"]
+        for kw in match_keywords:
+            if key_upper.startswith(kw):
+                branch_name = key_upper.replace(kw, "").replace("[", "").replace("]", "").strip()
+                if branch_name == "VENCIMIENTO" or branch_name == "VALOR":
+                    continue
+                if not branch_name:
+                    branch_name = "Principal"
+                found.append((position, branch_name))
+                break # Found a match for this key
+    return found
+
+# Product fields read from the file, with the header aliases for each. An upsert
+# import compares and updates only the ones whose column is in the file.
+PRODUCT_COLUMNS = {
+    "external_id": ("Id", "external_id", "ID Sistema"),
+    "name": ("Nombre Artículo", "name", "Producto", "Artículo"),
+    "sku": ("UPC/EAN/ISBN", "sku", "Código", "Barcode"),
+    "category": ("Categoría", "category", "Grupo"),
+    "supplier_name": ("Nombre de la Compañía", "supplier_name", "Proveedor"),
+    "purchase_price": ("Precio de Compra", "purchase_price", "Costo"),
+    "sale_price": ("Precio de Venta", "sale_price", "Precio"),
+    "tax_percent": ("Porcentaje de Impuesto(s)", "tax_percent", "IVA", "Impuesto"),
+    "avatar": ("Avatar", "image_url", "Imagen", "Foto"),
+}
+
+def product_fields_in(cols: Columns) -> List[str]:
+    return [field for field, aliases in PRODUCT_COLUMNS.items() if cols.find(*aliases) is not None]
+
+def product_parser(cols: Columns) -> Callable[[List[str]], Optional[Tuple[Product, Dict[str, int]]]]:
+    """The parser returns (product, {branch_name: qty}) or None if the row has no name."""
+    pos = {field: cols.find(*aliases) for field, aliases in PRODUCT_COLUMNS.items()}
+
+    branch_cols = stock_columns(cols)
+    # Fallback: simple "Stock" + "Sucursal" columns if no specific headers found
+    fallback_stock_col = cols.find("Stock", "Cantidad", "Existencia", "Stock Actual")
+    fallback_branch_col = cols.find("Sucursal", "Branch", "Bodega", "Ubicación")
+
+    def parse(row: List[str]):
+        name = cell(row, pos["name"])
+        if not name:
+            return None
+
+        ext_id_str = cell(row, pos["external_id"])
+        ext_id = None
+        if ext_id_str:
+            try:
+                ext_id = int(float(ext_id_str))
+            except ValueError:
+                pass
+
+        product = Product(
+            external_id=ext_id,
+            name=name,
+            sku=cell(row, pos["sku"]) or None,
+            category=cell(row, pos["category"]) or None,
+            supplier_name=cell(row, pos["supplier_name"]) or None,
+            purchase_price=parse_currency(cell(row, pos["purchase_price"]) or "0"),
+            sale_price=parse_currency(cell(row, pos["sale_price"]) or "0"),
+            tax_percent=parse_currency(cell(row, pos["tax_percent"]) or "0", is_percentage=True),
+            avatar=cell(row, pos["avatar"]) or None,
+            kind="PRODUCT",
+            is_active=True
+        )
+
+        # An unreadable quantity ("nan", "inf") skips that stock, not the row
+        branch_stocks = {}
+        for position, branch_name in branch_cols:
+            try:
+                branch_stocks[branch_name] = int(parse_currency(cell(row, position) or "0"))
+            except (ValueError, OverflowError):
+                pass
+        if not branch_cols:
+            stock_val = cell(row, fallback_stock_col)
+            if stock_val is not None:
+                branch_name = cell(row, fallback_branch_col) or "Principal"
+                try:
+                    branch_stocks[branch_name] = int(parse_currency(stock_val or "0"))
+                except (ValueError, OverflowError):
+                    pass
+
+        return product, branch_stocks
+    return parse
+
+def supplier_parser(cols: Columns) -> Callable[[List[str]], Optional[Supplier]]:
+    company_col = cols.find("Nombre de la Compañía", "name")
+    agency_col = cols.find("Nombre de la Agencia")
+    first_col = cols.find("Nombre")
+    last_col = cols.find("Apellidos")
+    phone_col = cols.find("Teléfono", "phone")
+    email_col = cols.find("Email", "email")
+
+    def parse(row: List[str]) -> Optional[Supplier]:
+        first = cell(row, first_col) or ""
+        last = cell(row, last_col) or ""
+        company_name = cell(row, company_col) or cell(row, agency_col) or f"{first} {last}".strip()
+        if not company_name:
+            return None
+
+        return Supplier(
+            name=company_name,
+            contact_name=f"{first} {last}".strip(),
+            phone=cell(row, phone_col),
+            email=cell(row, email_col),
+            is_active=True
+        )
+    return parse
+
+# --- Job handlers ---
+# Rows are inserted in batches; after each batch the row offset is checkpointed,
+# so a job resumed after a restart skips what is already in the database.
+
+async def _run_batches(ctx, source: CsvSource, parse, insert_batch):
+    """
+    Parses rows as they are read and flushes every BATCH_SIZE parsed items.
+    A file that turns out not to be utf-8 past the sample is read again as
+    latin-1 from the last flushed row: both encodings agree on the ASCII
+    newlines, quotes and delimiters, so row offsets don't change.
+    """
+    ctx.counters.setdefault("imported", 0)
+    ctx.counters.setdefault("skipped", 0)
+    flushed = {"rows_done": ctx.checkpoint.get("rows_done", 0), "skipped": ctx.counters["skipped"]}
+
+    async def flush(batch, rows_done):
+        if batch:
+            await insert_batch(batch)
+        ctx.counters["imported"] += len(batch)
+        ctx.counters["processed"] = rows_done
+        flushed.update(rows_done=rows_done, skipped=ctx.counters["skipped"])
+        await ctx.save_checkpoint(rows_done=rows_done)
+        await ctx.progress(100.0 * source.fraction_read, force=True)
+
+    while True:
+        rows = source.rows()
+        rows_done = flushed["rows_done"]
+        if rows_done:
+            # Resuming: skip what an earlier attempt already inserted
+            for _ in islice(rows, rows_done):
+                pass
+        batch = []
+        try:
+            for row in rows:
+                rows_done += 1
+                if not row:
+                    continue # Blank line
+                try:
+                    item = parse(row)
+                except Exception as e:
+                    print(f"Error parsing import row {rows_done}: {e}")
+                    item = None
+                if item is None:
+                    ctx.counters["skipped"] += 1
+                    continue
+                batch.append(item)
+                if len(batch) >= BATCH_SIZE:
+                    await flush(batch, rows_done)
+                    batch = []
+        except UnicodeDecodeError:
+            if source.encoding == "latin-1":
+                raise
+            print(f"Import file is not {source.encoding} past row {rows_done}, reading it again as latin-1")
+            ctx.counters["skipped"] = flushed["skipped"]
+            source.reopen("latin-1")
+            continue
+        await flush(batch, rows_done)
+        return
+
+async def _branch_resolver():
+    """Returns a lookup of branches by stock column name that creates missing ones."""
+    branches_cache = {}
+    for b in await Branch.find_all().to_list():
+        if b.name:
+            branches_cache[b.name.upper().strip()] = b
+
+    async def get_or_create_branch(branch_name: str) -> Branch:
+        norm_name = branch_name.upper().strip()
+        if norm_name in branches_cache:
+            return branches_cache[norm_name]
+        new_branch = Branch(name=branch_name, is_active=True)
+        await new_branch.insert()
+        branches_cache[norm_name] = new_branch
+        return new_branch
+
+    return get_or_create_branch
+
+async def import_tutors_job(ctx) -> Dict:
+    source = CsvSource(ctx.params["path"])
+    if ctx.params.get("delete_existing") and not ctx.resumed:
+        await Tutor.find_all().delete()
+        await mark_reset("tutors")
+        await ctx.save_checkpoint(rows_done=0)
+
+    async def insert_batch(tutors):
+        await stamp_documents(tutors)
+        await Tutor.insert_many(tutors)
+
+    with source:
+        await _run_batches(ctx, source, tutor_parser(source.columns), insert_batch)
+
+    # Bulk insert/delete skip the incremental search index updates
+    from app.services.fuzzy_search import invalidate_search_indexes
+    invalidate_search_indexes()
+
+    return {"message": f"Se han importado {ctx.counters['imported']} clientes exitosamente"}
+
+async def import_products_job(ctx) -> Dict:
+    source = CsvSource(ctx.params["path"])
+    if ctx.params.get("delete_existing") and not ctx.resumed:
+        await Product.find_all().delete()
+        await Stock.find_all().delete()
+        await mark_reset("products")
+        await mark_reset("stocks")
+        await ctx.save_checkpoint(rows_done=0)
+
+    get_or_create_branch = await _branch_resolver()
+
+    async def insert_batch(parsed):
+        products, stocks = [], []
+        for product, branch_map in parsed:
+            product.id = PydanticObjectId()
+            products.append(product)
+            for branch_name, qty in branch_map.items():
+                branch = await get_or_create_branch(branch_name)
+                stocks.append(Stock(branch_id=branch.id, product_id=product.id, quantity=qty))
+        await stamp_documents(products)
+        await Product.insert_many(products)
+        if stocks:
+            await stamp_documents(stocks)
+            await Stock.insert_many(stocks)
+
+    with source:
+        await _run_batches(ctx, source, product_parser(source.columns), insert_batch)
+    # insert_many skips the hooks: POS screens reload their stock
+    publish_resync("stocks")
+
+    msg = f"Importación finalizada. {ctx.counters['imported']} productos creados con su respectivo stock."
+    if ctx.counters["skipped"] > 0:
+        msg += f" {ctx.counters['skipped']} filas omitidas por errores."
+    return {"message": msg}
+
+async def upsert_products_job(ctx) -> Dict:
+    """
+    Catalog re-sync that keeps product ids. Rows are matched to existing products
+    by external_id, then by sku; only fields that differ are written, and each
+    branch's stock is moved to the file's quantity with an IN/OUT movement for
+    the difference. Rows with neither key are skipped. Re-running the same file
+    changes nothing, which also makes a resumed run safe.
+    """
+    if ctx.created_by is None:
+        raise ValueError("Upsert import needs the user that started it")
+    source = CsvSource(ctx.params["path"])
+    get_or_create_branch = await _branch_resolver()
+    products = Product.get_motor_collection()
+    stocks = Stock.get_motor_collection()
+    for key in ("created", "updated", "unchanged", "stock_changes"):
+        ctx.counters.setdefault(key, 0)
+
+    async def apply_batch(parsed):
+        now = datetime.utcnow()
+        product_stamp = await version_stamp("products")
+
+        # Existing products for this batch, by either key
+        ext_ids = [p.external_id for p, _ in parsed if p.external_id is not None]
+        skus = [p.sku for p, _ in parsed if p.sku]
+        by_ext, by_sku = {}, {}
+        async for doc in products.find(
+            {"$or": [{"external_id": {"$in": ext_ids}}, {"sku": {"$in": skus}}]},
+            {field: 1 for field in PRODUCT_COLUMNS}
+        ):
+            if doc.get("external_id") is not None:
+                by_ext[doc["external_id"]] = doc
+            if doc.get("sku"):
+                by_sku.setdefault(doc["sku"], doc)
+
+        product_ops, targets = [], []
+        for product, branch_map in parsed:
+            doc = by_ext.get(product.external_id) if product.external_id is not None else None
+            if doc is None and product.sku:
+                doc = by_sku.get(product.sku)
+                # Same barcode but a different product in the old system
+                if doc is not None and product.external_id is not None and doc.get("external_id") not in (None, product.external_id):
+                    doc = None
+
+            if doc is None:
+                product.id = PydanticObjectId()
+                product.created_at = now
+                product.version, product.updated_at = product_stamp["version"], product_stamp["updated_at"]
+                key = {"external_id": product.external_id} if product.external_id is not None else {"sku": product.sku}
+                product_ops.append(UpdateOne(key, {"$setOnInsert": product.model_dump(by_alias=True)}, upsert=True))
+                ctx.counters["created"] += 1
+                doc = {"_id": product.id, **{field: getattr(product, field) for field in fields}}
+            else:
+                changes = {}
+                for field in fields:
+                    value = getattr(product, field)
+                    # Keys are never cleared by an empty cell
+                    if value is None and field in ("external_id", "sku"):
+                        continue
+                    if doc.get(field) != value:
+                        changes[field] = value
+                if changes:
+                    product_ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {**changes, **product_stamp}}))
+                    doc.update(changes)
+                    ctx.counters["updated"] += 1
+                else:
+                    ctx.counters["unchanged"] += 1
+
+            # A key repeated later in the file matches this row's product
+            if doc.get("external_id") is not None:
+                by_ext[doc["external_id"]] = doc
+            if doc.get("sku"):
+                by_sku[doc["sku"]] = doc
+            targets.append((doc["_id"], branch_map))
+
+        if product_ops:
+            # Ordered: a repeated key's update must follow its insert
+            await products.bulk_write(product_ops, ordered=True)
+
+        # Stock: write the difference to the file's quantity
+        current = {}
+        async for s in stocks.find(
+            {"product_id": {"$in": [pid for pid, _ in targets]}},
+            {"product_id": 1, "branch_id": 1, "quantity": 1}
+        ):
+            current[(s["product_id"], s["branch_id"])] = s.get("quantity", 0)
+
+        stock_ops, movements = [], []
+        stock_stamp = await version_stamp("stocks")
+        for product_id, branch_map in targets:
+            for branch_name, qty in branch_map.items():
+                branch = await get_or_create_branch(branch_name)
+                key = (product_id, branch.id)
+                before = current.get(key)
+                delta = qty - (before or 0)
+                if before is None or delta:
+                    stock_ops.append(UpdateOne(
+                        {"branch_id": branch.id, "product_id": product_id},
+                        {"$inc": {"quantity": delta}, "$set": stock_stamp},
+                        upsert=True
+                    ))
+                current[key] = qty
+                if delta:
+                    movements.append(InventoryMovement(
+                        type="IN" if delta > 0 else "OUT",
+                        product_id=product_id,
+                        quantity=abs(delta),
+                        to_branch_id=branch.id if delta > 0 else None,
+                        from_branch_id=branch.id if delta < 0 else None,
+                        reason="Ajuste por importación de catálogo",
+                        created_by=ctx.created_by,
+                        created_at=now
+                    ))
+        if stock_ops:
+            await stocks.bulk_write(stock_ops, ordered=True)
+        if movements:
+            await InventoryMovement.insert_many(movements)
+        ctx.counters["stock_changes"] += len(movements)
+
+    def parse_keyed(row):
+        item = parse(row)
+        if item is None or (item[0].external_id is None and not item[0].sku):
+            return None
+        return item
+
+    with source:
+        fields = product_fields_in(source.columns)
+        parse = product_parser(source.columns)
+        await _run_batches(ctx, source, parse_keyed, apply_batch)
+    if ctx.counters["stock_changes"]:
+        publish_resync("stocks")
+
+    c = ctx.counters
+    return {
+        "message": (
+            f"Catálogo actualizado: {c['created']} creados, {c['updated']} actualizados, "
+            f"{c['unchanged']} sin cambios, {c['skipped']} omitidos, {c['stock_changes']} ajustes de stock."
+        ),
+        "created": c["created"],
+        "updated": c["updated"],
+        "unchanged": c["unchanged"],
+        "skipped": c["skipped"],
+        "stock_changes": c["stock_changes"],
+    }
+
+async def import_suppliers_job(ctx) -> Dict:
+    source = CsvSource(ctx.params["path"])
+    if ctx.params.get("delete_existing") and not ctx.resumed:
+        await Supplier.find_all().delete()
+        await mark_reset("suppliers")
+        await ctx.save_checkpoint(rows_done=0)
+
+    async def insert_batch(suppliers):
+        await stamp_documents(suppliers)
+        await Supplier.insert_many(suppliers)
+
+    with source:
+        await _run_batches(ctx, source, supplier_parser(source.columns), insert_batch)
+    return {"message": f"Se han importado {ctx.counters['imported']} proveedores exitosamente"}
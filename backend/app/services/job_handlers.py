@@ -0,0 +1,52 @@
+from typing import Dict
+from app.services.job_queue import register_handler
+
+async def backup_job(ctx) -> Dict:
+    from app.services.backup_service import perform_backup
+
+    async def progress(done, total, collection):
+        ctx.counters["collections"] = done
+        await ctx.progress(100.0 * done / max(total, 1), message=f"Respaldando {collection}")
+
+    status = await perform_backup(progress=progress, incremental=bool(ctx.params.get("incremental")))
+    ctx.raise_if_cancelled()
+    if not status["success"]:
+        raise RuntimeError(f"Error en respaldo: {status['error']}")
+    return {"message": "Respaldo completado exitosamente", "details": status}
+
+async def restore_job(ctx) -> Dict:
+    from app.services.backup_service import restore_backup
+
+    async def progress(done, total, collection):
+        ctx.counters["collections"] = done
+        await ctx.progress(100.0 * done / max(total, 1), message=f"Restaurado {collection}")
+
+    result = await restore_backup(ctx.params["backup"], ctx.params["target_db"], progress=progress)
+    if not result["verified"]:
+        raise RuntimeError("Restauración no aplicada, el respaldo no coincide: " + "; ".join(result["problems"]))
+    result["message"] = f"Respaldo {result['backup']} restaurado en {result['database']}"
+    return result
+
+async def file_gc_job(ctx) -> Dict:
+    from app.services.file_gc_service import collect_orphan_files
+
+    async def progress(done, total, collection):
+        ctx.counters["records"] = done
+        await ctx.progress(100.0 * done / max(total, 1), message=f"Revisando {collection}")
+
+    report = await collect_orphan_files(dry_run=bool(ctx.params.get("dry_run")), mode=ctx.params.get("mode"), progress=progress)
+    action = "Simulación" if report["dry_run"] else "Limpieza"
+    report["message"] = f"{action}: {report['orphan_records']} registros y {report['stray_files']} archivos huérfanos"
+    return report
+
+def register_default_handlers():
+    from app.services import import_service, export_service, preview_service
+    register_handler("import_tutors", import_service.import_tutors_job)
+    register_handler("import_products", import_service.import_products_job)
+    register_handler("upsert_products", import_service.upsert_products_job)
+    register_handler("import_suppliers", import_service.import_suppliers_job)
+    register_handler("backup", backup_job)
+    register_handler("restore", restore_job)
+    register_handler("file_gc", file_gc_job)
+    register_handler("export_sales", export_service.export_sales_csv)
+    register_handler("file_previews", preview_service.generate_previews_job)
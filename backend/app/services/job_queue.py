@@ -0,0 +1,298 @@
+import os
+import time
+import shutil
+import asyncio
+import logging
+import traceback
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.models.background_job import BackgroundJob
+from app.services.scheduler import WORKER_ID
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join(os.getcwd(), "job_files")
+
+POLL_SECONDS = 2
+LEASE_SECONDS = 60
+HEARTBEAT_SECONDS = 15
+# A job interrupted this many times (crash, restart) is failed instead of resumed
+MAX_ATTEMPTS = 3
+# Progress writes are throttled; the last one is always written on completion
+PROGRESS_INTERVAL = 0.5
+FINISHED_STATUSES = ["SUCCEEDED", "FAILED", "CANCELLED"]
+
+class JobCancelled(Exception):
+    pass
+
+class JobContext:
+    """What a handler gets: params, progress/counter reporting, checkpoints and an artifact dir."""
+
+    def __init__(self, job: Dict):
+        self.job_id: PydanticObjectId = job["_id"]
+        self.params: Dict[str, Any] = job.get("params") or {}
+        self.checkpoint: Dict[str, Any] = dict(job.get("checkpoint") or {})
+        self.counters: Dict[str, int] = dict(job.get("counters") or {})
+        self.resumed = bool(self.checkpoint)
+        self.created_by: Optional[PydanticObjectId] = job.get("created_by")
+        self.cancelled = False
+        self._last_write = 0.0
+
+    @property
+    def dir(self) -> str:
+        path = os.path.join(JOBS_DIR, str(self.job_id))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def artifact_path(self, filename: str) -> str:
+        return os.path.join(self.dir, filename)
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    async def progress(self, percent: float, message: Optional[str] = None, force: bool = False, **counters: int):
+        """Reports progress (0-100) and counters. Raises JobCancelled if a cancel was requested."""
+        self.counters.update(counters)
+        self.raise_if_cancelled()
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_INTERVAL:
+            return
+        self._last_write = now
+        update = {"progress": round(min(max(percent, 0.0), 100.0), 1), "counters": self.counters, "updated_at": _now()}
+        if message is not None:
+            update["message"] = message
+        await BackgroundJob.get_motor_collection().update_one({"_id": self.job_id}, {"$set": update})
+
+    async def save_checkpoint(self, **values):
+        """Persists resume state together with the current counters."""
+        self.checkpoint.update(values)
+        await BackgroundJob.get_motor_collection().update_one(
+            {"_id": self.job_id},
+            {"$set": {"checkpoint": self.checkpoint, "counters": self.counters, "updated_at": _now()}}
+        )
+
+Handler = Callable[[JobContext], Awaitable[Optional[Dict]]]
+HANDLERS: Dict[str, Handler] = {}
+
+def register_handler(kind: str, handler: Handler):
+    HANDLERS[kind] = handler
+
+def ensure_handlers_registered():
+    if not HANDLERS:
+        from app.services.job_handlers import register_default_handlers
+        register_default_handlers()
+
+def _now():
+    return datetime.now(timezone.utc)
+
+async def submit_job(kind: str, params: Optional[Dict] = None, user=None, job_id: Optional[PydanticObjectId] = None) -> BackgroundJob:
+    """Queues a job and returns it right away. `job_id` lets callers stage input files first."""
+    ensure_handlers_registered()
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = BackgroundJob(kind=kind, params=params or {}, created_by=user.id if user else None)
+    if job_id:
+        job.id = job_id
+    await job.insert()
+    if _wake is not None:
+        _wake.set()
+    return job
+
+async def request_cancel(job_id: PydanticObjectId) -> Optional[Dict]:
+    """Queued jobs are cancelled at once; running ones stop at their next progress report."""
+    collection = BackgroundJob.get_motor_collection()
+    doc = await collection.find_one_and_update(
+        {"_id": job_id, "status": "QUEUED"},
+        {"$set": {"status": "CANCELLED", "cancel_requested": True, "finished_at": _now(), "updated_at": _now()}},
+        return_document=ReturnDocument.AFTER
+    )
+    if doc:
+        await asyncio.to_thread(remove_job_files, job_id)
+        return doc
+    return await collection.find_one_and_update(
+        {"_id": job_id, "status": "RUNNING"},
+        {"$set": {"cancel_requested": True, "updated_at": _now()}},
+        return_document=ReturnDocument.AFTER
+    )
+
+# --- Workers ---
+
+async def _claim() -> Optional[Dict]:
+    """Next queued job, or a running one whose worker stopped renewing its lease (resume)."""
+    now = _now()
+    return await BackgroundJob.get_motor_collection().find_one_and_update(
+        {"$or": [
+            {"status": "QUEUED"},
+            {"status": "RUNNING", "lease_until": {"$lt": now}},
+        ]},
+        {
+            "$set": {
+                "status": "RUNNING",
+                "owner": WORKER_ID,
+                "lease_until": now + timedelta(seconds=LEASE_SECONDS),
+                "updated_at": now,
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def _heartbeat(ctx: JobContext):
+    """Keeps the lease alive and picks up cancel requests while the handler runs."""
+    collection = BackgroundJob.get_motor_collection()
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        doc = await collection.find_one_and_update(
+            {"_id": ctx.job_id, "owner": WORKER_ID},
+            {"$set": {"lease_until": _now() + timedelta(seconds=LEASE_SECONDS)}},
+            projection={"cancel_requested": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc and doc.get("cancel_requested"):
+            ctx.cancelled = True
+
+async def _finish(ctx: JobContext, status: str, **fields):
+    # Staged inputs and scratch files are done with; only the artifact stays,
+    # until purge_finished_jobs() drops the job
+    await asyncio.to_thread(remove_job_files, ctx.job_id, fields.get("artifact_path"))
+    update = {
+        "status": status,
+        "counters": ctx.counters,
+        "finished_at": _now(),
+        "updated_at": _now(),
+        "lease_until": None,
+        **fields
+    }
+    if status == "SUCCEEDED":
+        update["progress"] = 100.0
+    await BackgroundJob.get_motor_collection().update_one({"_id": ctx.job_id}, {"$set": update})
+
+async def _run(job: Dict):
+    ctx = JobContext(job)
+    handler = HANDLERS.get(job["kind"])
+    if handler is None:
+        await _finish(ctx, "FAILED", error=f"Unknown job kind: {job['kind']}")
+        return
+    if job.get("attempts", 1) > MAX_ATTEMPTS:
+        await _finish(ctx, "FAILED", error="Interrupted too many times")
+        return
+    if job.get("cancel_requested"):
+        await _finish(ctx, "CANCELLED")
+        return
+    if not job.get("started_at"):
+        await BackgroundJob.get_motor_collection().update_one({"_id": ctx.job_id}, {"$set": {"started_at": _now()}})
+
+    heartbeat = asyncio.create_task(_heartbeat(ctx))
+    try:
+        result = await handler(ctx) or {}
+        fields = {"result": result}
+        if result.get("artifact"):
+            fields["artifact_path"] = os.path.relpath(result.pop("artifact"), JOBS_DIR)
+            fields["artifact_name"] = result.pop("artifact_name", os.path.basename(fields["artifact_path"]))
+        await _finish(ctx, "SUCCEEDED", **fields)
+    except JobCancelled:
+        await _finish(ctx, "CANCELLED", message="Cancelado por el usuario")
+    except asyncio.CancelledError:
+        # Shutdown: leave it RUNNING so the lease expires and another start resumes it
+        raise
+    except Exception as e:
+        logger.error(f"Job {ctx.job_id} ({job['kind']}) failed: {e}")
+        await _finish(ctx, "FAILED", error=f"{e}\n{traceback.format_exc()}"[:4000])
+    finally:
+        heartbeat.cancel()
+
+_workers: List[asyncio.Task] = []
+_wake: Optional[asyncio.Event] = None
+
+async def _worker_loop():
+    while True:
+        try:
+            job = await _claim()
+            if job is not None:
+                await _run(job)
+                continue
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Job worker error: {e}")
+        # Sleep until the poll interval passes or submit_job() wakes the workers
+        waiter = asyncio.ensure_future(_wake.wait())
+        try:
+            await asyncio.wait({waiter}, timeout=POLL_SECONDS)
+        finally:
+            waiter.cancel()
+        _wake.clear()
+
+def start_job_workers():
+    global _wake
+    if _workers:
+        return
+    ensure_handlers_registered()
+    _wake = asyncio.Event()
+    for _ in range(max(1, settings.JOB_WORKERS)):
+        _workers.append(asyncio.create_task(_worker_loop()))
+    print(f"--- JOB WORKERS STARTED: {len(_workers)} ---")
+
+async def stop_job_workers():
+    for task in _workers:
+        task.cancel()
+    for task in _workers:
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    _workers.clear()
+    # Interrupted jobs become claimable right away on the next start instead of
+    # waiting for their lease to run out
+    await BackgroundJob.get_motor_collection().update_many(
+        {"status": "RUNNING", "owner": WORKER_ID},
+        {"$set": {"lease_until": _now()}}
+    )
+
+def remove_job_files(job_id: PydanticObjectId, keep: Optional[str] = None):
+    """Deletes the job dir, or everything in it but `keep` (relative to JOBS_DIR)."""
+    path = os.path.join(JOBS_DIR, str(job_id))
+    if not keep:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    keep = os.path.join(JOBS_DIR, keep)
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            if os.path.join(root, name) != keep:
+                os.remove(os.path.join(root, name))
+        for name in dirs:
+            if not os.listdir(os.path.join(root, name)):
+                os.rmdir(os.path.join(root, name))
+
+def _stale_job_dirs(cutoff: datetime) -> List[str]:
+    """Job dirs not modified since `cutoff` (left by jobs that were never submitted or already purged)."""
+    if not os.path.isdir(JOBS_DIR):
+        return []
+    return [
+        entry.name for entry in os.scandir(JOBS_DIR)
+        if entry.is_dir() and entry.stat().st_mtime < cutoff.timestamp()
+    ]
+
+async def purge_finished_jobs(days: int) -> Dict[str, int]:
+    """Deletes jobs finished more than `days` ago with their files, and stray job dirs as old."""
+    cutoff = _now() - timedelta(days=days)
+    collection = BackgroundJob.get_motor_collection()
+    query = {"status": {"$in": FINISHED_STATUSES}, "finished_at": {"$lt": cutoff}}
+    ids = [doc["_id"] async for doc in collection.find(query, {"_id": 1})]
+    for job_id in ids:
+        await asyncio.to_thread(remove_job_files, job_id)
+    deleted = await collection.delete_many({"_id": {"$in": ids}})
+
+    stray = 0
+    for name in await asyncio.to_thread(_stale_job_dirs, cutoff):
+        if not PydanticObjectId.is_valid(name):
+            continue
+        if not await collection.find_one({"_id": PydanticObjectId(name)}, {"_id": 1}):
+            await asyncio.to_thread(remove_job_files, PydanticObjectId(name))
+            stray += 1
+    return {"jobs": deleted.deleted_count, "stray_dirs": stray}
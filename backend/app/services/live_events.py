@@ -0,0 +1,257 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional, Set
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Collections pushed to GET /live/{branch_id}, see event_for
+LIVE_COLLECTIONS = ("stocks", "consultations", "delivery_orders")
+# Events a slow client may fall behind by before it gets a "resync" instead
+QUEUE_SIZE = 256
+# Comment line sent when idle so proxies don't close the connection
+HEARTBEAT_SECONDS = 20
+ALL_BRANCHES = "all"
+# Change stream reconnects back off from the first delay up to the last
+RETRY_MIN_SECONDS = 5
+RETRY_MAX_SECONDS = 300
+
+def _id(value) -> Optional[str]:
+    return str(value) if value is not None else None
+
+def _date(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def event_for(collection: str, doc: Dict, action: str) -> Optional[Dict]:
+    """
+    What a live client needs from a written document: enough to patch its
+    screen, with `version` to drop stale or repeated events. `action` is
+    created, updated or deleted.
+    """
+    if collection == "stocks":
+        return {
+            "type": "stock", "branch_id": _id(doc.get("branch_id")),
+            "product_id": _id(doc.get("product_id")),
+            "quantity": doc.get("quantity", 0) if action != "deleted" else 0,
+            "version": doc.get("version"),
+        }
+    if collection == "consultations":
+        return {
+            "type": "consultation", "action": "cancelled" if action == "deleted" else action,
+            "id": _id(doc.get("_id")), "branch_id": _id(doc.get("branch_id")),
+            "date": _date(doc.get("date")), "status": doc.get("status"),
+            "appointment_type": doc.get("appointment_type"),
+            "patient_id": _id(doc.get("patient_id")), "assigned_staff_id": _id(doc.get("assigned_staff_id")),
+            "version": doc.get("version"),
+        }
+    if collection == "delivery_orders":
+        return {
+            "type": "delivery", "action": action,
+            "id": _id(doc.get("_id")), "branch_id": _id(doc.get("branch_id")),
+            "sale_id": _id(doc.get("sale_id")), "status": doc.get("status"),
+            "assigned_user_id": _id(doc.get("assigned_user_id")),
+            "scheduled_at": _date(doc.get("scheduled_at")),
+            "version": doc.get("version"),
+        }
+    return None
+
+class _Subscriber:
+    def __init__(self, branch_id: str):
+        self.branch_id = branch_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    def put(self, event: Dict):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Too far behind to catch up event by event: reload instead
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+class MemoryBroker:
+    """
+    Pub/sub inside this process. Enough with a single worker; with several,
+    a write is only seen by clients connected to the worker that made it.
+    """
+    def __init__(self):
+        self.subscribers: Dict[str, Set[_Subscriber]] = defaultdict(set)
+
+    def subscribe(self, branch_id: str) -> _Subscriber:
+        subscriber = _Subscriber(branch_id)
+        self.subscribers[branch_id].add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: _Subscriber):
+        subscribers = self.subscribers.get(subscriber.branch_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self.subscribers[subscriber.branch_id]
+
+    def deliver(self, event: Dict):
+        # Events without a branch (resyncs, consultations with no branch) go to everyone
+        branch_id = event.get("branch_id")
+        if branch_id is None:
+            targets = [s for subscribers in self.subscribers.values() for s in subscribers]
+        else:
+            targets = list(self.subscribers.get(branch_id, ())) + list(self.subscribers.get(ALL_BRANCHES, ()))
+        for subscriber in targets:
+            subscriber.put(event)
+
+    def publish(self, event: Dict):
+        self.deliver(event)
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+class ChangeStreamBroker(MemoryBroker):
+    """
+    For several API workers: each one watches the live collections with a
+    MongoDB change stream (needs a replica set) and delivers to its own
+    clients, so local publishes are skipped; every write, including raw and
+    bulk ones, is in the stream anyway.
+    """
+    def __init__(self):
+        super().__init__()
+        self._task: Optional[asyncio.Task] = None
+        self._pre_images = False
+
+    def publish(self, event: Dict):
+        pass
+
+    async def start(self):
+        if self._task is None:
+            await self._check_server()
+            self._task = asyncio.create_task(self._watch())
+
+    async def _check_server(self):
+        """Refuses to start on a standalone server, where no change stream can ever open."""
+        from app.models.sync import SyncCounter
+        db = SyncCounter.get_motor_collection().database
+        hello = await db.command("hello")
+        if not hello.get("setName") and hello.get("msg") != "isdbgrid":
+            raise RuntimeError("LIVE_EVENTS_BACKEND=changestream needs MongoDB running as a replica set")
+        version = tuple((await db.command("buildInfo")).get("versionArray", [0])[:2])
+        # Pre-images of deletes (their branch) need MongoDB 6.0
+        self._pre_images = version >= (6, 0)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _handle(self, change: Dict):
+        collection = change["ns"]["coll"]
+        if collection == "sync_counters":
+            # mark_reset: bulk deletes or a restore, clients reload
+            if "reset_before" in change.get("updateDescription", {}).get("updatedFields", {}):
+                self.deliver({"type": "resync", "collection": change["documentKey"]["_id"]})
+            return
+        operation = change["operationType"]
+        if operation == "delete":
+            # The pre-image only exists if the collection has changeStreamPreAndPostImages
+            # enabled; without it the branch is unknown and everyone gets the event
+            doc = change.get("fullDocumentBeforeChange") or {"_id": change["documentKey"]["_id"]}
+            event = event_for(collection, doc, "deleted")
+        elif change.get("fullDocument"):
+            event = event_for(collection, change["fullDocument"], "created" if operation == "insert" else "updated")
+        else:
+            return
+        if event:
+            self.deliver(event)
+
+    async def _watch(self):
+        from app.models.sync import SyncCounter
+        db = SyncCounter.get_motor_collection().database
+        pipeline = [{"$match": {"$or": [
+            {"ns.coll": {"$in": list(LIVE_COLLECTIONS)}, "operationType": {"$in": ["insert", "update", "replace", "delete"]}},
+            # Counters change on every write; only resets matter here
+            {"ns.coll": "sync_counters", "updateDescription.updatedFields.reset_before": {"$exists": True}},
+        ]}}]
+        options = {"full_document": "updateLookup"}
+        if self._pre_images:
+            options["full_document_before_change"] = "whenAvailable"
+        resume_token = None
+        failures = 0
+        while True:
+            try:
+                async with db.watch(pipeline, resume_after=resume_token, **options) as stream:
+                    if failures:
+                        # Back after an outage: reload what was missed meanwhile
+                        failures = 0
+                        self.deliver({"type": "resync"})
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self._handle(change)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                resume_token = None
+                if not failures:
+                    logger.warning("Live events change stream failed: %s", e)
+                    # Once per outage, not on every retry
+                    self.deliver({"type": "resync"})
+                failures += 1
+                await asyncio.sleep(min(RETRY_MIN_SECONDS * 2 ** (failures - 1), RETRY_MAX_SECONDS))
+
+_broker: Optional[MemoryBroker] = None
+
+def get_broker() -> MemoryBroker:
+    global _broker
+    if _broker is None:
+        if settings.LIVE_EVENTS_BACKEND == "changestream":
+            _broker = ChangeStreamBroker()
+        elif settings.LIVE_EVENTS_BACKEND == "memory":
+            _broker = MemoryBroker()
+        else:
+            raise ValueError(f"Unknown LIVE_EVENTS_BACKEND: {settings.LIVE_EVENTS_BACKEND}")
+    return _broker
+
+def publish_document(collection: str, doc: Dict, action: str):
+    """Called from the VersionedDocument hooks after each write."""
+    if collection not in LIVE_COLLECTIONS:
+        return
+    event = event_for(collection, doc, action)
+    if event:
+        get_broker().publish(event)
+
+def publish_resync(collection: Optional[str] = None, branch_id: Optional[str] = None):
+    """After writes that bypass Beanie (imports, restores): clients reload."""
+    get_broker().publish({"type": "resync", "collection": collection, "branch_id": branch_id})
+
+def format_event(event: Dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+async def event_stream(branch_id: str):
+    """text/event-stream body for one client. Ends when the client disconnects."""
+    broker = get_broker()
+    subscriber = broker.subscribe(branch_id)
+    try:
+        # Lets the client know it is connected (and refetch what it missed before)
+        yield f"retry: 5000\nevent: ready\ndata: {json.dumps({'branch_id': branch_id})}\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            yield format_event(event)
+    finally:
+        broker.unsubscribe(subscriber)
+
+async def start_live_events():
+    await get_broker().start()
+
+async def stop_live_events():
+    await get_broker().stop()
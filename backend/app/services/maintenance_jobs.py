@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta, timezone
+from app.core.config import settings
+from app.services.scheduler import register_job
+
+# Revoked or expired sessions are kept this long for the security panel, then deleted
+SESSION_HISTORY_DAYS = 30
+
+async def nightly_backup():
+    from app.services.backup_service import perform_backup
+    status = await perform_backup()
+    if not status["success"]:
+        raise RuntimeError(status["error"])
+    return {"timestamp": status["timestamp"], "collections": len(status["collections"])}
+
+async def incremental_backup():
+    from app.services.backup_service import perform_backup
+    status = await perform_backup(incremental=True)
+    if not status["success"]:
+        raise RuntimeError(status["error"])
+    return {"timestamp": status["timestamp"], "type": status["type"], "parent": status["parent"]}
+
+async def backup_retention():
+    from app.services.backup_service import cleanup_old_backups
+    return await cleanup_old_backups(settings.BACKUP_RETENTION_DAYS)
+
+async def purge_sessions():
+    """Revokes sessions idle past the refresh token lifetime and drops old revoked ones."""
+    from app.models.session import UserSession
+    now = datetime.now(timezone.utc)
+    collection = UserSession.get_motor_collection()
+    expired = await collection.update_many(
+        {"is_revoked": False, "last_activity": {"$lt": now - timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)}},
+        {"$set": {"is_revoked": True}}
+    )
+    deleted = await collection.delete_many(
+        {"is_revoked": True, "last_activity": {"$lt": now - timedelta(days=SESSION_HISTORY_DAYS)}}
+    )
+    return {"expired": expired.modified_count, "deleted": deleted.deleted_count}
+
+async def rebuild_rollups():
+    from app.services.tutor_summary_service import rebuild_all_summaries
+    return {"tutor_summaries": await rebuild_all_summaries()}
+
+async def appointment_reminders():
+    from app.services.reminder_service import send_appointment_reminders
+    return await send_appointment_reminders()
+
+async def blob_gc():
+    from app.services.file_service import collect_unreferenced_blobs
+    return await collect_unreferenced_blobs()
+
+async def file_gc():
+    from app.services.file_gc_service import collect_orphan_files
+    report = await collect_orphan_files()
+    # The samples are for the dry-run report; the run history keeps the counts
+    report.pop("records")
+    report.pop("files")
+    return report
+
+async def job_retention():
+    from app.services.job_queue import purge_finished_jobs
+    return await purge_finished_jobs(settings.JOB_RETENTION_DAYS)
+
+async def purge_tombstones():
+    from app.services.sync_service import purge_tombstones
+    return await purge_tombstones()
+
+def register_default_jobs():
+    # Schedules are clinic local time (CLINIC_TIMEZONE); the clinic is closed 21:00-08:00
+    register_job("nightly_backup", "0 3 * * *", nightly_backup, "Respaldo completo de la base de datos")
+    register_job("incremental_backup", "15 8-21 * * *", incremental_backup, "Respaldo incremental (cambios desde el último respaldo)")
+    register_job("backup_retention", "30 3 * * *", backup_retention, "Elimina respaldos más antiguos que la retención")
+    register_job("session_purge", "0 4 * * *", purge_sessions, "Expira y limpia sesiones de usuario")
+    register_job("rollup_rebuild", "30 4 * * *", rebuild_rollups, "Recalcula los resúmenes de tutores")
+    register_job("appointment_reminders", "0 10 * * *", appointment_reminders, "Recordatorios de citas de mañana", lease_seconds=600)
+    register_job("file_gc", "0 1 * * 0", file_gc, "Pone en cuarentena y elimina archivos huérfanos", lease_seconds=4 * 3600)
+    register_job("tombstone_purge", "15 5 * * *", purge_tombstones, "Elimina marcas de borrado antiguas de la sincronización")
+    register_job("job_retention", "45 3 * * *", job_retention, "Elimina tareas terminadas y sus archivos de resultado")
+    register_job("blob_gc", "0 5 * * *", blob_gc, "Elimina archivos subidos que ya no usa ningún registro")
@@ -0,0 +1,125 @@
+import os
+import glob
+import uuid
+import asyncio
+from typing import Dict, Optional
+from PIL import Image, ImageOps, features
+from app.core.config import settings
+from app.models.file_record import FileRecord
+
+try:
+    import pypdfium2
+except ImportError: # Optional: only needed for PDF previews
+    pypdfium2 = None
+
+# Longest side in pixels for each variant
+VARIANTS = {"thumb": 320, "preview": 1280}
+QUALITY = {"thumb": 75, "preview": 82}
+FORMATS = {"webp": ("WEBP", "image/webp"), "jpeg": ("JPEG", "image/jpeg")}
+WEBP_SUPPORTED = features.check("webp")
+
+# One render per file/variant at a time; concurrent requests wait for it
+_locks: Dict[str, asyncio.Lock] = {}
+
+def can_preview(mime_type: str) -> bool:
+    if mime_type == "application/pdf":
+        return pypdfium2 is not None
+    return mime_type.startswith("image/")
+
+def pick_format(accept: Optional[str]) -> str:
+    if WEBP_SUPPORTED and accept and "image/webp" in accept:
+        return "webp"
+    return "jpeg"
+
+def media_type(fmt: str) -> str:
+    return FORMATS[fmt][1]
+
+def derivative_path(file_path: str, variant: str, fmt: str) -> str:
+    """Derivatives live next to the original: <file>.<variant>.<fmt>"""
+    return f"{file_path}.{variant}.{fmt}"
+
+def remove_derivatives(file_path: str):
+    for variant in VARIANTS:
+        for path in glob.glob(glob.escape(f"{file_path}.{variant}.") + "*"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+def _open_source(file_path: str, mime_type: str, size: int) -> Image.Image:
+    if mime_type == "application/pdf":
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            page = pdf[0]
+            # Render the first page just big enough for the variant
+            scale = size / max(page.get_size())
+            return page.render(scale=max(scale, 0.1)).to_pil()
+        finally:
+            pdf.close()
+    image = Image.open(file_path)
+    # draft() lets JPEG decode at a reduced scale, much faster for large photos
+    image.draft("RGB", (size, size))
+    # Phones store rotation in EXIF; apply it so thumbnails aren't sideways
+    return ImageOps.exif_transpose(image)
+
+def _render(file_path: str, mime_type: str, variant: str, fmt: str) -> str:
+    size = VARIANTS[variant]
+    target = derivative_path(file_path, variant, fmt)
+    image = _open_source(file_path, mime_type, size)
+    image.thumbnail((size, size), Image.LANCZOS)
+    if image.mode not in ("RGB", "L"):
+        # Flatten transparency (PNG scans, signatures) onto white
+        background = Image.new("RGB", image.size, "white")
+        rgba = image.convert("RGBA")
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        image = background
+    pil_format = FORMATS[fmt][0]
+    tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        image.save(tmp_path, pil_format, quality=QUALITY[variant], optimize=True)
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return target
+
+async def get_variant(file_record: FileRecord, variant: str, fmt: str = "jpeg") -> Optional[str]:
+    """
+    Path of a cached derivative, rendered on first use. None when the file type
+    has no preview or the original can't be decoded.
+    """
+    if variant not in VARIANTS or not can_preview(file_record.mime_type):
+        return None
+    file_path = os.path.join(settings.UPLOAD_DIR, file_record.path)
+    target = derivative_path(file_path, variant, fmt)
+    if os.path.exists(target):
+        return target
+    if not os.path.exists(file_path):
+        return None
+
+    lock = _locks.setdefault(target, asyncio.Lock())
+    try:
+        async with lock:
+            if os.path.exists(target):
+                return target
+            try:
+                return await asyncio.to_thread(_render, file_path, file_record.mime_type, variant, fmt)
+            except Exception as e:
+                print(f"PREVIEW: could not render {variant} of {file_record.id}: {e}")
+                return None
+    finally:
+        if not lock.locked() and _locks.get(target) is lock:
+            del _locks[target]
+
+async def generate_previews_job(ctx) -> Dict:
+    """Renders every variant right after upload so the first page view is already fast."""
+    file_record = await FileRecord.get(ctx.params["file_id"])
+    if not file_record:
+        return {"message": "El archivo ya no existe"}
+    formats = ["jpeg", "webp"] if WEBP_SUPPORTED else ["jpeg"]
+    rendered = 0
+    for variant in VARIANTS:
+        for fmt in formats:
+            if await get_variant(file_record, variant, fmt):
+                rendered += 1
+    return {"message": f"{rendered} vistas previas generadas", "rendered": rendered}
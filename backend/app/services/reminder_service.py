@@ -0,0 +1,156 @@
+import re
+import html
+from typing import Dict, List, Optional
+from datetime import datetime, date, time, timedelta, timezone
+from app.services.availability_service import clinic_tz
+from app.services.email_outbox import enqueue_many
+from app.services.templates import get_email_template
+
+# Placeholders available in VetSettings.email_templates["appointment_reminder"]
+PLACEHOLDERS = ("tutor_name", "patient_name", "date", "time", "reason", "branch_name", "branch_phone", "appointment_type")
+_PLACEHOLDER = re.compile(r"\{(" + "|".join(PLACEHOLDERS) + r")\}")
+
+DEFAULT_PHONE = "+56 9 4862 0501"
+SUBJECT = "Recordatorio de tu cita - CalFer"
+
+DEFAULT_TEMPLATE = """
+<p>Hola <strong>{tutor_name}</strong>,</p>
+<p>Te recordamos la cita de <strong>{appointment_type}</strong> para <strong>{patient_name}</strong> mañana en <strong>{branch_name}</strong>.</p>
+
+<div style="background-color: #f8fafc; border: 1px solid #e2e8f0; border-radius: 12px; padding: 24px; margin: 24px 0;">
+    <table style="width: 100%; border-collapse: collapse;">
+        <tr>
+            <td style="padding: 8px 0; color: #64748b; font-size: 14px; width: 100px;">Fecha:</td>
+            <td style="padding: 8px 0; color: #1e293b; font-size: 14px;">{date} a las {time}</td>
+        </tr>
+        <tr>
+            <td style="padding: 8px 0; color: #64748b; font-size: 14px;">Motivo:</td>
+            <td style="padding: 8px 0; color: #1e293b; font-size: 14px;">{reason}</td>
+        </tr>
+        <tr>
+            <td style="padding: 8px 0; color: #64748b; font-size: 14px;">Sucursal:</td>
+            <td style="padding: 8px 0; color: #1e293b; font-size: 14px;">{branch_name}</td>
+        </tr>
+    </table>
+</div>
+
+<p>Si no puedes asistir, avísanos al {branch_phone} para liberar la hora.</p>
+"""
+
+DEFAULT_TEXT = "Hola {tutor_name}, te recordamos la cita de {appointment_type} para {patient_name} el {date} a las {time} en {branch_name}. Si no puedes asistir, avísanos al {branch_phone}."
+
+TYPE_NAMES = {"VET": "veterinaria", "GROOMING": "peluquería"}
+
+def substitute(template: str, values: Dict[str, str], escape: bool = True) -> str:
+    """Fills known placeholders only, so CSS braces and stray text are left alone."""
+    def repl(m):
+        value = values.get(m.group(1), "")
+        return html.escape(value) if escape else value
+    return _PLACEHOLDER.sub(repl, template)
+
+def day_bounds_utc(day: date):
+    """A clinic-local calendar day as naive UTC bounds (how dates are stored)."""
+    tz = clinic_tz()
+    start = datetime.combine(day, time.min, tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+    end = datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+    return start, end
+
+async def send_appointment_reminders(day: Optional[date] = None) -> Dict:
+    """
+    Queues one reminder per 'scheduled' appointment on `day` (default: tomorrow,
+    clinic time). Idempotent: appointments are marked with reminder_sent_at, and
+    each message carries a dedupe key of appointment and date, so a rerun or an
+    overlapping run doesn't send twice.
+    """
+    from app.models.consultation import Consultation
+    from app.models.patient import Patient
+    from app.models.tutor import Tutor
+    from app.models.branch import Branch
+    from app.models.settings import VetSettings
+
+    tz = clinic_tz()
+    if day is None:
+        day = datetime.now(tz).date() + timedelta(days=1)
+    start, end = day_bounds_utc(day)
+
+    appointments = await Consultation.get_motor_collection().find(
+        {"status": "scheduled", "date": {"$gte": start, "$lt": end}, "reminder_sent_at": None},
+        {"patient_id": 1, "branch_id": 1, "date": 1, "reason": 1, "appointment_type": 1}
+    ).to_list(length=None)
+    if not appointments:
+        return {"date": day.isoformat(), "appointments": 0, "queued": 0, "skipped": 0}
+
+    patients = {
+        p["_id"]: p for p in await Patient.get_motor_collection().find(
+            {"_id": {"$in": list({a["patient_id"] for a in appointments})}},
+            {"name": 1, "tutor_id": 1}
+        ).to_list(length=None)
+    }
+    tutors = {
+        t["_id"]: t for t in await Tutor.get_motor_collection().find(
+            {"_id": {"$in": list({p["tutor_id"] for p in patients.values() if p.get("tutor_id")})}},
+            {"first_name": 1, "last_name": 1, "email": 1}
+        ).to_list(length=None)
+    }
+    branches = {
+        b["_id"]: b for b in await Branch.get_motor_collection().find(
+            {"_id": {"$in": list({a["branch_id"] for a in appointments if a.get("branch_id")})}},
+            {"name": 1, "phone": 1}
+        ).to_list(length=None)
+    }
+
+    vet_settings = await VetSettings.find_one()
+    content = (vet_settings.email_templates.get("appointment_reminder") if vet_settings else None) or DEFAULT_TEMPLATE
+
+    # The HTML shell only varies by branch phone: render it once per phone
+    shells: Dict[str, str] = {}
+
+    messages: List[Dict] = []
+    reminded = []
+    skipped = 0
+    for a in appointments:
+        patient = patients.get(a["patient_id"])
+        tutor = tutors.get(patient.get("tutor_id")) if patient else None
+        if not tutor or not tutor.get("email"):
+            skipped += 1
+            continue
+
+        branch = branches.get(a.get("branch_id")) or {}
+        phone = branch.get("phone") or DEFAULT_PHONE
+        if phone not in shells:
+            shells[phone] = get_email_template("Recordatorio de Cita", content, phone=phone)
+
+        local = a["date"].replace(tzinfo=timezone.utc).astimezone(tz)
+        values = {
+            "tutor_name": f"{tutor.get('first_name', '')} {tutor.get('last_name', '')}".strip(),
+            "patient_name": patient.get("name") or "",
+            "date": local.strftime("%d/%m/%Y"),
+            "time": local.strftime("%H:%M"),
+            "reason": a.get("reason") or "",
+            "branch_name": branch.get("name") or "CalFer",
+            "branch_phone": phone,
+            "appointment_type": TYPE_NAMES.get(a.get("appointment_type"), "atención"),
+        }
+        messages.append({
+            "to_email": tutor["email"],
+            "subject": SUBJECT,
+            "body": substitute(DEFAULT_TEXT, values, escape=False),
+            "html_body": substitute(shells[phone], values),
+            "dedupe_key": f"reminder:{a['_id']}:{a['date'].strftime('%Y%m%d%H%M')}",
+        })
+        reminded.append(a["_id"])
+
+    queued = await enqueue_many(messages)
+    if reminded:
+        from app.services.sync_service import version_stamp
+        await Consultation.get_motor_collection().update_many(
+            {"_id": {"$in": reminded}},
+            {"$set": {"reminder_sent_at": datetime.now(timezone.utc), **await version_stamp("consultations")}}
+        )
+
+    return {
+        "date": day.isoformat(),
+        "appointments": len(appointments),
+        "queued": queued,
+        "skipped": skipped,
+    }
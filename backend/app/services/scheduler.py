@@ -0,0 +1,226 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+import traceback
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from app.models.scheduled_job import JobLease, JobRun
+from app.services.availability_service import clinic_tz
+
+logger = logging.getLogger(__name__)
+
+# Identifies this process in leases and run history
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+# --- Cron expressions ---
+# Standard 5 fields: minute hour day-of-month month day-of-week (0 or 7 = Sunday).
+# Each field takes *, numbers, ranges (1-5), lists (1,15) and steps (*/15, 8-18/2).
+
+_FIELDS = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+def _parse_field(expr: str, low: int, high: int) -> Set[int]:
+    values = set()
+    for part in expr.split(","):
+        step = 1
+        if "/" in part:
+            part, step_str = part.split("/", 1)
+            step = int(step_str)
+            if step < 1:
+                raise ValueError(f"Invalid step in '{expr}'")
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (int(v) for v in part.split("-", 1))
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Value out of range in '{expr}' ({low}-{high})")
+        values.update(range(start, end + 1, step))
+    return values
+
+class CronSchedule:
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expr}'")
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(p, low, high) for p, (low, high) in zip(parts, _FIELDS)
+        )
+        # Cron counts Sunday as 0 (or 7); Python's weekday() has Monday = 0
+        self.weekdays = {(d - 1) % 7 for d in weekdays}
+        # Like cron: when both day fields are restricted, either one matching is enough
+        self._day_or = parts[2] != "*" and parts[4] != "*"
+
+    def matches(self, dt: datetime) -> bool:
+        if dt.minute not in self.minutes or dt.hour not in self.hours or dt.month not in self.months:
+            return False
+        day_ok = dt.day in self.days
+        weekday_ok = dt.weekday() in self.weekdays
+        return (day_ok or weekday_ok) if self._day_or else (day_ok and weekday_ok)
+
+    def next_after(self, dt: datetime, horizon_days: int = 366) -> Optional[datetime]:
+        candidate = dt.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        end = candidate + timedelta(days=horizon_days)
+        while candidate < end:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+                continue
+            if candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+                continue
+            if self.matches(candidate):
+                return candidate
+            candidate += timedelta(minutes=1)
+        return None
+
+# --- Registry ---
+
+@dataclass
+class ScheduledJob:
+    name: str
+    schedule: CronSchedule
+    func: Callable[[], Awaitable]
+    description: str = ""
+    lease_seconds: int = 3600 # Upper bound for one run; the lease expires after it
+
+JOBS: Dict[str, ScheduledJob] = {}
+
+def register_job(name: str, cron: str, func: Callable[[], Awaitable], description: str = "", lease_seconds: int = 3600):
+    JOBS[name] = ScheduledJob(name, CronSchedule(cron), func, description, lease_seconds)
+
+def ensure_jobs_registered():
+    if not JOBS:
+        from app.services.maintenance_jobs import register_default_jobs
+        register_default_jobs()
+
+# --- Leases ---
+
+async def _acquire(job: ScheduledJob, slot: Optional[str]) -> bool:
+    """
+    Takes the job's lease if it is free. For scheduled runs `slot` (the schedule
+    minute) must also not be claimed yet, so only one worker runs each occurrence.
+    """
+    now = datetime.now(timezone.utc)
+    query = {
+        "name": job.name,
+        "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}],
+    }
+    if slot:
+        query["last_slot"] = {"$ne": slot}
+    update = {"$set": {"owner": WORKER_ID, "locked_until": now + timedelta(seconds=job.lease_seconds)}}
+    if slot:
+        update["$set"]["last_slot"] = slot
+    try:
+        doc = await JobLease.get_motor_collection().find_one_and_update(
+            query, update, upsert=True, return_document=ReturnDocument.AFTER
+        )
+    except DuplicateKeyError:
+        # The lease exists and is held (or this slot already ran): the upsert lost
+        return False
+    return doc is not None and doc.get("owner") == WORKER_ID
+
+async def _release(job: ScheduledJob, status: str):
+    await JobLease.get_motor_collection().update_one(
+        {"name": job.name, "owner": WORKER_ID},
+        {"$set": {"locked_until": None, "last_run_at": datetime.now(timezone.utc), "last_status": status}}
+    )
+
+async def _execute(job: ScheduledJob, trigger: str, triggered_by: Optional[str] = None) -> JobRun:
+    run = JobRun(name=job.name, trigger=trigger, owner=WORKER_ID, triggered_by=triggered_by)
+    await run.insert()
+    try:
+        result = await job.func()
+        run.status = "SUCCESS"
+        run.result = result
+    except Exception as e:
+        run.status = "FAILED"
+        run.error = f"{e}\n{traceback.format_exc()}"[:4000]
+        logger.error(f"Scheduled job {job.name} failed: {e}")
+    finally:
+        run.finished_at = datetime.now(timezone.utc)
+        run.duration_ms = int((run.finished_at - run.started_at).total_seconds() * 1000)
+        await run.save()
+        await _release(job, run.status)
+    return run
+
+async def trigger_job(name: str, triggered_by: Optional[str] = None) -> Optional[JobRun]:
+    """Runs a job now (admin action). Returns None if another run holds the lease."""
+    ensure_jobs_registered()
+    job = JOBS[name]
+    if not await _acquire(job, slot=None):
+        return None
+    return await _execute(job, "manual", triggered_by)
+
+# --- Loop ---
+
+_loop_task: Optional[asyncio.Task] = None
+_running: Set[asyncio.Task] = set()
+
+async def _tick(now_local: datetime):
+    slot = now_local.strftime("%Y-%m-%dT%H:%M")
+    for job in JOBS.values():
+        if not job.schedule.matches(now_local):
+            continue
+        try:
+            if await _acquire(job, slot):
+                task = asyncio.create_task(_execute(job, "schedule"))
+                _running.add(task)
+                task.add_done_callback(_running.discard)
+        except Exception as e:
+            logger.error(f"Scheduler could not start {job.name}: {e}")
+
+async def _loop():
+    tz = clinic_tz()
+    while True:
+        now = datetime.now(tz)
+        # Wake just after the next minute boundary
+        await asyncio.sleep(60 - now.second - now.microsecond / 1_000_000 + 0.5)
+        await _tick(datetime.now(tz).replace(second=0, microsecond=0))
+
+def start_scheduler():
+    global _loop_task
+    if _loop_task is not None and not _loop_task.done():
+        return
+    ensure_jobs_registered()
+    _loop_task = asyncio.create_task(_loop())
+    print(f"--- SCHEDULER STARTED: {len(JOBS)} jobs ({WORKER_ID}) ---")
+
+async def stop_scheduler():
+    global _loop_task
+    if _loop_task is not None:
+        _loop_task.cancel()
+        try:
+            await _loop_task
+        except asyncio.CancelledError:
+            pass
+        _loop_task = None
+    # Let in-flight runs finish their bookkeeping; their leases expire otherwise
+    if _running:
+        await asyncio.wait(list(_running), timeout=10)
+
+async def list_jobs() -> List[Dict]:
+    ensure_jobs_registered()
+    leases = {l.name: l for l in await JobLease.find_all().to_list()}
+    tz = clinic_tz()
+    now = datetime.now(tz)
+    result = []
+    for job in JOBS.values():
+        lease = leases.get(job.name)
+        next_run = job.schedule.next_after(now)
+        result.append({
+            "name": job.name,
+            "description": job.description,
+            "schedule": job.schedule.expr,
+            "next_run_at": next_run.isoformat() if next_run else None,
+            "running": bool(lease and lease.locked_until and lease.locked_until.replace(tzinfo=timezone.utc) > datetime.now(timezone.utc)),
+            "last_run_at": lease.last_run_at if lease else None,
+            "last_status": lease.last_status if lease else None,
+        })
+    return result
@@ -0,0 +1,156 @@
+import io
+import re
+import csv
+from typing import AsyncIterator, Dict, List, Optional
+from beanie import PydanticObjectId
+from app.models.product import Product
+from app.models.branch import Branch
+
+PAGE_SIZE = 200
+# Rows fetched per aggregation while streaming the CSV
+CSV_BATCH = 1000
+PRODUCT_FIELDS = ["name", "sku", "external_id", "category", "supplier_name", "kind", "stock_alert_threshold"]
+
+def _product_match(search: Optional[str], category: Optional[str], supplier_name: Optional[str]) -> Dict:
+    match: Dict = {"is_active": True}
+    if category:
+        match["category"] = {"$regex": f"^{re.escape(category)}$", "$options": "i"}
+    if supplier_name:
+        match["supplier_name"] = {"$regex": re.escape(supplier_name), "$options": "i"}
+    if search:
+        # Prefix on name or SKU, like the product search
+        prefix = f"^{re.escape(search)}"
+        match["$or"] = [{"name": {"$regex": prefix, "$options": "i"}}, {"sku": {"$regex": prefix, "$options": "i"}}]
+    return match
+
+def matrix_pipeline(match: Dict, branch_ids: List[PydanticObjectId], low_stock: bool, limit: int) -> List[Dict]:
+    """
+    Products (already filtered and keyset-bounded by `match`) by name, each
+    with its quantity per branch pivoted into `quantities` {branch_id: qty}.
+    A product is low on stock when any of the branches has no more than its
+    stock_alert_threshold; a branch without a Stock document counts as 0.
+    """
+    pipeline = [
+        {"$match": match},
+        {"$sort": {"name": 1, "_id": 1}},
+        {"$lookup": {
+            "from": "stocks",
+            "let": {"pid": "$_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$and": [
+                    {"$eq": ["$product_id", "$$pid"]},
+                    {"$in": ["$branch_id", branch_ids]},
+                ]}}},
+                {"$project": {"_id": 0, "branch_id": 1, "quantity": 1}},
+            ],
+            "as": "stocks",
+        }},
+        {"$addFields": {
+            "quantities": {"$arrayToObject": {"$map": {
+                "input": "$stocks", "as": "s",
+                "in": {"k": {"$toString": "$$s.branch_id"}, "v": "$$s.quantity"},
+            }}},
+            "total_stock": {"$sum": "$stocks.quantity"},
+            # Services have no stock to run low on
+            "low_stock": {"$and": [{"$eq": ["$kind", "PRODUCT"]}, {"$or": [
+                {"$lt": [{"$size": "$stocks"}, len(branch_ids)]},
+                {"$gt": [{"$size": {"$filter": {
+                    "input": "$stocks", "as": "s",
+                    "cond": {"$lte": ["$$s.quantity", "$stock_alert_threshold"]},
+                }}}, 0]},
+            ]}]},
+        }},
+    ]
+    if low_stock:
+        pipeline.append({"$match": {"low_stock": True}})
+    pipeline += [
+        {"$limit": limit},
+        {"$project": {**{field: 1 for field in PRODUCT_FIELDS}, "quantities": 1, "total_stock": 1, "low_stock": 1}},
+    ]
+    return pipeline
+
+async def _branches(branch_id: Optional[str]) -> List[Branch]:
+    if branch_id:
+        branch = await Branch.get(PydanticObjectId(branch_id))
+        return [branch] if branch else []
+    return await Branch.find(Branch.is_active == True).sort("name").to_list()
+
+def _after_row(last: Dict) -> Dict:
+    """Keyset bound: products after `last` in (name, _id) order."""
+    return {"$or": [{"name": {"$gt": last["name"]}}, {"name": last["name"], "_id": {"$gt": last["_id"]}}]}
+
+async def _after(cursor: str) -> Dict:
+    last = None
+    if PydanticObjectId.is_valid(cursor):
+        last = await Product.get_motor_collection().find_one({"_id": PydanticObjectId(cursor)}, {"name": 1})
+    if not last:
+        raise ValueError("Cursor inválido")
+    return _after_row(last)
+
+async def _rows(match: Dict, branches: List[Branch], low_stock: bool, limit: int) -> List[Dict]:
+    pipeline = matrix_pipeline(match, [b.id for b in branches], low_stock, limit)
+    return await Product.get_motor_collection().aggregate(pipeline).to_list(None)
+
+async def stock_matrix(
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    supplier_name: Optional[str] = None,
+    branch_id: Optional[str] = None,
+    low_stock: bool = False,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+) -> Dict:
+    """One page of the matrix; `next_cursor` is set while there are more products."""
+    branches = await _branches(branch_id)
+    match = _product_match(search, category, supplier_name)
+    if cursor:
+        match = {"$and": [match, await _after(cursor)]}
+    rows = await _rows(match, branches, low_stock, limit + 1)
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = str(rows[-1]["_id"])
+    for row in rows:
+        row["id"] = str(row.pop("_id"))
+    return {
+        "branches": [{"id": str(b.id), "name": b.name} for b in branches],
+        "items": rows,
+        "next_cursor": next_cursor,
+    }
+
+async def stock_matrix_csv(
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    supplier_name: Optional[str] = None,
+    branch_id: Optional[str] = None,
+    low_stock: bool = False,
+) -> AsyncIterator[str]:
+    """The whole matrix as CSV (';' separated for Excel es-CL), written batch by batch."""
+    branches = await _branches(branch_id)
+    base = _product_match(search, category, supplier_name)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow(["Producto", "SKU", "Categoría", "Umbral"] + [b.name for b in branches] + ["Total"])
+    yield "\ufeff" + flush()
+    match = base
+    while True:
+        rows = await _rows(match, branches, low_stock, CSV_BATCH)
+        for row in rows:
+            quantities = row.get("quantities", {})
+            writer.writerow(
+                [row["name"], row.get("sku") or "", row.get("category") or "", row.get("stock_alert_threshold", "")]
+                + [quantities.get(str(b.id), 0) for b in branches]
+                + [row.get("total_stock", 0)]
+            )
+        if rows:
+            yield flush()
+        if len(rows) < CSV_BATCH:
+            break
+        match = {"$and": [base, _after_row(rows[-1])]}
@@ -0,0 +1,157 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from beanie import PydanticObjectId
+from pymongo import ReturnDocument
+from app.models.sync import SyncCounter, Tombstone
+
+# Versions are microsecond timestamps (bumped when several writes share one),
+# so "written in the last SETTLE" is just a version range. Each delta query
+# re-reads that window: a write stamped before a later one but committed after
+# it would otherwise be skipped by a client that already saw the later one.
+SETTLE = timedelta(seconds=5)
+# A client this far behind gets reset=True and reloads instead
+MAX_CHANGES = 2000
+SNAPSHOT_PAGE = 500
+TOMBSTONE_DAYS = 30
+
+def _sync_models() -> Dict:
+    from app.models.tutor import Tutor
+    from app.models.patient import Patient
+    from app.models.consultation import Consultation
+    from app.models.exam import Exam
+    from app.models.product import Product
+    from app.models.stock import Stock
+    from app.models.service import Service
+    from app.models.supplier import Supplier
+    from app.models.branch import Branch
+    from app.models.sale import Sale
+    from app.models.delivery import DeliveryOrder
+    models = [Tutor, Patient, Consultation, Exam, Product, Stock, Service, Supplier, Branch, Sale, DeliveryOrder]
+    return {model.get_settings().name: model for model in models}
+
+def _now_version() -> int:
+    return time.time_ns() // 1000
+
+async def next_version(collection: str, count: int = 1) -> int:
+    """
+    Reserves `count` versions for a collection and returns the highest. Atomic
+    on the counter document, so concurrent writers never share a version.
+    """
+    counter = await SyncCounter.get_motor_collection().find_one_and_update(
+        {"_id": collection},
+        [{"$set": {"seq": {"$max": [{"$add": [{"$ifNull": ["$seq", 0]}, count]}, _now_version()]}}}],
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"]
+
+async def version_stamp(collection: str) -> Dict:
+    """Fields to $set on writes that bypass Beanie (raw updates, bulk_write)."""
+    return {"version": await next_version(collection), "updated_at": datetime.now(timezone.utc)}
+
+async def stamp_documents(documents: List) -> None:
+    """Stamps documents about to go through insert_many, which skips the hooks."""
+    if not documents:
+        return
+    version = await next_version(documents[0].get_settings().name)
+    now = datetime.now(timezone.utc)
+    for document in documents:
+        document.version = version
+        document.updated_at = now
+
+async def record_tombstones(collection: str, doc_ids: Iterable[PydanticObjectId]):
+    doc_ids = list(doc_ids)
+    if not doc_ids:
+        return
+    version = await next_version(collection)
+    await Tombstone.insert_many([Tombstone(collection=collection, doc_id=doc_id, version=version) for doc_id in doc_ids])
+
+async def mark_reset(collection: str):
+    """After bulk deletes without tombstones: every client reloads the collection."""
+    version = await next_version(collection)
+    await SyncCounter.get_motor_collection().update_one({"_id": collection}, {"$max": {"reset_before": version}})
+    from app.services.live_events import publish_resync
+    publish_resync(collection)
+    if collection == "consultations":
+        # Bulk consultation writes skip index_consultation()
+        from app.services.availability_service import invalidate_availability_index
+        invalidate_availability_index()
+
+async def mark_reset_all():
+    for collection in _sync_models():
+        await mark_reset(collection)
+
+def _encode_token(version: int, after: Optional[str] = None) -> str:
+    return f"{version}.{after}" if after else str(version)
+
+def _decode_token(token: Optional[str]):
+    """'<version>' for deltas, '<version>.<last id>' while paging a snapshot."""
+    if not token:
+        return None, None
+    version, _, after = token.partition(".")
+    if not version.isdigit() or (after and not PydanticObjectId.is_valid(after)):
+        raise ValueError("Invalid sync token")
+    return int(version), PydanticObjectId(after) if after else None
+
+async def changes_since(collection: str, token: Optional[str] = None, limit: int = SNAPSHOT_PAGE) -> Dict:
+    """
+    Without a token: the collection in _id pages (a snapshot), ending with a
+    token for deltas. With a delta token: documents written since, plus
+    deleted ids. Clients apply items as upserts; a few may arrive twice.
+    """
+    models = _sync_models()
+    if collection not in models:
+        raise KeyError(collection)
+    model = models[collection]
+    version, after = _decode_token(token)
+    # Everything stamped more than SETTLE before this is committed and read below
+    queried_at = _now_version()
+    counter = await SyncCounter.get_motor_collection().find_one({"_id": collection}) or {}
+
+    if version is None or after is not None:
+        # Snapshot page. Starting version: anything written from here on shows
+        # up in the deltas even if its _id was already paged past.
+        started = version if version is not None else queried_at
+        query = {"_id": {"$gt": after}} if after else {}
+        items = await model.find(query).sort("_id").limit(limit + 1).to_list()
+        has_more = len(items) > limit
+        items = items[:limit]
+        next_token = _encode_token(started, str(items[-1].id)) if has_more else _encode_token(started)
+        return {"items": items, "deleted": [], "next": next_token, "has_more": has_more, "reset": False, "snapshot": True}
+
+    if version < counter.get("reset_before", 0):
+        return {"items": [], "deleted": [], "next": None, "has_more": False, "reset": True, "snapshot": False}
+
+    since = version - int(SETTLE.total_seconds() * 1_000_000)
+    items = await model.find({"version": {"$gt": since}}).sort("version").limit(MAX_CHANGES + 1).to_list()
+    if len(items) > MAX_CHANGES:
+        return {"items": [], "deleted": [], "next": None, "has_more": False, "reset": True, "snapshot": False}
+    deleted = await Tombstone.find(
+        {"collection": collection, "version": {"$gt": since}}
+    ).sort("version").to_list()
+    latest = max([version, queried_at] + [item.version for item in items] + [t.version for t in deleted])
+    return {
+        "items": items,
+        "deleted": [str(t.doc_id) for t in deleted],
+        "next": _encode_token(latest),
+        "has_more": False,
+        "reset": False,
+        "snapshot": False,
+    }
+
+async def purge_tombstones(days: int = TOMBSTONE_DAYS) -> Dict:
+    """Drops old tombstones; clients whose token predates them have to reload."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    collection = Tombstone.get_motor_collection()
+    purged = 0
+    async for row in collection.aggregate([
+        {"$match": {"deleted_at": {"$lt": cutoff}}},
+        {"$group": {"_id": "$collection", "last": {"$max": "$version"}, "count": {"$sum": 1}}},
+    ]):
+        await SyncCounter.get_motor_collection().update_one(
+            {"_id": row["_id"]}, {"$max": {"reset_before": row["last"] + 1}}, upsert=True
+        )
+        await collection.delete_many({"collection": row["_id"], "version": {"$lte": row["last"]}})
+        purged += row["count"]
+    return {"purged": purged}
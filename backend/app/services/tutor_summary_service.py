@@ -0,0 +1,206 @@
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+from beanie import PydanticObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from app.models.tutor_summary import TutorSummary
+import asyncio
+
+# --- Incremental updates ---
+# Every hook is a single $inc/$max update per tutor, so concurrent requests never
+# overwrite each other. Hooks only touch summaries that already exist: a missing
+# one is built from the source collections on first read (`get_summary`), which
+# already includes whatever the hook would have added.
+
+STATUS_COUNTERS = {"attended": "attended", "no_show": "no_shows"}
+
+async def _apply(tutor_ids: List[PydanticObjectId], inc: Optional[Dict] = None, max_: Optional[Dict] = None):
+    update = {"$set": {"updated_at": datetime.now(timezone.utc)}}
+    if inc:
+        update["$inc"] = inc
+    if max_:
+        update["$max"] = max_
+    collection = TutorSummary.get_motor_collection()
+    await asyncio.gather(*(
+        collection.update_one({"tutor_id": tid}, update)
+        for tid in tutor_ids if tid
+    ))
+
+async def _tutors_of_patient(patient_id: PydanticObjectId) -> List[PydanticObjectId]:
+    from app.models.patient import Patient
+    doc = await Patient.get_motor_collection().find_one(
+        {"_id": patient_id}, {"tutor_id": 1, "tutor2_id": 1}
+    )
+    if not doc:
+        return []
+    return [t for t in (doc.get("tutor_id"), doc.get("tutor2_id")) if t]
+
+async def on_sale_completed(sale):
+    """A sale became COMPLETED (at checkout, or when its delivery was delivered)."""
+    if not sale.customer_id:
+        return
+    await _apply(
+        [sale.customer_id],
+        inc={"total_spent": sale.total, "total_purchases": 1},
+        max_={"last_purchase": sale.created_at}
+    )
+
+async def on_sale_voided(sale, previous_status: str):
+    if not sale.customer_id or previous_status != "COMPLETED":
+        return
+    await _apply([sale.customer_id], inc={"total_spent": -sale.total, "total_purchases": -1})
+
+async def on_debt_changed(tutor_id: PydanticObjectId, delta: float):
+    await _apply([tutor_id], inc={"debt": delta})
+
+async def on_tutor_deleted(tutor_id: PydanticObjectId):
+    await TutorSummary.get_motor_collection().delete_one({"tutor_id": tutor_id})
+
+async def on_consultation_created(con):
+    inc = {"visits": 1}
+    max_ = None
+    counter = STATUS_COUNTERS.get(con.status)
+    if counter:
+        inc[counter] = 1
+    if con.status == "attended":
+        max_ = {"last_visit": con.date}
+    await _apply(await _tutors_of_patient(con.patient_id), inc=inc, max_=max_)
+
+async def on_consultation_status_changed(con, old_status: str):
+    if old_status == con.status:
+        return
+    inc = {}
+    if STATUS_COUNTERS.get(old_status):
+        inc[STATUS_COUNTERS[old_status]] = -1
+    if STATUS_COUNTERS.get(con.status):
+        inc[STATUS_COUNTERS[con.status]] = 1
+    max_ = {"last_visit": con.date} if con.status == "attended" else None
+    if inc or max_:
+        await _apply(await _tutors_of_patient(con.patient_id), inc=inc, max_=max_)
+
+async def on_consultation_deleted(con):
+    inc = {"visits": -1}
+    counter = STATUS_COUNTERS.get(con.status)
+    if counter:
+        inc[counter] = -1
+    await _apply(await _tutors_of_patient(con.patient_id), inc=inc)
+
+async def on_patient_moved(old_tutor_ids: List[PydanticObjectId], new_tutor_ids: List[PydanticObjectId]):
+    """
+    The patient's tutor or second tutor changed, taking its visits along. The
+    visit counters can be moved with $inc but last_visit can't be taken back,
+    so the tutors that gained or lost the patient are rebuilt instead.
+    """
+    changed = list({t for t in old_tutor_ids if t} ^ {t for t in new_tutor_ids if t})
+    if not changed:
+        return
+    summaries = await _compute(
+        {"_id": {"$in": changed}},
+        {"$or": [{"tutor_id": {"$in": changed}}, {"tutor2_id": {"$in": changed}}]},
+        {"customer_id": {"$in": changed}}
+    )
+    await _store(summaries)
+
+# --- Rebuild ---
+
+async def _compute(tutor_filter: Dict, patient_filter: Dict, sale_filter: Dict) -> Dict[PydanticObjectId, Dict]:
+    from app.models.tutor import Tutor
+    from app.models.patient import Patient
+    from app.models.consultation import Consultation
+    from app.models.sale import Sale
+
+    summaries: Dict[PydanticObjectId, Dict] = {}
+
+    def blank(tid):
+        return summaries.setdefault(tid, {
+            "tutor_id": tid, "visits": 0, "attended": 0, "no_shows": 0, "last_visit": None,
+            "total_spent": 0.0, "total_purchases": 0, "last_purchase": None, "debt": 0.0,
+        })
+
+    async for t in Tutor.get_motor_collection().find(tutor_filter, {"debt": 1}):
+        blank(t["_id"])["debt"] = t.get("debt", 0.0)
+
+    owners: Dict[PydanticObjectId, List[PydanticObjectId]] = {}
+    async for p in Patient.get_motor_collection().find(patient_filter, {"tutor_id": 1, "tutor2_id": 1}):
+        owners[p["_id"]] = [t for t in (p.get("tutor_id"), p.get("tutor2_id")) if t and t in summaries]
+
+    if owners:
+        pipeline = [
+            {"$match": {"patient_id": {"$in": list(owners)}}},
+            {"$group": {
+                "_id": "$patient_id",
+                "visits": {"$sum": 1},
+                "attended": {"$sum": {"$cond": [{"$eq": ["$status", "attended"]}, 1, 0]}},
+                "no_shows": {"$sum": {"$cond": [{"$eq": ["$status", "no_show"]}, 1, 0]}},
+                "last_visit": {"$max": {"$cond": [{"$eq": ["$status", "attended"]}, "$date", None]}},
+            }}
+        ]
+        async for row in Consultation.get_motor_collection().aggregate(pipeline):
+            for tid in owners.get(row["_id"], []):
+                s = summaries[tid]
+                s["visits"] += row["visits"]
+                s["attended"] += row["attended"]
+                s["no_shows"] += row["no_shows"]
+                if row["last_visit"] and (not s["last_visit"] or row["last_visit"] > s["last_visit"]):
+                    s["last_visit"] = row["last_visit"]
+
+    pipeline = [
+        {"$match": {"status": "COMPLETED", "customer_id": {"$ne": None}, **sale_filter}},
+        {"$group": {
+            "_id": "$customer_id",
+            "total_spent": {"$sum": "$total"},
+            "total_purchases": {"$sum": 1},
+            "last_purchase": {"$max": "$created_at"},
+        }}
+    ]
+    async for row in Sale.get_motor_collection().aggregate(pipeline):
+        if row["_id"] in summaries:
+            summaries[row["_id"]].update(
+                total_spent=row["total_spent"],
+                total_purchases=row["total_purchases"],
+                last_purchase=row["last_purchase"],
+            )
+
+    return summaries
+
+async def _store(summaries: Dict[PydanticObjectId, Dict]):
+    now = datetime.now(timezone.utc)
+    ops = [
+        ReplaceOne({"tutor_id": tid}, {**s, "updated_at": now}, upsert=True)
+        for tid, s in summaries.items()
+    ]
+    collection = TutorSummary.get_motor_collection()
+    for i in range(0, len(ops), 1000):
+        await collection.bulk_write(ops[i:i + 1000], ordered=False)
+
+async def rebuild_summary(tutor_id: PydanticObjectId) -> TutorSummary:
+    tutor_id = PydanticObjectId(tutor_id)
+    summaries = await _compute(
+        {"_id": tutor_id},
+        {"$or": [{"tutor_id": tutor_id}, {"tutor2_id": tutor_id}]},
+        {"customer_id": tutor_id}
+    )
+    await _store(summaries)
+    return await TutorSummary.find_one(TutorSummary.tutor_id == tutor_id)
+
+async def rebuild_all_summaries() -> int:
+    """Recomputes every summary from tutors, patients, consultations and sales."""
+    summaries = await _compute({}, {}, {})
+    await _store(summaries)
+    # Drop summaries of tutors that no longer exist
+    await TutorSummary.get_motor_collection().delete_many({"tutor_id": {"$nin": list(summaries)}})
+    return len(summaries)
+
+async def get_summary(tutor_id: PydanticObjectId) -> TutorSummary:
+    summary = await TutorSummary.find_one(TutorSummary.tutor_id == tutor_id)
+    if summary is None:
+        try:
+            summary = await rebuild_summary(tutor_id)
+        except (DuplicateKeyError, BulkWriteError) as e:
+            # Two first reads raced on the unique tutor_id upsert; the other
+            # one stored the same summary
+            errors = e.details.get("writeErrors", []) if isinstance(e, BulkWriteError) else []
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            summary = await TutorSummary.find_one(TutorSummary.tutor_id == tutor_id)
+    return summary
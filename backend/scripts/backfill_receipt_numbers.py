@@ -0,0 +1,34 @@
+
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from pymongo import UpdateOne
+from app.core.database import init_db
+from app.models.sale import Sale, receipt_number_for
+
+async def run(batch_size: int = 1000):
+    await init_db()
+
+    collection = Sale.get_motor_collection()
+    cursor = collection.find({"receipt_number": None}, {"_id": 1}, batch_size=batch_size)
+
+    ops = []
+    updated = 0
+    async for doc in cursor:
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"receipt_number": receipt_number_for(doc["_id"])}}))
+        if len(ops) >= batch_size:
+            await collection.bulk_write(ops, ordered=False)
+            updated += len(ops)
+            ops = []
+    if ops:
+        await collection.bulk_write(ops, ordered=False)
+        updated += len(ops)
+
+    print(f"Receipt numbers assigned to {updated} sales")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+import random
+import tracemalloc
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.services.fuzzy_search import TrigramIndex
+
+FIRST_NAMES = [
+    "Juan", "María", "José", "Francisca", "Benjamín", "Catalina", "Matías", "Valentina",
+    "Sebastián", "Javiera", "Tomás", "Constanza", "Vicente", "Antonia", "Martín", "Fernanda",
+    "Cristóbal", "Camila", "Diego", "Isidora", "Joaquín", "Florencia", "Agustín", "Ignacia",
+]
+LAST_NAMES = [
+    "González", "Muñoz", "Rojas", "Díaz", "Pérez", "Soto", "Contreras", "Silva", "Martínez",
+    "Sepúlveda", "Morales", "Rodríguez", "López", "Fuentes", "Hernández", "Torres", "Araya",
+    "Flores", "Espinoza", "Valenzuela", "Castillo", "Tapia", "Reyes", "Gutiérrez", "Castro",
+]
+PET_NAMES = [
+    "Firulais", "Luna", "Max", "Rocky", "Canela", "Toby", "Kira", "Simba", "Nala", "Coco",
+    "Bobby", "Pelusa", "Manchas", "Chispa", "Pancho", "Lola", "Bruno", "Mia", "Tobías", "Copito",
+]
+QUERIES = ["Gonsalez", "Firulai", "Sepulbeda", "valensuela", "Catalna Rojaz", "+56 9 4862", "Tomas Perez", "Canella"]
+
+def synthetic_tutors(n: int):
+    rnd = random.Random(42)
+    for i in range(n):
+        phone = f"+56 9 {rnd.randint(1000, 9999)} {rnd.randint(1000, 9999)}"
+        yield f"t{i}", f"{rnd.choice(FIRST_NAMES)} {rnd.choice(LAST_NAMES)} {rnd.choice(LAST_NAMES)}", phone
+
+def synthetic_patients(n: int):
+    rnd = random.Random(7)
+    for i in range(n):
+        yield f"p{i}", f"{rnd.choice(PET_NAMES)}{rnd.choice(['', '', ' II', ' Jr'])}", None
+
+def build(rows):
+    index = TrigramIndex()
+    for key, text, phone in rows:
+        index.add(key, text, phone)
+    return index
+
+def bench(label: str, make_rows, runs: int = 50):
+    # Timed build first, then a second one under tracemalloc (which slows it down)
+    t0 = time.perf_counter()
+    index = build(make_rows())
+    build_s = time.perf_counter() - t0
+
+    del index
+    tracemalloc.start()
+    index = build(make_rows())
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"\n--- {label}: {len(index)} records ---")
+    print(f"Build time: {build_s:.2f} s")
+    print(f"Memory: {current / 1024 / 1024:.1f} MB (peak {peak / 1024 / 1024:.1f} MB)")
+
+    for q in QUERIES:
+        timings = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            hits = index.search(q, limit=20)
+            timings.append((time.perf_counter() - t0) * 1000)
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"  {q!r:20} p50={p50:6.2f} ms  p95={p95:6.2f} ms  hits={len(hits)}")
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    bench("Tutors", lambda: synthetic_tutors(n))
+    bench("Patients", lambda: synthetic_patients(n))
@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import asyncio
+import random
+import tempfile
+import tracemalloc
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.database import init_db
+from app.services.import_service import CsvSource, product_parser, tutor_parser
+
+HEADER_PRODUCTS = "Id;Nombre Artículo;UPC/EAN/ISBN;Categoría;Nombre de la Compañía;Precio de Compra;Precio de Venta;Porcentaje de Impuesto(s);Cantidad en stock [Bodega];Cantidad en stock [Olivar];Cantidad en stock [Centro]"
+HEADER_TUTORS = "Nombre;Apellidos;Teléfono;Email;Total gastado"
+
+def write_products(path: str, n: int):
+    rnd = random.Random(42)
+    # Legacy exports come in latin-1
+    with open(path, "w", encoding="latin-1", newline="") as f:
+        f.write(HEADER_PRODUCTS + "\n")
+        for i in range(n):
+            stocks = ";".join(str(rnd.randint(0, 40)) for _ in range(3))
+            f.write(f"{i};Alimento Perro Adulto {i} kg;780{i:010d};Alimentos;Distribuidora Sur;{rnd.randint(1, 90)}.{rnd.randint(100, 999)};{rnd.randint(1, 99)}.990;19;{stocks}\n")
+
+def write_tutors(path: str, n: int):
+    rnd = random.Random(7)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write(HEADER_TUTORS + "\n")
+        for i in range(n):
+            f.write(f"Nombre{i};Apellido Pérez;+56 9 {rnd.randint(1000, 9999)} {rnd.randint(1000, 9999)};cliente{i}@correo.cl;${rnd.randint(1, 900)}.{rnd.randint(100, 999)}\n")
+
+def parse_all(path: str, make_parser) -> int:
+    count = 0
+    with CsvSource(path) as source:
+        parse = make_parser(source.columns)
+        for row in source.rows():
+            if row and parse(row) is not None:
+                count += 1
+    return count
+
+def bench(label: str, path: str, make_parser):
+    t0 = time.perf_counter()
+    count = parse_all(path, make_parser)
+    elapsed = time.perf_counter() - t0
+
+    tracemalloc.start()
+    parse_all(path, make_parser)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"{label}: {count} rows ({size_mb:.1f} MB) parsed in {elapsed:.2f} s ({count / elapsed:,.0f} rows/s), peak memory {peak / 1024 / 1024:.1f} MB")
+
+async def run(n: int):
+    # Documents need an initialized Beanie; nothing is written to the database.
+    # Parsing only: inserts go in batches of BATCH_SIZE and don't change the memory profile.
+    await init_db()
+    with tempfile.TemporaryDirectory() as tmp:
+        products = os.path.join(tmp, "productos.csv")
+        tutors = os.path.join(tmp, "clientes.csv")
+        write_products(products, n)
+        write_tutors(tutors, n)
+        bench("Products", products, product_parser)
+        bench("Tutors", tutors, tutor_parser)
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 50_000))
@@ -0,0 +1,105 @@
+
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+
+NGINX_PORT = 8089
+
+def fetch(url: str, headers: dict = None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, dict(response.headers), response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, dict(e.headers), e.read()
+
+def render_config(tmp: str, api: str) -> str:
+    """deploy/nginx.conf pointed at the local API and UPLOAD_DIR, listening on NGINX_PORT."""
+    with open(os.path.join(os.getcwd(), "deploy", "nginx.conf")) as f:
+        conf = f.read()
+    upload_dir = os.path.abspath(settings.UPLOAD_DIR).rstrip("/") + "/"
+    conf = conf.replace("server 127.0.0.1:8000;", f"server {api.split('://', 1)[-1].rstrip('/')};")
+    conf = conf.replace("alias /srv/veterinaria/backend/uploads/;", f"alias {upload_dir};")
+    conf = conf.replace("listen 80;", f"listen 127.0.0.1:{NGINX_PORT};")
+    conf = conf.replace("location /_protected_uploads/", f"location {settings.FILE_ACCEL_PREFIX.rstrip('/')}/")
+    # Unprivileged run: keep pid, logs and temp files in the scratch dir
+    conf = conf.replace("events {", f"pid {tmp}/nginx.pid;\nerror_log {tmp}/error.log;\n\nevents {{", 1)
+    conf = conf.replace("http {", f"http {{\n    access_log off;\n    client_body_temp_path {tmp};\n    proxy_temp_path {tmp};", 1)
+    path = os.path.join(tmp, "nginx.conf")
+    with open(path, "w") as f:
+        f.write(conf)
+    return path
+
+def check(label: str, ok: bool, detail: str = "") -> bool:
+    print(f"  [{'OK' if ok else 'FAIL'}] {label}{': ' + detail if detail and not ok else ''}")
+    return ok
+
+def run():
+    # Start the API with FILE_SERVING=nginx, upload a file, then:
+    # python scripts/check_file_offload.py <file_id> [--api 127.0.0.1:8000]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    api = "127.0.0.1:8000"
+    if "--api" in sys.argv:
+        api = sys.argv[sys.argv.index("--api") + 1]
+        args = [a for a in args if a != api]
+    if not args:
+        print("Usage: python scripts/check_file_offload.py <file_id> [--api host:port]")
+        sys.exit(2)
+    file_id = args[0]
+    nginx = shutil.which("nginx")
+    if not nginx:
+        print("nginx is not installed")
+        sys.exit(2)
+
+    path = f"/api/v1/files/{file_id}"
+    status, headers, body = fetch(f"http://{api}{path}")
+    print(f"API at {api}:")
+    ok = check("answers 200", status == 200, str(status))
+    ok &= check("offloads with X-Accel-Redirect (FILE_SERVING=nginx)", "X-Accel-Redirect" in headers and not body)
+    if not ok:
+        sys.exit(1)
+    etag = headers.get("ETag", "")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conf = render_config(tmp, api)
+        proc = subprocess.Popen([nginx, "-p", tmp, "-c", conf, "-g", "daemon off;"])
+        try:
+            time.sleep(1)
+            base = f"http://127.0.0.1:{NGINX_PORT}"
+            print(f"nginx at {base}:")
+            status, headers, body = fetch(base + path)
+            ok &= check("serves the file", status == 200 and len(body) > 0, str(status))
+            if etag:
+                ok &= check("content matches the ETag (SHA-256)", f'"{hashlib.sha256(body).hexdigest()}"' == etag)
+                ok &= check("keeps the API's ETag", headers.get("ETag") == etag, headers.get("ETag", "missing"))
+            ok &= check("keeps Content-Disposition", "Content-Disposition" in headers)
+            ok &= check("does not leak X-Accel-Redirect", "X-Accel-Redirect" not in headers)
+
+            status, headers, part = fetch(base + path, {"Range": "bytes=0-99"})
+            ok &= check("serves byte ranges", status == 206 and part == body[:100], str(status))
+            if etag:
+                status, _, _ = fetch(base + path, {"If-None-Match": etag})
+                ok &= check("answers 304 to If-None-Match", status == 304, str(status))
+
+            status, _, _ = fetch(base + settings.FILE_ACCEL_PREFIX.rstrip("/") + "/" + os.listdir(settings.UPLOAD_DIR)[0])
+            ok &= check("internal location is not public", status == 404, str(status))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    print("All checks passed" if ok else "Some checks FAILED")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,38 @@
+
+import asyncio
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.database import init_db
+from app.services.file_gc_service import collect_orphan_files
+
+async def run():
+    # Report only by default; --apply acts in FILE_GC_MODE, --delete skips the quarantine.
+    # python scripts/file_gc.py [--apply] [--delete]
+    dry_run = "--apply" not in sys.argv
+    mode = "delete" if "--delete" in sys.argv else None
+    await init_db()
+
+    async def progress(done, total, collection):
+        print(f"  {collection}: {done}/{total}", end="\r")
+
+    report = await collect_orphan_files(dry_run=dry_run, mode=mode, progress=progress)
+    print()
+    for record in report["records"]:
+        print(f"  record {record['id']} ({record['owner']}): {record['reason']}")
+    for stray in report["files"]:
+        print(f"  file {stray['path']}: {stray['reason']}")
+
+    print(f"Orphaned records: {report['orphan_records']} ({report['orphan_mb']} MB)")
+    print(f"Stray files: {report['stray_files']} ({report['stray_mb']} MB)")
+    if dry_run:
+        print("Dry run, nothing changed. Use --apply to act.")
+    else:
+        print(f"Mode {report['mode']}: {report['quarantined_records']} records quarantined, "
+              f"{report['deleted_records']} deleted, {report['purged_files']} quarantined files purged")
+
+if __name__ == "__main__":
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+
+import asyncio
+import hashlib
+import os
+import sys
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.database import init_db
+from app.models.file_record import FileRecord
+from app.services.file_service import BLOB_DIR, UPLOAD_CHUNK, _acquire_blob
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(UPLOAD_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+async def run():
+    # Moves files uploaded before blob storage into UPLOAD_DIR/blobs, sharing
+    # one copy per content. Safe to re-run: migrated records are skipped.
+    # python scripts/migrate_files_to_blobs.py [--dry-run]
+    dry_run = "--dry-run" in sys.argv
+    await init_db()
+
+    migrated, missing, saved = 0, 0, 0
+    seen = set()
+    async for record in FileRecord.find({"path": {"$not": {"$regex": f"^{BLOB_DIR}/"}}}):
+        full_path = os.path.join(settings.UPLOAD_DIR, record.path)
+        if not os.path.exists(full_path):
+            print(f"  missing on disk: {record.path} ({record.id})")
+            missing += 1
+            continue
+
+        sha256 = await asyncio.to_thread(hash_file, full_path)
+        size = os.path.getsize(full_path)
+        if sha256 in seen:
+            saved += size
+        seen.add(sha256)
+        migrated += 1
+        if dry_run:
+            continue
+
+        # _acquire_blob moves the file in, or leaves it if the content is already there
+        blob = await _acquire_blob(sha256, size, full_path)
+        await record.set({FileRecord.path: blob["path"], FileRecord.sha256: sha256, FileRecord.size: size})
+        if os.path.exists(full_path):
+            os.remove(full_path)
+
+    action = "Would migrate" if dry_run else "Migrated"
+    print(f"{action} {migrated} files into {len(seen)} blobs, {saved / 1024 / 1024:.1f} MB of duplicates")
+    if missing:
+        print(f"{missing} records point to missing files (left unchanged)")
+
+if __name__ == "__main__":
+    asyncio.run(run())
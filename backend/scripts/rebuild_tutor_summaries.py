@@ -0,0 +1,26 @@
+
+import asyncio
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.database import init_db
+from app.services.tutor_summary_service import rebuild_all_summaries, rebuild_summary
+
+async def run():
+    await init_db()
+
+    t0 = time.perf_counter()
+    if len(sys.argv) > 1:
+        # Single tutor: python scripts/rebuild_tutor_summaries.py <tutor_id>
+        summary = await rebuild_summary(sys.argv[1])
+        print(summary.model_dump() if summary else "Tutor not found")
+    else:
+        count = await rebuild_all_summaries()
+        print(f"Rebuilt {count} tutor summaries in {time.perf_counter() - t0:.1f} s")
+
+if __name__ == "__main__":
+    asyncio.run(run())
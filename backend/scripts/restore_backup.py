@@ -0,0 +1,52 @@
+
+import asyncio
+import os
+import sys
+import time
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.config import settings
+from app.core.database import init_db
+from app.services.backup_service import backup_chain, restore_backup, latest_chain_backup
+
+async def run():
+    # python scripts/restore_backup.py [backup_YYYYmmdd_HHMMSS] [--db target] [--force]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    target = f"{settings.DB_NAME}_restore"
+    if "--db" in sys.argv:
+        target = sys.argv[sys.argv.index("--db") + 1]
+        args = [a for a in args if a != target]
+
+    name = args[0] if args else (latest_chain_backup() or {}).get("name")
+    if not name:
+        print("No backups found")
+        return
+    if target == settings.DB_NAME and "--force" not in sys.argv:
+        print(f"Refusing to overwrite the live database '{target}' without --force")
+        return
+
+    # Restoring over the live DB resets sync counters and caches through Beanie
+    await init_db()
+    chain = backup_chain(name)
+    print(f"Restoring {name} into '{target}': " + " -> ".join(m["name"] for m in chain))
+
+    async def progress(done, total, collection):
+        print(f"  [{done}/{total}] {collection}")
+
+    t0 = time.perf_counter()
+    result = await restore_backup(name, target, progress)
+    for coll, info in result["collections"].items():
+        print(f"  {coll}: {info.get('documents', '?')} documents, {info.get('indexes', 0)} indexes")
+    print(f"Done in {time.perf_counter() - t0:.1f} s")
+    if result["verified"]:
+        print("Verified: document counts and checksums match metadata.json")
+    else:
+        print(f"VERIFICATION FAILED, '{target}' was left unchanged:")
+        for problem in result["problems"]:
+            print(f"  {problem}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(run())
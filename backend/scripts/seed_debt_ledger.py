@@ -0,0 +1,46 @@
+
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.database import init_db
+from app.models.tutor import Tutor
+from app.models.sale import Sale
+from app.models.debt_entry import DebtEntry
+
+async def run():
+    """
+    One-off migration: debts that existed before the ledger get an opening
+    ADJUSTMENT entry so statements and the aging report add up to Tutor.debt.
+    The entry is dated at the client's last DEBT sale (best guess for aging).
+    """
+    await init_db()
+
+    with_entries = set(await DebtEntry.get_motor_collection().distinct("tutor_id"))
+    created = 0
+    async for t in Tutor.get_motor_collection().find({"debt": {"$ne": 0}}, {"debt": 1}):
+        if t["_id"] in with_entries:
+            continue
+        last_debt_sale = await Sale.get_motor_collection().find_one(
+            {"customer_id": t["_id"], "payment_method": "DEBT"},
+            {"created_at": 1},
+            sort=[("created_at", -1)]
+        )
+        await DebtEntry(
+            tutor_id=t["_id"],
+            kind="ADJUSTMENT",
+            amount=t["debt"],
+            balance_after=t["debt"],
+            note="Saldo inicial (migración)",
+            created_at=last_debt_sale["created_at"] if last_debt_sale else datetime.now(timezone.utc)
+        ).insert()
+        created += 1
+
+    print(f"Opening balances created for {created} clients")
+
+if __name__ == "__main__":
+    asyncio.run(run())
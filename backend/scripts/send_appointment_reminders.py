@@ -0,0 +1,27 @@
+
+import asyncio
+import os
+import sys
+import time
+from datetime import date
+
+# Add backend to path
+sys.path.append(os.getcwd())
+
+from app.core.database import init_db
+from app.services.reminder_service import send_appointment_reminders
+
+async def run():
+    await init_db()
+
+    # Optional day: python scripts/send_appointment_reminders.py 2025-03-14 (default: tomorrow)
+    day = date.fromisoformat(sys.argv[1]) if len(sys.argv) > 1 else None
+
+    t0 = time.perf_counter()
+    result = await send_appointment_reminders(day)
+    print(f"Reminders for {result['date']}: {result['queued']} queued, "
+          f"{result['skipped']} without email, {result['appointments']} appointments "
+          f"({time.perf_counter() - t0:.2f} s)")
+
+if __name__ == "__main__":
+    asyncio.run(run())
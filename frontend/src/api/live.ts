@@ -0,0 +1,55 @@
+import api from './axios';
+
+export interface LiveEvent {
+    type: 'ready' | 'stock' | 'consultation' | 'delivery' | 'resync';
+    action?: 'created' | 'updated' | 'cancelled' | 'deleted';
+    id?: string;
+    branch_id?: string | null;
+    product_id?: string;
+    quantity?: number;
+    status?: string;
+    version?: number;
+    [key: string]: any;
+}
+
+const RECONNECT_MS = 5000;
+
+// Listens to GET /live/{branchId} (server-sent events) until the returned
+// function is called. Uses fetch instead of EventSource so the token goes in
+// the Authorization header, and reconnects on its own; every (re)connection
+// starts with a "ready" event, the moment to refetch what may have been missed.
+export function subscribeLive(branchId: string, onEvent: (event: LiveEvent) => void): () => void {
+    const controller = new AbortController();
+
+    const connect = async () => {
+        while (!controller.signal.aborted) {
+            try {
+                const response = await fetch(`${api.defaults.baseURL}/live/${branchId}`, {
+                    headers: { Authorization: `Bearer ${localStorage.getItem('token')}` },
+                    signal: controller.signal
+                });
+                if (!response.ok || !response.body) throw new Error(`live ${response.status}`);
+                const reader = response.body.pipeThrough(new TextDecoderStream()).getReader();
+                let buffer = '';
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) break;
+                    buffer += value;
+                    const blocks = buffer.split('\n\n');
+                    buffer = blocks.pop() || '';
+                    for (const block of blocks) {
+                        const data = block.split('\n').filter(l => l.startsWith('data: ')).map(l => l.slice(6)).join('\n');
+                        const type = block.split('\n').find(l => l.startsWith('event: '))?.slice(7);
+                        if (data && type) onEvent({ ...JSON.parse(data), type });
+                    }
+                }
+            } catch (e) {
+                if (controller.signal.aborted) return;
+                console.error(e);
+            }
+            await new Promise(resolve => setTimeout(resolve, RECONNECT_MS));
+        }
+    };
+    connect();
+    return () => controller.abort();
+}
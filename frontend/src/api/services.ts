@@ -96,11 +96,36 @@ export const productsService = {
     }
 };
 
+export interface StockMatrixRow extends Product {
+    quantities: Record<string, number>; // branch_id -> quantity
+    total_stock: number;
+    low_stock: boolean;
+}
+
+export interface StockMatrixParams {
+    search?: string;
+    category?: string;
+    supplier_name?: string;
+    branch_id?: string;
+    low_stock?: boolean;
+    cursor?: string;
+    limit?: number;
+}
+
 export const inventoryService = {
     getStock: async (params?: { branch_id?: string; product_id?: string }) => {
         const { data } = await api.get<Stock[]>('/inventory/stock', { params });
         return data;
     },
+    // Products (by name) x branches; pass next_cursor back for the next page
+    getMatrix: async (params: StockMatrixParams = {}) => {
+        const { data } = await api.get<{ branches: { id: string; name: string }[]; items: StockMatrixRow[]; next_cursor: string | null }>('/inventory/matrix', { params });
+        return data;
+    },
+    downloadMatrixCsv: async (params: StockMatrixParams = {}) => {
+        const { data } = await api.get('/inventory/matrix', { params: { ...params, format: 'csv' }, responseType: 'blob' });
+        return data as Blob;
+    },
     createMovement: async (movement: InventoryMovement) => {
         const { data } = await api.post<InventoryMovement>('/inventory/movements', movement);
         return data;
@@ -145,12 +170,26 @@ export interface DeliveryOrder {
     shipping_cost?: number;
     scheduled_at?: string;
     created_at: string;
-    sale_details?: Sale; // Populated in backend
+    version?: number;
+    sale_details?: DeliverySaleSummary; // Populated in backend
+}
+
+export interface DeliverySaleSummary {
+    total: number;
+    status: string;
+    customer_name?: string;
+    receipt_number?: string;
+    items: { name: string; quantity: number; unit_price: number }[];
 }
 
 export const deliveriesService = {
-    getPending: async () => {
-        const { data } = await api.get<DeliveryOrder[]>('/deliveries/');
+    // One page of the board (active orders by default); pass nextCursor back for the next one
+    getBoard: async (params: { status?: string; branch_id?: string; cursor?: string; limit?: number } = {}) => {
+        const response = await api.get<DeliveryOrder[]>('/deliveries/', { params });
+        return { items: response.data, nextCursor: (response.headers['x-next-cursor'] as string) || null };
+    },
+    get: async (id: string) => {
+        const { data } = await api.get<DeliveryOrder>(`/deliveries/${id}`);
         return data;
     },
     updateStatus: async (id: string, status: string) => {
@@ -0,0 +1,42 @@
+import api from './axios';
+
+interface SyncResponse<T> {
+    items: T[];
+    deleted: string[];
+    next: string | null;
+    has_more: boolean;
+    reset: boolean;
+}
+
+// Local copy of a backend collection kept current through GET /sync/{collection}.
+// refresh() loads everything the first time and only the changes afterwards.
+export class SyncedCollection<T extends { _id?: string; id?: string }> {
+    private docs = new Map<string, T>();
+    private token: string | null = null;
+
+    constructor(private collection: string) { }
+
+    async refresh(): Promise<T[]> {
+        let hasMore = true;
+        while (hasMore) {
+            const { data } = await api.get<SyncResponse<T>>(`/sync/${this.collection}`, {
+                params: this.token ? { since: this.token } : {}
+            });
+            if (data.reset) {
+                // Token too old (or data restored): reload from scratch
+                this.docs.clear();
+                this.token = null;
+                continue;
+            }
+            for (const doc of data.items) this.docs.set((doc._id || doc.id) as string, doc);
+            for (const id of data.deleted) this.docs.delete(id);
+            this.token = data.next;
+            hasMore = data.has_more;
+        }
+        return this.all();
+    }
+
+    all(): T[] {
+        return Array.from(this.docs.values());
+    }
+}
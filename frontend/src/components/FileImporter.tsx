@@ -1,19 +1,34 @@
 import React, { useRef, useState } from 'react';
 import { Upload, CheckCircle, AlertCircle, Loader2 } from 'lucide-react';
-import axios from 'axios';
+import api from '../api/axios';
 
 interface FileImporterProps {
     label: string;
     endpoint: string;
     onSuccess?: () => void;
+    upsert?: boolean; // Update matching records in place instead of adding new ones
 }
 
-const FileImporter: React.FC<FileImporterProps> = ({ label, endpoint, onSuccess }) => {
+// Imports run as background jobs: the upload returns a job id that is polled until it finishes
+const POLL_INTERVAL_MS = 1000;
+const FINISHED = ['SUCCEEDED', 'FAILED', 'CANCELLED'];
+
+const waitForJob = async (jobId: string, onProgress: (progress: number) => void) => {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, POLL_INTERVAL_MS));
+        const { data } = await api.get(`/jobs/${jobId}`);
+        onProgress(data.progress || 0);
+        if (FINISHED.includes(data.status)) return data;
+    }
+};
+
+const FileImporter: React.FC<FileImporterProps> = ({ label, endpoint, onSuccess, upsert = false }) => {
     const fileInputRef = useRef<HTMLInputElement>(null);
     const [deleteExisting, setDeleteExisting] = useState(false);
     const [isUploading, setIsUploading] = useState(false);
     const [status, setStatus] = useState<'idle' | 'success' | 'error'>('idle');
     const [message, setMessage] = useState('');
+    const [progress, setProgress] = useState<number | null>(null);
 
     const handleFileChange = async (event: React.ChangeEvent<HTMLInputElement>) => {
         const file = event.target.files?.[0];
@@ -39,14 +54,22 @@ const FileImporter: React.FC<FileImporterProps> = ({ label, endpoint, onSuccess
         formData.append('file', file);
 
         try {
-            // Send delete_existing as a query parameter
-            const response = await axios.post(`http://localhost:8000${endpoint}?delete_existing=${deleteExisting}`, formData, {
+            // Send delete_existing (or the upsert mode) as a query parameter
+            const query = upsert ? 'mode=upsert' : `delete_existing=${deleteExisting}`;
+            const response = await api.post(`${endpoint}?${query}`, formData, {
                 headers: {
                     'Content-Type': 'multipart/form-data',
                 }
             });
+            setProgress(0);
+            const job = await waitForJob(response.data.job_id, setProgress);
+            if (job.status !== 'SUCCEEDED') {
+                setStatus('error');
+                setMessage(job.status === 'CANCELLED' ? 'Importación cancelada' : 'Error al importar archivo');
+                return;
+            }
             setStatus('success');
-            setMessage(response?.data?.message || 'Importación exitosa');
+            setMessage(job.result?.message || 'Importación exitosa');
             if (onSuccess) onSuccess();
         } catch (error: any) {
             console.error("Import error:", error);
@@ -55,6 +78,7 @@ const FileImporter: React.FC<FileImporterProps> = ({ label, endpoint, onSuccess
             setMessage(typeof errorMsg === 'string' ? errorMsg : 'Error en el servidor');
         } finally {
             setIsUploading(false);
+            setProgress(null);
             // Reset input
             if (fileInputRef.current) {
                 fileInputRef.current.value = '';
@@ -77,17 +101,19 @@ const FileImporter: React.FC<FileImporterProps> = ({ label, endpoint, onSuccess
             />
 
             <div className="flex items-center gap-4">
-                <label className="flex items-center gap-2 cursor-pointer group">
-                    <input
-                        type="checkbox"
-                        checked={deleteExisting}
-                        onChange={(e) => setDeleteExisting(e.target.checked)}
-                        className="w-4 h-4 rounded border-gray-300 text-red-600 focus:ring-red-500"
-                    />
-                    <span className="text-[10px] text-gray-500 group-hover:text-red-600 transition-colors">
-                        Eliminar anteriores
-                    </span>
-                </label>
+                {!upsert && (
+                    <label className="flex items-center gap-2 cursor-pointer group">
+                        <input
+                            type="checkbox"
+                            checked={deleteExisting}
+                            onChange={(e) => setDeleteExisting(e.target.checked)}
+                            className="w-4 h-4 rounded border-gray-300 text-red-600 focus:ring-red-500"
+                        />
+                        <span className="text-[10px] text-gray-500 group-hover:text-red-600 transition-colors">
+                            Eliminar anteriores
+                        </span>
+                    </label>
+                )}
 
                 <button
                     onClick={triggerFileInput}
@@ -99,7 +125,7 @@ const FileImporter: React.FC<FileImporterProps> = ({ label, endpoint, onSuccess
                     ) : (
                         <Upload className="w-4 h-4" />
                     )}
-                    Importar {label} (CSV/TXT)
+                    {progress !== null ? `Importando... ${Math.round(progress)}%` : `Importar ${label} (CSV/TXT)`}
                 </button>
             </div>
 
@@ -1,10 +1,15 @@
-import { useEffect, useState } from 'react';
+import { useEffect, useRef, useState } from 'react';
 import api from '../api/axios';
+import { subscribeLive } from '../api/live';
+import { SyncedCollection } from '../api/sync';
 import { ChevronLeft, ChevronRight, Plus, X, Clock, Scissors, Stethoscope, MapPin } from 'lucide-react';
 import { Link, useNavigate, useSearchParams } from 'react-router-dom';
 import Select from 'react-select';
 import { useBranch } from '../context/BranchContext';
 
+// Kept across visits: reopening the agenda only fetches patients changed since
+const patientsCache = new SyncedCollection<any>('patients');
+
 const Agenda = () => {
     const { currentBranch } = useBranch();
     const navigate = useNavigate();
@@ -74,8 +79,8 @@ const Agenda = () => {
     useEffect(() => {
         const loadPatients = async () => {
             try {
-                // Fetching all patients for search.
-                const { data } = await api.get('/patients?limit=100');
+                const data = await patientsCache.refresh();
+                data.sort((a, b) => (a.name || '').localeCompare(b.name || ''));
                 setPatients(data.map((p: any) => ({
                     value: p._id,
                     label: `${p.name} (${p.species}) - ${p.breed} `
@@ -91,6 +96,25 @@ const Agenda = () => {
         fetchEvents();
     }, [currentDate, currentBranch, agendaType]);
 
+    // Appointments booked, moved or cancelled from other screens show up without a reload
+    const fetchEventsRef = useRef(fetchEvents);
+    fetchEventsRef.current = fetchEvents;
+    useEffect(() => {
+        const branchId = currentBranch?.id || currentBranch?._id;
+        if (!branchId) return;
+        let pending: ReturnType<typeof setTimeout> | undefined;
+        const unsubscribe = subscribeLive(branchId, (event) => {
+            if (event.type !== 'consultation' && event.type !== 'resync') return;
+            // One refetch for a burst of changes
+            clearTimeout(pending);
+            pending = setTimeout(() => fetchEventsRef.current(), 300);
+        });
+        return () => {
+            clearTimeout(pending);
+            unsubscribe();
+        };
+    }, [currentBranch]);
+
     const handleSave = async (e: React.FormEvent) => {
         e.preventDefault();
         if (!currentBranch) return alert('Seleccione una sucursal');
@@ -194,7 +194,7 @@ const Clients = () => {
                 </h1>
                 <div className="flex items-center gap-3">
                     {hasRole('admin') && (
-                        <FileImporter label="Clientes" endpoint="/api/v1/import/tutors" onSuccess={() => setRefreshTrigger(prev => prev + 1)} />
+                        <FileImporter label="Clientes" endpoint="/import/tutors" onSuccess={() => setRefreshTrigger(prev => prev + 1)} />
                     )}
                 </div>
             </div>
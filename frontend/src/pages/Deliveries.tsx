@@ -1,4 +1,5 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
+import { subscribeLive } from '../api/live';
 import { deliveriesService, usersService, productsService, salesService, customersService, type DeliveryOrder, type Product } from '../api/services';
 import { useAuth } from '../context/AuthContext';
 import { useBranch } from '../context/BranchContext';
@@ -8,10 +9,17 @@ interface CartItem extends Product {
     quantity: number;
 }
 
+// Statuses shown on the board (the backend default)
+const BOARD_STATUSES = ['PENDING', 'ASSIGNED', 'IN_TRANSIT'];
+const deliveryId = (d: DeliveryOrder) => d.id || d._id;
+
 const Deliveries = () => {
-    const { hasAnyRole } = useAuth();
+    const { hasAnyRole, user } = useAuth();
     const { currentBranch } = useBranch();
     const [deliveries, setDeliveries] = useState<DeliveryOrder[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const deliveriesRef = useRef<DeliveryOrder[]>([]);
+    deliveriesRef.current = deliveries;
     const [dispatchers, setDispatchers] = useState<any[]>([]);
     const [isLoading, setIsLoading] = useState(true);
 
@@ -63,15 +71,17 @@ const Deliveries = () => {
         if (c.address) setAddress(c.address);
     };
 
+    const branchId = currentBranch?.id || currentBranch?._id;
+
     const loadData = async () => {
         setIsLoading(true);
         try {
-            const [delData, usersData] = await Promise.all([
-                deliveriesService.getPending(),
+            const [board, usersData] = await Promise.all([
+                deliveriesService.getBoard({ branch_id: branchId }),
                 usersService.getAll('delivery') // Assuming 'delivery' role exists, otherwise fallback to all
             ]);
-            setDeliveries(delData);
-            console.log("DEBUG: Deliveries Data", delData);
+            setDeliveries(board.items);
+            setNextCursor(board.nextCursor);
             setDispatchers(usersData);
         } catch (error) {
             console.error(error);
@@ -80,9 +90,50 @@ const Deliveries = () => {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        try {
+            const board = await deliveriesService.getBoard({ branch_id: branchId, cursor: nextCursor });
+            setDeliveries(current => [...current, ...board.items]);
+            setNextCursor(board.nextCursor);
+        } catch (error) {
+            console.error(error);
+        }
+    };
+
     useEffect(() => {
         loadData();
-    }, []);
+    }, [branchId]);
+
+    // Status changes from other phones and screens, without reloading the list
+    useEffect(() => {
+        if (!branchId) return;
+        return subscribeLive(branchId, async (event) => {
+            if (event.type === 'resync') return loadData();
+            if (event.type !== 'delivery' || !event.id) return;
+            // Same rule as the backend: couriers only see their own orders and unassigned ones
+            const isCourier = user?.roles?.includes('delivery') && !user?.roles?.includes('admin');
+            const takenByOther = isCourier && !!event.assigned_user_id && event.assigned_user_id !== user?.id;
+            if (event.action === 'deleted' || !BOARD_STATUSES.includes(event.status || '') || takenByOther) {
+                setDeliveries(current => current.filter(d => deliveryId(d) !== event.id));
+                return;
+            }
+            const known = deliveriesRef.current.find(d => deliveryId(d) === event.id);
+            if (known) {
+                setDeliveries(current => current.map(d => deliveryId(d) === event.id && (d.version || 0) <= (event.version || 0)
+                    ? { ...d, status: event.status!, assigned_user_id: event.assigned_user_id || undefined, scheduled_at: event.scheduled_at || undefined, version: event.version }
+                    : d));
+            } else {
+                // New order (or one a courier can now see): fetch it with its sale summary
+                try {
+                    const order = await deliveriesService.get(event.id);
+                    setDeliveries(current => current.some(d => deliveryId(d) === event.id) ? current : [order, ...current]);
+                } catch (error) {
+                    console.error(error);
+                }
+            }
+        });
+    }, [branchId, user?.id]);
 
     // Search Products Logic (Simplified from POS)
     useEffect(() => {
@@ -204,7 +255,7 @@ const Deliveries = () => {
         if (!confirm('¿Marcar como entregado?')) return;
         try {
             await deliveriesService.updateStatus(id, 'DELIVERED');
-            loadData();
+            setDeliveries(current => current.filter(d => deliveryId(d) !== id));
         } catch (error) {
             console.error(error);
             alert('Error al actualizar estado');
@@ -217,7 +268,7 @@ const Deliveries = () => {
         try {
             await deliveriesService.delete(id);
             alert('Despacho eliminado');
-            loadData();
+            setDeliveries(current => current.filter(d => deliveryId(d) !== id));
         } catch (error: any) {
             console.error(error);
             alert(error.response?.data?.detail || 'Error al eliminar');
@@ -334,6 +385,14 @@ const Deliveries = () => {
                 )}
             </div>
 
+            {nextCursor && (
+                <div className="text-center">
+                    <button onClick={loadMore} className="px-4 py-2 text-sm text-primary hover:underline">
+                        Cargar más
+                    </button>
+                </div>
+            )}
+
             {/* New Delivery Modal */}
             {showModal && (
                 <div className="fixed inset-0 bg-black/50 flex items-center justify-center p-4 z-50 backdrop-blur-sm">
@@ -182,7 +182,10 @@ const Inventory = () => {
 
                 <div className="flex justify-end pr-1">
                     {hasRole('admin') && (
-                        <FileImporter label="Importar Catálogo" endpoint="/api/v1/import/products" onSuccess={loadData} />
+                        <div className="flex gap-3">
+                            <FileImporter label="Catálogo (actualizar)" endpoint="/import/products" onSuccess={loadData} upsert />
+                            <FileImporter label="Importar Catálogo" endpoint="/import/products" onSuccess={loadData} />
+                        </div>
                     )}
                 </div>
             </div>
@@ -2,6 +2,7 @@ import { useState, useEffect, useRef } from 'react';
 import { useBranch } from '../context/BranchContext';
 import { productsService, salesService, type Product } from '../api/services';
 import api from '../api/axios';
+import { subscribeLive } from '../api/live';
 import { Search, Trash2, ShoppingCart } from 'lucide-react';
 import SaleSuccessModal from '../components/SaleSuccessModal';
 
@@ -45,6 +46,18 @@ const POS = () => {
         checkCashSession();
     }, [currentBranch]);
 
+    // Stock sold from other terminals of this branch
+    useEffect(() => {
+        const branchId = currentBranch?.id || currentBranch?._id;
+        if (!branchId) return;
+        return subscribeLive(branchId, (event) => {
+            if (event.type !== 'stock' || !event.product_id) return;
+            const matches = (p: Product) => (p.id || p._id) === event.product_id;
+            setCart(current => current.map(item => matches(item) ? { ...item, stock: event.quantity } : item));
+            setProductSuggestions(current => current.map(p => matches(p) ? { ...p, stock: event.quantity } : p));
+        });
+    }, [currentBranch]);
+
     const loadProfessionals = async () => {
         try {
             const res = await api.get('/users/');
@@ -23,6 +23,7 @@ const GalleryTab = ({ patientId }: { patientId: string }) => {
                             allImages.push({
                                 id: file._id || file.id,
                                 url: `${api.defaults.baseURL}/files/${file._id || file.id}`,
+                                thumbUrl: `${api.defaults.baseURL}/files/${file._id || file.id}?variant=thumb`,
                                 displayDate: file.created_at || c.date, // Use upload date!
                                 consultationReason: c.reason,
                                 consultationId: c._id
@@ -36,6 +37,7 @@ const GalleryTab = ({ patientId }: { patientId: string }) => {
                         allImages.push({
                             id: fileId,
                             url: `${api.defaults.baseURL}/files/${fileId}`,
+                            thumbUrl: `${api.defaults.baseURL}/files/${fileId}?variant=thumb`,
                             displayDate: c.date, // Fallback to consultation date
                             consultationReason: c.reason,
                             consultationId: c._id
@@ -93,7 +95,8 @@ const GalleryTab = ({ patientId }: { patientId: string }) => {
                         onClick={() => setSelectedImage(img.url)}
                     >
                         <img
-                            src={img.url}
+                            src={img.thumbUrl}
+                            loading="lazy"
                             alt={`Consulta ${img.consultationReason}`}
                             className="w-full h-full object-cover"
                             onError={(e) => { (e.target as HTMLImageElement).src = 'https://via.placeholder.com/300?text=Error'; }}
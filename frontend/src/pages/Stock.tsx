@@ -1,6 +1,6 @@
 import { useState, useEffect } from 'react';
-import { inventoryService, productsService, type Stock, type Product } from '../api/services';
-import { Package, Search, RefreshCw, Edit2, ChevronLeft, ChevronRight } from 'lucide-react';
+import { inventoryService, productsService, type StockMatrixRow, type Product } from '../api/services';
+import { Package, Search, RefreshCw, Edit2, ChevronLeft, ChevronRight, Download } from 'lucide-react';
 import api from '../api/axios';
 import StockAdjustmentModal from '../components/StockAdjustmentModal';
 
@@ -12,8 +12,7 @@ interface Branch {
 }
 
 const StockPage = () => {
-    const [products, setProducts] = useState<Product[]>([]);
-    const [stocks, setStocks] = useState<Stock[]>([]);
+    const [rows, setRows] = useState<StockMatrixRow[]>([]);
     const [branches, setBranches] = useState<Branch[]>([]);
     const [loading, setLoading] = useState(false);
     const [search, setSearch] = useState('');
@@ -21,6 +20,7 @@ const StockPage = () => {
     const [supplierName, setSupplierName] = useState('');
     const [selectedBranchFilter, setSelectedBranchFilter] = useState('');
     const [categories, setCategories] = useState<string[]>([]);
+    const [lowStockOnly, setLowStockOnly] = useState(false);
 
     // Modal State
     const [isAdjustmentModalOpen, setIsAdjustmentModalOpen] = useState(false);
@@ -28,40 +28,33 @@ const StockPage = () => {
     const [selectedBranchId, setSelectedBranchId] = useState<string | undefined>(undefined);
     const [selectedBranchName, setSelectedBranchName] = useState<string | undefined>(undefined);
     const [currentQtyToEdit, setCurrentQtyToEdit] = useState(0);
+    // Keyset pages: cursors[i] opens page i + 1 (null for the first)
+    const [cursors, setCursors] = useState<(string | null)[]>([null]);
     const [currentPage, setCurrentPage] = useState(1);
-    const [totalProducts, setTotalProducts] = useState(0);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const itemsPerPage = 200;
 
+    const filters = () => ({
+        search: search || undefined,
+        category: selectedCategory || undefined,
+        supplier_name: supplierName || undefined,
+        low_stock: lowStockOnly || undefined
+    });
+
     const loadData = async () => {
         setLoading(true);
         try {
-            // 1. Fetch Branches
             const branchRes = await api.get('/branches');
-            const activeBranches = branchRes.data.filter((b: Branch) => b.is_active);
-            setBranches(activeBranches);
+            setBranches(branchRes.data.filter((b: Branch) => b.is_active));
 
-            // 2. Fetch Products
-            const { items: productData, total } = await productsService.getAll({
-                search,
-                category: selectedCategory,
-                supplier_name: supplierName,
-                limit: itemsPerPage,
-                page: currentPage
+            // Products with their stock per branch, already pivoted by the backend
+            const matrix = await inventoryService.getMatrix({
+                ...filters(),
+                cursor: cursors[currentPage - 1] || undefined,
+                limit: itemsPerPage
             });
-            setTotalProducts(total);
-            setProducts(productData);
-
-            // 3. Fetch ALL Stocks (unfiltered by branch)
-            // The current service might filter by branch. We need a way to get ALL.
-            // checking inventoryService.getStock implementation...
-            // If it demands branch_id, we might need to fetch for each branch or update backend.
-            // Let's assume we can fetch all or loop.
-            // Parallel fetch for all branches to build compendium
-            // Ideally backend supports "get all stocks", but let's iterate for now if needed.
-            // Actually router inventory.py: get_stock(branch_id=None) returns all.
-            const stockData = await inventoryService.getStock({});
-            setStocks(stockData);
-
+            setRows(matrix.items);
+            setNextCursor(matrix.next_cursor);
         } catch (error) {
             console.error("Error loading stock data:", error);
         } finally {
@@ -69,6 +62,30 @@ const StockPage = () => {
         }
     };
 
+    const goToPage = (page: number) => {
+        if (page > cursors.length) {
+            if (!nextCursor) return;
+            setCursors([...cursors, nextCursor]);
+        }
+        setCurrentPage(page);
+    };
+
+    const handleDownloadCsv = async () => {
+        try {
+            const blob = await inventoryService.downloadMatrixCsv(filters());
+            const url = window.URL.createObjectURL(blob);
+            const link = document.createElement('a');
+            link.href = url;
+            link.setAttribute('download', 'stock_por_sucursal.csv');
+            document.body.appendChild(link);
+            link.click();
+            link.remove();
+        } catch (error) {
+            console.error(error);
+            alert('Error al descargar el CSV');
+        }
+    };
+
     const loadCategories = async () => {
         try {
             const cats = await productsService.getCategories();
@@ -80,7 +97,7 @@ const StockPage = () => {
 
     useEffect(() => {
         loadData();
-    }, [search, selectedCategory, supplierName, currentPage]);
+    }, [search, selectedCategory, supplierName, lowStockOnly, currentPage]);
 
     useEffect(() => {
         loadCategories();
@@ -88,8 +105,9 @@ const StockPage = () => {
 
     // Reset page on search
     useEffect(() => {
+        setCursors([null]);
         setCurrentPage(1);
-    }, [search, selectedCategory, supplierName]);
+    }, [search, selectedCategory, supplierName, lowStockOnly]);
 
     const handleEditStock = (product: Product, branchId: string, branchName: string, qty: number) => {
         setSelectedProduct(product);
@@ -99,30 +117,12 @@ const StockPage = () => {
         setIsAdjustmentModalOpen(true);
     };
 
-    // Build Pivot Table Data
-    // Map<ProductId, { product: Product, stocks: { BranchId: qty } }>
-    const pivotData = products.map(product => {
-        const prodId = product.id || product._id;
-        const prodStocks = stocks.filter(s => s.product_id === prodId);
-
-        const stockByBranch: Record<string, number> = {};
-        branches.forEach(b => {
-            const bId = b.id || b._id;
-            const entry = prodStocks.find(s => s.branch_id === bId);
-            stockByBranch[bId || ''] = entry ? entry.quantity : 0;
-        });
+    const pivotData = rows.map(row => ({
+        ...row,
+        stockByBranch: row.quantities,
+        totalStock: row.total_stock
+    }));
 
-        // Calculate Total
-        const totalStock = Object.values(stockByBranch).reduce((a, b) => a + b, 0);
-
-        return {
-            ...product,
-            stockByBranch,
-            totalStock
-        };
-    });
-
-    const totalPages = Math.ceil(totalProducts / itemsPerPage);
     const filteredBranchesRow = branches.filter(b => !selectedBranchFilter || (b.id === selectedBranchFilter || b._id === selectedBranchFilter));
 
     return (
@@ -180,7 +180,23 @@ const StockPage = () => {
                         />
                     </div>
 
+                    <label className="flex items-center gap-2 text-sm text-gray-700 whitespace-nowrap">
+                        <input
+                            type="checkbox"
+                            checked={lowStockOnly}
+                            onChange={e => setLowStockOnly(e.target.checked)}
+                        />
+                        Solo stock bajo
+                    </label>
+
                     <div className="flex gap-2">
+                        <button
+                            onClick={handleDownloadCsv}
+                            className="p-2 border border-blue-600 text-blue-600 bg-white rounded hover:bg-blue-50 transition-colors"
+                            title="Descargar CSV"
+                        >
+                            <Download size={20} />
+                        </button>
                         <button
                             onClick={loadData}
                             className="p-2 border border-blue-600 text-blue-600 bg-white rounded hover:bg-blue-50 transition-colors"
@@ -243,7 +259,7 @@ const StockPage = () => {
                                                         <span className="text-gray-400 font-bold">-</span>
                                                     ) : (
                                                         <>
-                                                            <span className={`px-2 py-1 rounded-full text-xs font-medium ${qty > 5 ? 'bg-green-100 text-green-700' :
+                                                            <span className={`px-2 py-1 rounded-full text-xs font-medium ${qty > (row.stock_alert_threshold ?? 5) ? 'bg-green-100 text-green-700' :
                                                                 qty > 0 ? 'bg-yellow-100 text-yellow-700' :
                                                                     'bg-red-100 text-red-700'
                                                                 }`}>
@@ -270,70 +286,29 @@ const StockPage = () => {
             </div>
 
             {/* Pagination Controls */}
-            {totalPages > 1 && (
+            {(currentPage > 1 || nextCursor) && (
                 <div className="flex items-center justify-between bg-white px-4 py-3 rounded-lg border border-gray-200 mt-4">
-                    <div className="flex flex-1 justify-between sm:hidden">
+                    <p className="text-sm text-gray-700">
+                        Página <span className="font-medium">{currentPage}</span>
+                    </p>
+                    <nav className="isolate inline-flex -space-x-px rounded-md shadow-sm" aria-label="Pagination">
                         <button
-                            onClick={() => setCurrentPage(p => Math.max(1, p - 1))}
+                            onClick={() => goToPage(currentPage - 1)}
                             disabled={currentPage === 1}
-                            className="relative inline-flex items-center rounded-md border border-gray-300 bg-white px-4 py-2 text-sm font-medium text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+                            className="relative inline-flex items-center rounded-l-md px-2 py-2 text-gray-400 ring-1 ring-inset ring-gray-300 hover:bg-gray-50 focus:z-20 focus:outline-offset-0 disabled:opacity-50"
                         >
-                            Anterior
+                            <span className="sr-only">Anterior</span>
+                            <ChevronLeft className="h-5 w-5" aria-hidden="true" />
                         </button>
                         <button
-                            onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))}
-                            disabled={currentPage === totalPages}
-                            className="relative ml-3 inline-flex items-center rounded-md border border-gray-300 bg-white px-4 py-2 text-sm font-medium text-gray-700 hover:bg-gray-50 disabled:opacity-50"
+                            onClick={() => goToPage(currentPage + 1)}
+                            disabled={!nextCursor}
+                            className="relative inline-flex items-center rounded-r-md px-2 py-2 text-gray-400 ring-1 ring-inset ring-gray-300 hover:bg-gray-50 focus:z-20 focus:outline-offset-0 disabled:opacity-50"
                         >
-                            Siguiente
+                            <span className="sr-only">Siguiente</span>
+                            <ChevronRight className="h-5 w-5" aria-hidden="true" />
                         </button>
-                    </div>
-                    <div className="hidden sm:flex sm:flex-1 sm:items-center sm:justify-between">
-                        <div>
-                            <p className="text-sm text-gray-700">
-                                Mostrando <span className="font-medium">{(currentPage - 1) * itemsPerPage + 1}</span> a <span className="font-medium">{Math.min(currentPage * itemsPerPage, totalProducts)}</span> de{' '}
-                                <span className="font-medium">{totalProducts}</span> resultados
-                            </p>
-                        </div>
-                        <div>
-                            <nav className="isolate inline-flex -space-x-px rounded-md shadow-sm" aria-label="Pagination">
-                                <button
-                                    onClick={() => setCurrentPage(p => Math.max(1, p - 1))}
-                                    disabled={currentPage === 1}
-                                    className="relative inline-flex items-center rounded-l-md px-2 py-2 text-gray-400 ring-1 ring-inset ring-gray-300 hover:bg-gray-50 focus:z-20 focus:outline-offset-0 disabled:opacity-50"
-                                >
-                                    <span className="sr-only">Anterior</span>
-                                    <ChevronLeft className="h-5 w-5" aria-hidden="true" />
-                                </button>
-                                {[...Array(Math.min(5, totalPages))].map((_, i) => {
-                                    let pageNum = currentPage;
-                                    if (currentPage <= 3) pageNum = i + 1;
-                                    else if (currentPage >= totalPages - 2) pageNum = totalPages - 4 + i;
-                                    else pageNum = currentPage - 2 + i;
-
-                                    if (pageNum <= 0 || pageNum > totalPages) return null;
-
-                                    return (
-                                        <button
-                                            key={pageNum}
-                                            onClick={() => setCurrentPage(pageNum)}
-                                            className={`relative inline-flex items-center px-4 py-2 text-sm font-semibold ${currentPage === pageNum ? 'bg-blue-600 text-white focus-visible:outline focus-visible:outline-2 focus-visible:outline-offset-2 focus-visible:outline-blue-600' : 'text-gray-900 ring-1 ring-inset ring-gray-300 hover:bg-gray-50 focus:z-20 focus:outline-offset-0'}`}
-                                        >
-                                            {pageNum}
-                                        </button>
-                                    );
-                                })}
-                                <button
-                                    onClick={() => setCurrentPage(p => Math.min(totalPages, p + 1))}
-                                    disabled={currentPage === totalPages}
-                                    className="relative inline-flex items-center rounded-r-md px-2 py-2 text-gray-400 ring-1 ring-inset ring-gray-300 hover:bg-gray-50 focus:z-20 focus:outline-offset-0 disabled:opacity-50"
-                                >
-                                    <span className="sr-only">Siguiente</span>
-                                    <ChevronRight className="h-5 w-5" aria-hidden="true" />
-                                </button>
-                            </nav>
-                        </div>
-                    </div>
+                    </nav>
                 </div>
             )}
 
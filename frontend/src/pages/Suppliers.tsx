@@ -85,7 +85,7 @@ const Suppliers = () => {
                 </h1>
                 <div className="flex items-center gap-3">
                     {hasRole('admin') && (
-                        <FileImporter label="Proveedores" endpoint="/api/v1/import/suppliers" onSuccess={fetchSuppliers} />
+                        <FileImporter label="Proveedores" endpoint="/import/suppliers" onSuccess={fetchSuppliers} />
                     )}
                 </div>
             </div>